@@ -16,9 +16,12 @@
 a SalishSeaCast domain water mask for the AIS ship track density GeoTIFF files used to
 generate oil spill parameters for Monte Carlo runs of MOHID.
 """
+import hashlib
 import logging
 import sys
+import zipfile
 from pathlib import Path
+from types import SimpleNamespace
 
 import click
 import numpy
@@ -59,6 +62,14 @@ def calc_watermask(ais_density, ssc_mesh):
     AIS ship track density GeoTIFF files used to generate oil spill parameters for
     Monte Carlo runs of MOHID.
 
+    A GeoTIFF pixel is water if there is at least one SalishSeaCast NEMO T-grid water point
+    strictly inside its bounds.
+    Each water point is binned into a GeoTIFF pixel by applying the inverse of the GeoTIFF
+    affine transform to its lon/lat.
+    Its presence in that pixel and the 8 pixels around it is then confirmed with strict
+    inequality tests against the pixels' bounds so that points on pixel boundaries are not
+    in any pixel.
+
     :param ais_density: AIS ship tracks GeoTIFF object to use the pixel lons/lats from
                         to calculate water mask.
     :type ais_density: :py:class:`rasterio.io.DatasetReader`
@@ -71,47 +82,453 @@ def calc_watermask(ais_density, ssc_mesh):
              them to the SalishSeaCast NEMO domain.
     :rtype: :py:class:`numpy.ndarray`
     """
-    n_x, n_y = ais_density.shape
-    watermask = numpy.full(ais_density.shape, False, dtype=bool)
     logging.info("Calculating water mask...")
-    for xx in range(n_x):
-        for yy in range(n_y):
-            # The rasterio.transform.xy() type annotations say that the 2nd & 3rd args
-            # should be Union(list, int), but floats seem to work just fine.
-            llx, lly = rasterio.transform.xy(ais_density.transform, xx + 0.5, yy - 0.5)
-            urx, ury = rasterio.transform.xy(ais_density.transform, xx - 0.5, yy + 0.5)
-
-            watermask[xx, yy] = numpy.any(
-                numpy.logical_and(
-                    ssc_mesh.tmask.isel(t=0, z=0),
-                    numpy.logical_and(
-                        numpy.logical_and(
-                            ssc_mesh.glamt.isel(t=0) > llx,
-                            ssc_mesh.glamt.isel(t=0) < urx,
-                        ),
-                        numpy.logical_and(
-                            ssc_mesh.gphit.isel(t=0) > lly,
-                            ssc_mesh.gphit.isel(t=0) < ury,
-                        ),
-                    ),
-                )
-            )
+    # A GeoTIFF pixel is water if there is at least one SalishSeaCast T-grid water point
+    # strictly inside it
+    cells, _ = _bin_tpoints(ais_density.transform, ais_density.shape, ssc_mesh)
+    watermask = numpy.full(ais_density.shape, False, dtype=bool)
+    watermask.flat[cells] = True
     return watermask
 
 
-def write_numpy_file(watermask, numpy_file):
+def calc_tpoint_cell_map(transform, shape, ssc_mesh):
+    """Calculate a map of the SalishSeaCast NEMO T-grid water points that are in each cell of
+    the AIS ship track density GeoTIFF grid.
+
+    Please see :py:func:`calc_watermask` for details of how the water points are found
+    in the GeoTIFF cells.
+
+    The map is in compressed sparse row (CSR) layout; i.e. the flattened indices in the
+    NEMO T-grid of the water points in the flattened GeoTIFF cell :kbd:`i` are
+    :kbd:`tpoints[indptr[i]:indptr[i+1]]`, in increasing order.
+
+    :param transform: Affine transform of the GeoTIFF grid.
+    :type transform: :py:class:`affine.Affine`
+
+    :param tuple shape: Shape of the GeoTIFF grid.
+
+    :param ssc_mesh: SalishSeaCast NEMO mesh mask dataset to use the NEMO grid lons/lats
+                     and T-grid water/land maks from.
+    :type ssc_mesh: :py:class:`xarray.Dataset`
+
+    :return: 2-tuple composed of:
+
+             * :kbd:`indptr` array with an element for each GeoTIFF cell, plus 1
+             * :kbd:`tpoints` array of flattened NEMO T-grid indices
+
+    :rtype: tuple
+    """
+    n_x, n_y = shape
+    cells, tpoints = _bin_tpoints(transform, shape, ssc_mesh)
+    order = numpy.lexsort((tpoints, cells))
+    indptr = numpy.zeros(n_x * n_y + 1, dtype=int)
+    indptr[1:] = numpy.cumsum(numpy.bincount(cells, minlength=n_x * n_y))
+    return indptr, tpoints[order]
+
+
+def _bin_tpoints(transform, shape, ssc_mesh):
+    """Find the GeoTIFF cells that the SalishSeaCast NEMO T-grid water points are strictly
+    inside of in a single pass over the water points.
+
+    :param transform: Affine transform of the GeoTIFF grid.
+    :type transform: :py:class:`affine.Affine`
+
+    :param tuple shape: Shape of the GeoTIFF grid.
+
+    :param ssc_mesh: SalishSeaCast NEMO mesh mask dataset to use the NEMO grid lons/lats
+                     and T-grid water/land maks from.
+    :type ssc_mesh: :py:class:`xarray.Dataset`
+
+    :return: 2-tuple of arrays of flattened GeoTIFF cell indices and the flattened
+             NEMO T-grid indices of the water points in them.
+    :rtype: tuple
+    """
+    n_x, n_y = shape
+    tpoints = numpy.flatnonzero(ssc_mesh.tmask.isel(t=0, z=0).values == 1)
+    lons = ssc_mesh.glamt.isel(t=0).values.ravel()[tpoints]
+    lats = ssc_mesh.gphit.isel(t=0).values.ravel()[tpoints]
+    llx, lly, urx, ury = calc_cell_bounds(transform, shape)
+
+    cols, rows = ~transform * (lons, lats)
+    rows = numpy.floor(rows).astype(int)
+    cols = numpy.floor(cols).astype(int)
+    cells, cell_tpoints = [], []
+    for d_row in (-1, 0, 1):
+        for d_col in (-1, 0, 1):
+            row, col = rows + d_row, cols + d_col
+            in_grid = numpy.flatnonzero(
+                (row >= 0) & (row < n_x) & (col >= 0) & (col < n_y)
+            )
+            row, col = row[in_grid], col[in_grid]
+            inside = (
+                (lons[in_grid] > llx[row, col])
+                & (lons[in_grid] < urx[row, col])
+                & (lats[in_grid] > lly[row, col])
+                & (lats[in_grid] < ury[row, col])
+            )
+            cells.append(row[inside] * n_y + col[inside])
+            cell_tpoints.append(tpoints[in_grid[inside]])
+    return numpy.concatenate(cells), numpy.concatenate(cell_tpoints)
+
+
+def calc_cell_bounds(transform, shape):
+    """Calculate the lon/lat bounds of all of the cells of the AIS ship track density
+    GeoTIFF grid.
+
+    The bounds are calculated from the lons/lats of the cells' lower-left and upper-right
+    corners with the same :py:func:`rasterio.transform.xy` calls as are used for single cells,
+    so they are identical to the bounds of single cells.
+
+    :param transform: Affine transform of the GeoTIFF grid.
+    :type transform: :py:class:`affine.Affine`
+
+    :param tuple shape: Shape of the GeoTIFF grid.
+
+    :return: 4-tuple of minimum lon, minimum lat, maximum lon, and maximum lat arrays
+             with the shape of the GeoTIFF grid.
+    :rtype: tuple
+    """
+    rows, cols = numpy.indices(shape)
+    llx, lly = rasterio.transform.xy(transform, rows + 0.5, cols - 0.5)
+    urx, ury = rasterio.transform.xy(transform, rows - 0.5, cols + 0.5)
+    llx, lly, urx, ury = (numpy.reshape(coord, shape) for coord in (llx, lly, urx, ury))
+    return (
+        numpy.minimum(llx, urx),
+        numpy.minimum(lly, ury),
+        numpy.maximum(llx, urx),
+        numpy.maximum(lly, ury),
+    )
+
+
+def geotiff_watermasks(geotiffs_dir, meshmask_file, cache_dir):
+    """Calculate and store Numpy array files containing SalishSeaCast domain water masks for
+    all of the distinct grids of the AIS ship track density GeoTIFF files in a directory.
+
+    The GeoTIFF files are grouped by their grid (affine transform, shape, and CRS) so that
+    the water mask for each grid is calculated only once.
+    The water masks are stored in :kbd:`cache_dir` in files with names that are composed of
+    the grid key and the mesh mask key (see :py:func:`calc_grid_key` and
+    :py:func:`calc_meshmask_key`) so that :py:func:`read_watermask` can find the water mask
+    for a GeoTIFF grid and mesh mask.
+    Water masks that are already in the cache are not calculated again.
+
+    :param str geotiffs_dir: Directory path to read AIS ship tracks GeoTIFF files from.
+
+    :param str meshmask_file: File path and name of a SalishSeaCast NEMO mesh mask file to use
+                              the NEMO grid lons/lats and T-grid water/land maks from to
+                              calculate the water masks.
+
+    :param str cache_dir: Directory path to store the water mask Numpy array files in.
+
+    :return: Dict of lists of GeoTIFF file paths, keyed by the path of the water mask file
+             for their grid.
+    :rtype: dict
+    """
+    geotiffs_path = Path(geotiffs_dir).resolve()
+    meshmask_path = Path(meshmask_file).resolve()
+    grids = {}
+    for geotiff_path in sorted(geotiffs_path.glob("*.tif")):
+        with rasterio.open(geotiff_path) as ais_density:
+            grid_key = calc_grid_key(
+                ais_density.transform, ais_density.shape, ais_density.crs
+            )
+        grids.setdefault(grid_key, []).append(geotiff_path)
+    logging.info(
+        f"found {len(grids)} distinct grids in {sum(map(len, grids.values()))} "
+        f"GeoTIFFs in {geotiffs_path}"
+    )
+
+    watermask_files = {}
+    with xarray.open_dataset(meshmask_path) as ssc_mesh:
+        logging.info(f"opened SalishSeaCast NEMO mesh mask: {meshmask_path}")
+        meshmask_key = calc_meshmask_key(ssc_mesh)
+        for grid_key, geotiff_paths in grids.items():
+            numpy_file = calc_watermask_file(cache_dir, grid_key, meshmask_key)
+            watermask_files[numpy_file] = geotiff_paths
+            if numpy_file.exists():
+                logging.info(
+                    f"found water mask for {geotiff_paths[0]} grid: {numpy_file}"
+                )
+                continue
+            with rasterio.open(geotiff_paths[0]) as ais_density:
+                logging.info(f"calculating water mask for {geotiff_paths[0]} grid")
+                watermask = calc_watermask(ais_density, ssc_mesh)
+            numpy_file.parent.mkdir(parents=True, exist_ok=True)
+            write_numpy_file(watermask, numpy_file, grid_key, meshmask_key)
+    return watermask_files
+
+
+def calc_grid_key(transform, shape, crs):
+    """Calculate a key that identifies an AIS ship track density GeoTIFF grid.
+
+    :param transform: Affine transform of the GeoTIFF grid.
+    :type transform: :py:class:`affine.Affine`
+
+    :param tuple shape: Shape of the GeoTIFF grid.
+
+    :param crs: Coordinate reference system of the GeoTIFF grid.
+    :type crs: :py:class:`rasterio.crs.CRS` or None
+
+    :rtype: str
+    """
+    key = hashlib.sha256()
+    key.update(numpy.array(transform[:6], dtype=float).tobytes())
+    key.update(numpy.array(shape, dtype=numpy.int64).tobytes())
+    key.update((crs.to_wkt() if crs is not None else "").encode())
+    return key.hexdigest()
+
+
+def calc_meshmask_key(ssc_mesh):
+    """Calculate a key that identifies the SalishSeaCast NEMO grid lons/lats and surface
+    T-grid water/land mask that water masks are calculated from.
+
+    :param ssc_mesh: SalishSeaCast NEMO mesh mask dataset.
+    :type ssc_mesh: :py:class:`xarray.Dataset`
+
+    :rtype: str
+    """
+    key = hashlib.sha256()
+    for var in (
+        ssc_mesh.glamt.isel(t=0),
+        ssc_mesh.gphit.isel(t=0),
+        ssc_mesh.tmask.isel(t=0, z=0),
+    ):
+        key.update(numpy.ascontiguousarray(var.values).tobytes())
+    return key.hexdigest()
+
+
+def calc_watermask_file(cache_dir, grid_key, meshmask_key):
+    """Calculate the path of the water mask file for a GeoTIFF grid and mesh mask in a water
+    mask cache directory.
+
+    :param str cache_dir: Water mask cache directory path.
+
+    :param str grid_key: GeoTIFF grid key from :py:func:`calc_grid_key`.
+
+    :param str meshmask_key: Mesh mask key from :py:func:`calc_meshmask_key`.
+
+    :rtype: :py:class:`pathlib.Path`
+    """
+    return Path(cache_dir) / f"watermask_{grid_key[:16]}_{meshmask_key[:16]}.npy"
+
+
+def read_watermask(cache_dir, transform, shape, crs, ssc_mesh):
+    """Read the water mask for a GeoTIFF grid and mesh mask from a water mask cache directory
+    that was written by :py:func:`geotiff_watermasks`.
+
+    :param str cache_dir: Water mask cache directory path.
+
+    :param transform: Affine transform of the GeoTIFF grid.
+    :type transform: :py:class:`affine.Affine`
+
+    :param tuple shape: Shape of the GeoTIFF grid.
+
+    :param crs: Coordinate reference system of the GeoTIFF grid.
+    :type crs: :py:class:`rasterio.crs.CRS` or None
+
+    :param ssc_mesh: SalishSeaCast NEMO mesh mask dataset.
+    :type ssc_mesh: :py:class:`xarray.Dataset`
+
+    :return: Boolean water mask to apply to AIS ship track density GeoTIFF files to restrict
+             them to the SalishSeaCast NEMO domain.
+    :rtype: :py:class:`numpy.ndarray`
+
+    :raises: :py:exc:`FileNotFoundError` if there is no water mask for the grid and mesh mask
+             in the cache.
+    """
+    numpy_file = calc_watermask_file(
+        cache_dir, calc_grid_key(transform, shape, crs), calc_meshmask_key(ssc_mesh)
+    )
+    if not numpy_file.exists():
+        raise FileNotFoundError(
+            f"no water mask for GeoTIFF grid and mesh mask in {cache_dir}; "
+            f"please use geotiff-watermask batch mode to calculate it"
+        )
+    logging.info(f"read water mask from: {numpy_file}")
+    return numpy.load(numpy_file, allow_pickle=False, fix_imports=False)
+
+
+def write_numpy_file(watermask, numpy_file, grid_key=None, meshmask_key=None):
     """Store a Numpy array file containing a boolean water mask to apply to
     AIS ship track density GeoTIFF files to restrict them to the SalishSeaCast NEMO domain.
 
+    If the keys of the GeoTIFF grid and mesh mask that the water mask was calculated for
+    are given, they are stored beside it in a keys file
+    (see :py:func:`calc_watermask_keys_file`) so that it can be checked against them
+    when it is read.
+
     :param watermask: Boolean water mask to apply to AIS ship track density GeoTIFF files
                       to restrict them to the SalishSeaCast NEMO domain.
     :type watermask: :py:class:`numpy.ndarray`
 
     :param str numpy_file: File path and name of Numpy array file to write the water mask to.
+
+    :param grid_key: GeoTIFF grid key from :py:func:`calc_grid_key`.
+    :type grid_key: str or None
+
+    :param meshmask_key: Mesh mask key from :py:func:`calc_meshmask_key`.
+    :type meshmask_key: str or None
     """
     numpy_path = Path(numpy_file).resolve()
     numpy.save(numpy_path, watermask, allow_pickle=False, fix_imports=False)
     logging.info(f"wrote Numpy boolean water mask array to: {numpy_path}")
+    if grid_key is not None and meshmask_key is not None:
+        numpy.savez(
+            calc_watermask_keys_file(numpy_path),
+            grid_key=numpy.array(grid_key),
+            meshmask_key=numpy.array(meshmask_key),
+        )
+
+
+def calc_watermask_keys_file(numpy_file):
+    """Calculate the path of the file that stores the keys of the GeoTIFF grid and mesh mask
+    that a water mask Numpy array file was calculated for.
+
+    :param numpy_file: File path and name of water mask Numpy array file.
+    :type numpy_file: :py:class:`pathlib.Path` or str
+
+    :rtype: :py:class:`pathlib.Path`
+    """
+    return Path(numpy_file).with_suffix(".keys.npz")
+
+
+def read_watermask_keys(numpy_file):
+    """Read the keys of the GeoTIFF grid and mesh mask that a water mask Numpy array file was
+    calculated for from the keys file that was written beside it by
+    :py:func:`write_numpy_file`.
+
+    :param numpy_file: File path and name of water mask Numpy array file.
+    :type numpy_file: :py:class:`pathlib.Path` or str
+
+    :return: 2-tuple of the GeoTIFF grid key and the mesh mask key,
+             or None if there is no keys file.
+    :rtype: tuple or None
+    """
+    keys_file = calc_watermask_keys_file(numpy_file)
+    if not keys_file.exists():
+        return None
+    with numpy.load(keys_file, allow_pickle=False) as keys:
+        return str(keys["grid_key"]), str(keys["meshmask_key"])
+
+
+def calc_water_cells(watermask):
+    """Calculate a sparse index of the water cells of a boolean water mask so that
+    calculations can be done on only the water cells instead of on masked full grids.
+
+    The index holds the flattened grid indices of the water cells in ascending order.
+
+    :param watermask: 2d boolean water mask; e.g. a GeoTIFF water mask from
+                      :py:func:`calc_watermask`, or a SalishSeaCast NEMO surface
+                      T-grid :kbd:`tmask`.
+    :type watermask: :py:class:`numpy.ndarray`
+
+    :return: Namespace of the grid :kbd:`shape` and the :kbd:`cells` array.
+    :rtype: :py:class:`types.SimpleNamespace`
+    """
+    watermask = numpy.asarray(watermask, dtype=bool)
+    return SimpleNamespace(shape=watermask.shape, cells=numpy.flatnonzero(watermask))
+
+
+def calc_tmask_water_cells(ssc_mesh):
+    """Calculate a sparse index of the SalishSeaCast NEMO surface T-grid water cells.
+
+    Please see :py:func:`calc_water_cells` for details of the index.
+
+    :param ssc_mesh: SalishSeaCast NEMO mesh mask dataset.
+    :type ssc_mesh: :py:class:`xarray.Dataset`
+
+    :rtype: :py:class:`types.SimpleNamespace`
+    """
+    return calc_water_cells(ssc_mesh.tmask.isel(t=0, z=0).values == 1)
+
+
+def write_water_cells(water_cells, npz_file, source_key=""):
+    """Store a sparse water cells index in an uncompressed Numpy :kbd:`.npz` file so that
+    its arrays can be memory-mapped by :py:func:`read_water_cells`.
+
+    :param water_cells: Water cells index from :py:func:`calc_water_cells`.
+    :type water_cells: :py:class:`types.SimpleNamespace`
+
+    :param npz_file: File path and name of Numpy :kbd:`.npz` file to write the index to.
+    :type npz_file: :py:class:`pathlib.Path` or str
+
+    :param str source_key: Key that identifies the water mask that the index was
+                           calculated from.
+    """
+    npz_path = Path(npz_file)
+    # numpy.savez() stores arrays uncompressed, so they can be memory-mapped
+    numpy.savez(
+        npz_path,
+        source_key=numpy.array(source_key),
+        shape=numpy.array(water_cells.shape),
+        cells=water_cells.cells,
+    )
+    logging.info(f"wrote water cells index to: {npz_path}")
+
+
+def read_water_cells(npz_file, mmap_mode="r"):
+    """Read a sparse water cells index from a Numpy :kbd:`.npz` file that was written by
+    :py:func:`write_water_cells`.
+
+    :param npz_file: File path and name of Numpy :kbd:`.npz` file to read the index from.
+    :type npz_file: :py:class:`pathlib.Path` or str
+
+    :param mmap_mode: Mode to memory-map the :kbd:`cells` array from the file with;
+                      it is read into memory if None.
+    :type mmap_mode: str or None
+
+    :return: Namespace of the grid :kbd:`shape`, the :kbd:`cells` array,
+             and the :kbd:`source_key` of the water mask that the index was
+             calculated from.
+    :rtype: :py:class:`types.SimpleNamespace`
+    """
+    # NpzFile reads each array only when it is accessed
+    with numpy.load(npz_file, allow_pickle=False) as npz:
+        water_cells = SimpleNamespace(
+            shape=tuple(int(size) for size in npz["shape"]),
+            source_key=str(npz["source_key"]),
+        )
+        if mmap_mode is None:
+            water_cells.cells = npz["cells"]
+            return water_cells
+    with zipfile.ZipFile(npz_file) as npz_zip:
+        water_cells.cells = _mmap_npz_member(npz_file, npz_zip, "cells.npy", mmap_mode)
+    return water_cells
+
+
+def _mmap_npz_member(npz_file, npz_zip, member, mmap_mode):
+    """
+    :param :py:class:`pathlib.Path` or str npz_file:
+    :param :py:class:`zipfile.ZipFile` npz_zip:
+    :param str member:
+    :param str mmap_mode:
+    :rtype: :py:class:`numpy.memmap` or :py:class:`numpy.ndarray`
+    """
+    info = npz_zip.getinfo(member)
+    if info.compress_type != zipfile.ZIP_STORED:
+        raise ValueError(f"{member} in {npz_file} is compressed; cannot memory-map it")
+    with open(npz_file, "rb") as f:
+        # The member's data follow its local file header, which is 30 bytes plus the
+        # lengths of the file name and extra field that are stored at its end
+        f.seek(info.header_offset + 26)
+        name_len, extra_len = numpy.frombuffer(f.read(4), dtype="<u2")
+        f.seek(info.header_offset + 30 + int(name_len) + int(extra_len))
+        version = numpy.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = numpy.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = numpy.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    if 0 in shape:
+        return numpy.empty(shape, dtype=dtype)
+    return numpy.memmap(
+        npz_file,
+        dtype=dtype,
+        mode=mmap_mode,
+        shape=shape,
+        order="F" if fortran_order else "C",
+        offset=offset,
+    )
 
 
 @click.command(
@@ -178,7 +595,73 @@ def cli(geotiff_file, meshmask_file, numpy_file, verbosity):
         stream=sys.stdout,
     )
     watermask = geotiff_watermask(geotiff_file, meshmask_file)
-    write_numpy_file(watermask, numpy_file)
+    with rasterio.open(geotiff_file) as ais_density:
+        grid_key = calc_grid_key(
+            ais_density.transform, ais_density.shape, ais_density.crs
+        )
+    with xarray.open_dataset(meshmask_file) as ssc_mesh:
+        meshmask_key = calc_meshmask_key(ssc_mesh)
+    write_numpy_file(watermask, numpy_file, grid_key, meshmask_key)
+
+
+@click.command(
+    help="""
+    Calculate and store Numpy array files containing SalishSeaCast domain water masks for all
+    of the distinct grids of the AIS ship track density GeoTIFF files in GEOTIFFS_DIR.
+
+    \b
+    The water masks are stored in CACHE_DIR in files with names that identify the GeoTIFF
+    grid and the mesh mask. The directory can be used as the geotiff watermask in the
+    random-oil-spills config file.
+    """
+)
+@click.version_option()
+@click.argument(
+    "geotiffs_dir",
+    type=click.Path(exists=True, readable=True, file_okay=False, dir_okay=True),
+)
+@click.argument(
+    "meshmask_file",
+    type=click.Path(exists=True, readable=True, file_okay=True, dir_okay=False),
+)
+@click.argument("cache_dir", type=click.Path(file_okay=False, writable=True))
+@click.option(
+    "-v",
+    "--verbosity",
+    default="warning",
+    show_default=True,
+    type=click.Choice(("debug", "info", "warning", "error", "critical")),
+    help="""
+        Choose how much information you want to see about the progress of the calculation;
+        warning, error, and critical should be silent unless something bad goes wrong. 
+    """,
+)
+def batch_cli(geotiffs_dir, meshmask_file, cache_dir, verbosity):
+    """Command-line interface for :py:func:`moad_tools.midoss.geotiff_watermask.geotiff_watermasks`.
+
+    :param str geotiffs_dir: Directory path to read AIS ship tracks GeoTIFF files from.
+
+    :param str meshmask_file: File path and name of a SalishSeaCast NEMO mesh mask file to use
+                              the NEMO grid lons/lats and T-grid water/land maks from to
+                              calculate the water masks.
+
+    :param str cache_dir: Directory path to store the water mask Numpy array files in.
+
+    :param str verbosity: Verbosity level of logging messages about the progress of the
+                          transformation.
+                          Choices are :kbd:`debug, info, warning, error, critical`.
+                          :kbd:`warning`, :kbd:`error`, and :kbd:`critical` should be silent
+                          unless something bad goes wrong.
+                          Default is :kbd:`warning`.
+    """
+    logging_level = getattr(logging, verbosity.upper())
+    logging.basicConfig(
+        level=logging_level,
+        format="%(asctime)s geotiff-watermask %(levelname)s %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+        stream=sys.stdout,
+    )
+    geotiff_watermasks(geotiffs_dir, meshmask_file, cache_dir)
 
 
 # This stanza facilitates running the script in a Python debugger
@@ -14,88 +14,1067 @@
 # limitations under the License.
 """Functions to transform an MOHID HDF5 output file into a netCDF4 file.
 """
+import collections
+import concurrent.futures
+import contextlib
+import fnmatch
+import glob
+import json
 import logging
+import multiprocessing
 import os
-import shlex
-import subprocess
+import resource
+import signal
 import sys
-import tempfile
+import threading
+import time
 from pathlib import Path
 from types import SimpleNamespace
 
 import arrow
 import click
+import netCDF4
 import numpy
 import tables
 import xarray
+import xarray.conventions
 
 logging.getLogger(__name__).addHandler(logging.NullHandler())
 
+# Number of consecutive time steps that a worker process reads and packs in one task
+TIMESTEPS_PER_TASK = 4
 
-def hdf5_to_netcdf4(hdf5_file, netcdf4_file):
+# Encoding profiles for the fields in the netCDF4 file:
+#
+# * chunks: Chunk size for dimensions of the fields; dimensions that are not listed are not
+#           split, and no chunk sizes means that the netCDF4 library's default chunking is used
+# * complevel: zlib deflate level
+# * shuffle: Use the HDF5 shuffle filter to improve deflation of integers
+# * int16: Pack the fields whose scaled values fit in int16 as int16 instead of int32;
+#          requires a scan of all of the fields before the netCDF4 file is written
+ENCODING_PROFILES = {
+    # What hdf5_to_netcdf4 has always written
+    "default": SimpleNamespace(chunks=None, complevel=4, shuffle=True, int16=False),
+    # Depth level maps; e.g. the surface level at all time steps
+    "maps": SimpleNamespace(
+        chunks={"time": 1, "grid_z": 1}, complevel=4, shuffle=True, int16=False
+    ),
+    # Time series at points or in small regions
+    "timeseries": SimpleNamespace(
+        chunks={"time": 1, "grid_y": 32, "grid_x": 32},
+        complevel=4,
+        shuffle=True,
+        int16=False,
+    ),
+    # Smallest files for archiving ensembles that are read as depth level maps
+    "compact": SimpleNamespace(
+        chunks={"time": 1, "grid_z": 1}, complevel=6, shuffle=True, int16=True
+    ),
+}
+
+# Scale factor and fill value of the fields packed as integers
+SCALE_FACTOR = 1e-4
+FILL_VALUE = -9999
+
+# Largest magnitude of a packed int16 value
+INT16_MAX = numpy.iinfo(numpy.int16).max
+
+# Names of the (y, x) fields that are written once for the whole run instead of
+# at each time step
+OIL_TIMES_VARS = ("Beaching Time", "Oil Arrival Time", "Beaching Volume")
+
+# Output formats, and the file name suffixes that batch transformations use for them
+OUTPUT_FORMATS = {"netcdf4": ".nc", "zarr": ".zarr"}
+
+# Global attribute that records the number of time steps that have been completely
+# written to the output, so that interrupted transformations can be resumed
+TIMESTEPS_ATTR = "mohid_hdf5_timesteps"
+
+# Global attributes that mark the output as completely transformed from the present
+# version of the HDF5 file
+COMPLETION_ATTRS = ("mohid_hdf5_size", "mohid_hdf5_mtime_ns")
+
+# Sparse layouts for the time-dependent fields, in which only the cells whose packed
+# values are not zero are stored, in CF contiguous ragged arrays along a
+# {name}_cell dimension, with the number of cells at each time step in {name}_count:
+#
+# * coo: The flat (z, y, x) or (y, x) indices of the cells in {name}_index
+# * bbox: The packed values in the bounding box of the cells, with its start and stop
+#         indices in {name}_bbox
+SPARSE_LAYOUTS = ("coo", "bbox")
+
+# Suffix of the names of the ragged dimensions of sparse fields
+CELL_DIM_SUFFIX = "_cell"
+
+# Chunk size of the ragged variables of sparse fields
+SPARSE_CHUNK_CELLS = 2**16
+
+# Encoding keys that determine how field values are packed, as opposed to how they
+# are stored
+PACKING_ENCODING_KEYS = {"dtype", "units", "scale_factor", "_FillValue"}
+
+
+def hdf5_to_netcdf4(
+    hdf5_file,
+    netcdf4_file,
+    jobs=1,
+    profile="default",
+    variables=None,
+    z_range=None,
+    surface_only=False,
+    output_format="netcdf4",
+    resume=False,
+    max_memory=None,
+    sparse=None,
+):
     """Transform selected contents of a MOHID HDF5 results file HDF5_FILE into a netCDF4 file
     stored as NETCDF4_FILE.
     \f
 
+    The netCDF4 file is created with the fields and an unlimited time dimension,
+    and the fields at each time step are appended to it as they are read from the HDF5 file.
+    The (z, y, x) fields are read, packed, and written in slabs of depth levels
+    in buffers that are reused for all of the fields and time steps;
+    please see :py:func:`calc_slab_levels`.
+    The peak resident memory of the process and its worker processes is logged
+    when the transformation is finished.
+
+    If :kbd:`jobs` is greater than 1, all of the time steps are read and packed in
+    ranges of :py:data:`TIMESTEPS_PER_TASK` time steps by a pool of worker processes,
+    and appended to the netCDF4 file in time order as the ranges are finished.
+    The number of packed ranges that are held in memory is limited by :kbd:`max_memory`.
+
+    Only the selected fields and depth levels are read from the HDF5 file;
+    please see :py:func:`calc_selection`.
+
+    If :kbd:`output_format` is :kbd:`zarr`, a Zarr directory store with the same variables,
+    attributes, and encoding is written instead of a netCDF4 file.
+    Each time step is stored in its own chunks, so the store can be read in parallel
+    without the HDF5 library's global lock.
+    Its metadata is consolidated when the transformation is finished.
+
+    The number of time steps that have been completely written is recorded in the
+    :py:data:`TIMESTEPS_ATTR` global attribute as they are appended.
+    If :kbd:`resume` is True and the output was started from the same HDF5 file with the
+    same profile and selection, only the time steps after those are read and appended,
+    and the oil beaching and arrival times are rewritten.
+    That resumes transformations that were interrupted, and extends the output of HDF5
+    files that are still being written by MOHID as their time steps appear.
+    Fields that are packed as int16 keep that type when a transformation is resumed;
+    a :py:exc:`ValueError` is raised if a new value doesn't fit in it.
+
+    If :kbd:`sparse` is one of :py:data:`SPARSE_LAYOUTS`, the time-dependent fields are
+    stored as the oil footprint at each time step instead of on the whole grid,
+    so the size of the output, and the time to scan it, scale with the footprint.
+    Please see :py:func:`read_dense_field` to read them back on the grid.
+
     :param hdf5_file: File path and name of MOHID HDF5 results file to read from.
     :type hdf5_file: :py:class:`pathlib.Path` or str
 
-    :param netcdf4_file: File path and name of netCDF4 file to write to.
+    :param netcdf4_file: File path and name of netCDF4 file, or directory of Zarr store
+                         to write to.
     :type netcdf4_file: :py:class:`pathlib.Path` or str
+
+    :param int jobs: Number of worker processes to read and pack time steps in.
+
+    :param str profile: Name of the encoding profile in :py:data:`ENCODING_PROFILES`
+                        to use for the fields.
+
+    :param variables: Names or glob patterns of the netCDF4 names of the fields to write;
+                      all fields are written if None.
+    :type variables: list or None
+
+    :param z_range: Inclusive range of depth level indices of the (z, y, x) fields to write;
+                    all depth levels are written if None.
+    :type z_range: 2-tuple of int or None
+
+    :param boolean surface_only: Write only the surface depth level of the (z, y, x) fields.
+
+    :param str output_format: Format to write; a key of :py:data:`OUTPUT_FORMATS`.
+
+    :param boolean resume: Append only the time steps that are missing from the output
+                           of an earlier transformation.
+
+    :param max_memory: Budget in MiB for the field values that are held in memory while
+                       they are read, packed, and written; no budget if None.
+    :type max_memory: int or None
+
+    :param sparse: Sparse layout in :py:data:`SPARSE_LAYOUTS` to store the time-dependent
+                   fields in; they are stored on the whole grid if None.
+    :type sparse: str or None
     """
     with tables.open_file(hdf5_file) as h5file:
         logging.info(f"reading MOHID hdf5 results from: {hdf5_file}")
-        timestep_files = []
-        with tempfile.TemporaryDirectory(dir=os.environ.get("SLURM_TMPDIR")) as tmp_dir:
-            tmp_dir_path = Path(tmp_dir)
-            netcdf4_file = Path(netcdf4_file)
-            grid_indices, timestep_file = _init_dataset(
-                h5file, netcdf4_file, tmp_dir_path
+        netcdf4_file = Path(netcdf4_file)
+        selection = calc_selection(h5file, variables, z_range, surface_only)
+        slab_levels = calc_slab_levels(h5file, selection, max_memory)
+        settings_attrs = _calc_settings_attrs(
+            hdf5_file, profile, variables, z_range, surface_only, sparse
+        )
+        resume_state = (
+            _read_resume_state(netcdf4_file, output_format, settings_attrs)
+            if resume
+            else None
+        )
+        if resume_state is None:
+            encoding_spec = calc_encoding_spec(
+                h5file, profile, selection, slab_levels=slab_levels, sparse=sparse
+            )
+            grid_indices = _init_dataset(
+                h5file, netcdf4_file, encoding_spec, selection, output_format
             )
-            timestep_files.append(timestep_file)
-            for index in range(2, h5file.root.Time._v_nchildren + 1):
-                timestep_files.append(
-                    _calc_timestep_file(
-                        grid_indices, h5file, index, netcdf4_file, tmp_dir_path
+            timesteps_written = 0
+        else:
+            encoding_spec = calc_encoding_spec(
+                h5file, profile, selection, resume_state.packed_dtypes, sparse=sparse
+            )
+            z_index, y_index, _, x_index, _ = _calc_zyx_indices(
+                h5file, selection.z_slice
+            )
+            grid_indices = SimpleNamespace(
+                z_index=z_index, y_index=y_index, x_index=x_index
+            )
+            timesteps_written = resume_state.timesteps
+            logging.info(
+                f"resuming after {timesteps_written} time steps in: {netcdf4_file}"
+            )
+        # The output is not complete until all of the time steps have been appended
+        _update_output_attrs(
+            netcdf4_file,
+            output_format,
+            {**settings_attrs, TIMESTEPS_ATTR: timesteps_written},
+            delete=COMPLETION_ATTRS,
+        )
+        indices = range(
+            timesteps_written + 1, _calc_timestep_count(h5file, selection) + 1
+        )
+        # Time steps are written at their time indices rather than appended after the
+        # last ones in the output, so that the fields of a time step that was partly
+        # written before an interruption are overwritten
+        with _open_for_writing(netcdf4_file, output_format) as output:
+            if jobs > 1:
+                packed_timesteps = _pack_timesteps_parallel(
+                    h5file,
+                    indices,
+                    encoding_spec,
+                    selection,
+                    slab_levels,
+                    jobs,
+                    max_memory,
+                )
+                for time_index, packed_vars in enumerate(
+                    packed_timesteps, start=timesteps_written
+                ):
+                    _write_packed_timestep(
+                        packed_vars, output, output_format, time_index, encoding_spec
                     )
+            else:
+                buffers = _alloc_slab_buffers(h5file, selection, slab_levels)
+                for time_index, index in enumerate(indices, start=timesteps_written):
+                    _write_timestep(
+                        h5file,
+                        index,
+                        output,
+                        output_format,
+                        time_index,
+                        encoding_spec,
+                        selection,
+                        buffers,
+                    )
+        _write_oil_times(
+            grid_indices, h5file, netcdf4_file, encoding_spec, selection, output_format
+        )
+    _write_source_attrs(
+        hdf5_file,
+        netcdf4_file,
+        profile,
+        variables,
+        z_range,
+        surface_only,
+        output_format,
+        sparse,
+    )
+    logging.info(f"created MOHID {output_format} results in: {netcdf4_file}")
+    _log_peak_memory()
+
+
+def hdf5_to_netcdf4_batch(
+    hdf5_files,
+    output_dir=None,
+    jobs=1,
+    manifest_file=None,
+    profile="default",
+    variables=None,
+    z_range=None,
+    surface_only=False,
+    output_format="netcdf4",
+    resume=False,
+    max_memory=None,
+    sparse=None,
+):
+    """Transform many MOHID HDF5 results files into netCDF4 files in one process,
+    using a pool of worker processes that each transform one file at a time.
+
+    Files whose netCDF4 file is up to date are skipped;
+    please see :py:func:`is_up_to_date`.
+    A failure to transform a file is recorded, and does not stop the transformation of the
+    other files.
+
+    :param list hdf5_files: File paths and names of MOHID HDF5 results files to read from.
+
+    :param output_dir: Directory to write the netCDF4 files in, under the same relative paths
+                       as the HDF5 files have from their common parent directory;
+                       the netCDF4 files are written beside the HDF5 files if None.
+    :type output_dir: :py:class:`pathlib.Path` or str or None
+
+    :param int jobs: Number of worker processes to transform files in.
+
+    :param manifest_file: File path and name of JSON file to write the manifest of
+                          transformation timings and failures to;
+                          no manifest file is written if None.
+    :type manifest_file: :py:class:`pathlib.Path` or str or None
+
+    :param str profile: Name of the encoding profile in :py:data:`ENCODING_PROFILES`
+                        to use for the fields.
+
+    :param variables: Names or glob patterns of the netCDF4 names of the fields to write;
+                      all fields are written if None.
+    :type variables: list or None
+
+    :param z_range: Inclusive range of depth level indices of the (z, y, x) fields to write;
+                    all depth levels are written if None.
+    :type z_range: 2-tuple of int or None
+
+    :param boolean surface_only: Write only the surface depth level of the (z, y, x) fields.
+
+    :param str output_format: Format to write; a key of :py:data:`OUTPUT_FORMATS`.
+
+    :param boolean resume: Append only the time steps that are missing from the outputs of
+                           earlier transformations.
+                           Please see :py:func:`hdf5_to_netcdf4`.
+
+    :param max_memory: Budget in MiB for the field values that are held in memory while
+                       each file is transformed; no budget if None.
+    :type max_memory: int or None
+
+    :param sparse: Sparse layout in :py:data:`SPARSE_LAYOUTS` to store the time-dependent
+                   fields in; they are stored on the whole grid if None.
+    :type sparse: str or None
+
+    :return: Manifest dict of transformation timings and failures.
+    :rtype: dict
+    """
+    hdf5_paths = [Path(hdf5_file) for hdf5_file in hdf5_files]
+    netcdf4_paths = calc_batch_netcdf4_files(
+        hdf5_paths, output_dir, OUTPUT_FORMATS[output_format]
+    )
+    manifest = {
+        "started": arrow.now().isoformat(),
+        "jobs": jobs,
+        "profile": profile,
+        "output_format": output_format,
+        "sparse": sparse,
+        "runs": [],
+    }
+    to_convert = []
+    for hdf5_path, netcdf4_path in zip(hdf5_paths, netcdf4_paths):
+        if is_up_to_date(
+            hdf5_path,
+            netcdf4_path,
+            profile,
+            variables,
+            z_range,
+            surface_only,
+            output_format,
+            sparse,
+        ):
+            logging.info(f"skipped up to date: {netcdf4_path}")
+            manifest["runs"].append(
+                {
+                    "hdf5_file": os.fspath(hdf5_path),
+                    "netcdf4_file": os.fspath(netcdf4_path),
+                    "status": "skipped",
+                }
+            )
+        else:
+            to_convert.append((hdf5_path, netcdf4_path))
+    _write_manifest(manifest, manifest_file)
+    logging.info(
+        f"transforming {len(to_convert)} of {len(hdf5_paths)} MOHID HDF5 results files "
+        f"in {jobs} worker processes"
+    )
+    # Workers are spawned rather than forked so that they don't inherit HDF5 library state
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures = {
+            executor.submit(
+                _convert_batch_file,
+                hdf5_path,
+                netcdf4_path,
+                profile,
+                variables,
+                z_range,
+                surface_only,
+                output_format,
+                resume,
+                max_memory,
+                sparse,
+            ): (hdf5_path, netcdf4_path)
+            for hdf5_path, netcdf4_path in to_convert
+        }
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                run = future.result()
+            except Exception as exc:
+                # Failures of the transformations are caught in the workers, so this is
+                # a failure of the worker itself; e.g. a BrokenProcessPool from a worker
+                # that was killed for running out of memory
+                hdf5_path, netcdf4_path = futures[future]
+                run = {
+                    "hdf5_file": os.fspath(hdf5_path),
+                    "netcdf4_file": os.fspath(netcdf4_path),
+                    "status": "failed",
+                    "error": f"{type(exc).__name__}: {exc}",
+                }
+            if run["status"] == "failed":
+                logging.error(f"failed to transform {run['hdf5_file']}: {run['error']}")
+            else:
+                logging.info(
+                    f"transformed {run['hdf5_file']} in {run['seconds']:.1f}s "
+                    f"to: {run['netcdf4_file']}"
                 )
-            _concat_timestep_files(timestep_files, netcdf4_file)
-            oil_times_file = _calc_oil_times_file(
-                grid_indices, h5file, netcdf4_file, tmp_dir_path
+            manifest["runs"].append(run)
+            # Rewrite the manifest as each run finishes so that it records the runs
+            # that finished before a batch that is killed
+            _write_manifest(manifest, manifest_file)
+    manifest["finished"] = arrow.now().isoformat()
+    _write_manifest(manifest, manifest_file)
+    if manifest_file is not None:
+        logging.info(f"wrote batch manifest to: {manifest_file}")
+    return manifest
+
+
+def _write_manifest(manifest, manifest_file):
+    """
+    :param dict manifest:
+    :param manifest_file:
+    :type manifest_file: :py:class:`pathlib.Path` or str or None
+    """
+    for status in ("converted", "skipped", "failed"):
+        manifest[f"n_{status}"] = sum(
+            run["status"] == status for run in manifest["runs"]
+        )
+    if manifest_file is None:
+        return
+    manifest_path = Path(manifest_file)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    # Write to a temporary file and rename it so that the manifest is never left half
+    # written
+    tmp_path = manifest_path.with_name(f"{manifest_path.name}.tmp")
+    with tmp_path.open("wt") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def calc_batch_netcdf4_files(hdf5_files, output_dir=None, suffix=".nc"):
+    """Calculate the netCDF4 file paths and names for a batch of MOHID HDF5 results files.
+
+    :param list hdf5_files: File paths and names of MOHID HDF5 results files.
+
+    :param output_dir: Directory to put the netCDF4 files in, under the same relative paths
+                       as the HDF5 files have from their common parent directory;
+                       the netCDF4 files are put beside the HDF5 files if None.
+    :type output_dir: :py:class:`pathlib.Path` or str or None
+
+    :param str suffix: File name suffix of the netCDF4 files, or of the Zarr stores.
+
+    :rtype: list of :py:class:`pathlib.Path`
+    """
+    hdf5_paths = [Path(hdf5_file).resolve() for hdf5_file in hdf5_files]
+    if output_dir is None or not hdf5_paths:
+        return [hdf5_path.with_suffix(suffix) for hdf5_path in hdf5_paths]
+    common_dir = Path(
+        os.path.commonpath([hdf5_path.parent for hdf5_path in hdf5_paths])
+    )
+    return [
+        Path(output_dir) / hdf5_path.relative_to(common_dir).with_suffix(suffix)
+        for hdf5_path in hdf5_paths
+    ]
+
+
+def is_up_to_date(
+    hdf5_file,
+    netcdf4_file,
+    profile="default",
+    variables=None,
+    z_range=None,
+    surface_only=False,
+    output_format="netcdf4",
+    sparse=None,
+):
+    """Check whether a netCDF4 file was completely transformed from the present version of
+    a MOHID HDF5 results file with an encoding profile, selection of fields and
+    depth levels, and sparse layout.
+
+    :py:func:`hdf5_to_netcdf4` records the size and modification time of the HDF5 file,
+    the encoding profile, the selection, and the sparse layout in the global attributes of the netCDF4 file
+    when it finishes transforming it.
+
+    :param hdf5_file: File path and name of MOHID HDF5 results file.
+    :type hdf5_file: :py:class:`pathlib.Path` or str
+
+    :param netcdf4_file: File path and name of netCDF4 file, or directory of Zarr store.
+    :type netcdf4_file: :py:class:`pathlib.Path` or str
+
+    :param str profile: Name of the encoding profile in :py:data:`ENCODING_PROFILES`.
+
+    :param variables: Names or glob patterns of the netCDF4 names of the selected fields;
+                      all fields if None.
+    :type variables: list or None
+
+    :param z_range: Inclusive range of selected depth level indices;
+                    all depth levels if None.
+    :type z_range: 2-tuple of int or None
+
+    :param boolean surface_only: Only the surface depth level is selected.
+
+    :param str output_format: Format of the output; a key of :py:data:`OUTPUT_FORMATS`.
+
+    :param sparse: Sparse layout in :py:data:`SPARSE_LAYOUTS`; None for fields on the
+                   whole grid.
+    :type sparse: str or None
+
+    :rtype: boolean
+    """
+    if not Path(netcdf4_file).exists():
+        return False
+    source_attrs = _calc_source_attrs(
+        hdf5_file, profile, variables, z_range, surface_only, sparse
+    )
+    try:
+        output_attrs = _read_output_attrs(netcdf4_file, output_format)
+    except OSError:
+        # Unreadable, probably partly written, output
+        return False
+    return {
+        name: output_attrs[name] for name in source_attrs if name in output_attrs
+    } == source_attrs
+
+
+def iter_sparse_cells(ds, name, time_indices=None):
+    """Iterate over the cells of a sparse field at each time step of a dataset written by
+    :py:func:`hdf5_to_netcdf4`.
+
+    Only the cells of the requested time steps are read, so the time to scan a sparse field
+    scales with its oil footprint rather than with the size of the grid.
+
+    :param ds: Dataset opened by xarray with its default decoding of packed values.
+    :type ds: :py:class:`xarray.Dataset`
+
+    :param str name: Name of the sparse field.
+
+    :param time_indices: Increasing indices of the time steps to read;
+                         all of the time steps if None.
+    :type time_indices: sequence of int or None
+
+    :return: Time index, flat indices of the cells on the (z, y, x) or (y, x) grid,
+             and values of the cells, at each time step.
+    :rtype: generator of 3-tuples
+    """
+    var = ds[name]
+    grid_shape = tuple(ds.sizes[dim] for dim in var.attrs["dense_dims"].split()[1:])
+    counts = ds[f"{name}_count"].values
+    offsets = numpy.concatenate(([0], numpy.cumsum(counts)))
+    if time_indices is None:
+        time_indices = range(counts.size)
+    if not len(time_indices):
+        return
+    # The cells of consecutive time steps are contiguous, so they are read in one run
+    start, stop = offsets[time_indices[0]], offsets[time_indices[-1] + 1]
+    values = var[start:stop].values
+    if var.attrs["sparse_layout"] == "coo":
+        indices = ds[f"{name}_index"][start:stop].values
+    else:
+        bboxes = ds[f"{name}_bbox"].values
+    for time_index in time_indices:
+        cells = slice(offsets[time_index] - start, offsets[time_index + 1] - start)
+        if var.attrs["sparse_layout"] == "coo":
+            yield time_index, indices[cells], values[cells]
+            continue
+        starts, stops = bboxes[time_index, ::2], bboxes[time_index, 1::2]
+        box_cells = numpy.indices(stops - starts).reshape(len(grid_shape), -1)
+        yield time_index, numpy.ravel_multi_index(
+            tuple(box_cells + starts[:, numpy.newaxis]), grid_shape
+        ), values[cells]
+
+
+def read_dense_field(ds, name, time_indices=None):
+    """Read a field of a dataset written by :py:func:`hdf5_to_netcdf4` on its whole grid,
+    whether it is stored on the grid, or in one of the :py:data:`SPARSE_LAYOUTS`.
+
+    :param ds: Dataset opened by xarray with its default decoding of packed values.
+    :type ds: :py:class:`xarray.Dataset`
+
+    :param str name: Name of the field.
+
+    :param time_indices: Increasing indices of the time steps to read;
+                         all of the time steps if None.
+    :type time_indices: sequence of int or None
+
+    :return: Field with (time, grid_z, grid_y, grid_x) or (time, grid_y, grid_x)
+             dimensions, in which the cells outside of a sparse field's footprint are zero.
+    :rtype: :py:class:`xarray.DataArray`
+    """
+    var = ds[name]
+    if time_indices is None:
+        time_indices = range(ds.sizes["time"])
+    if "sparse_layout" not in var.attrs:
+        return var.isel(time=list(time_indices))
+    dims = var.attrs["dense_dims"].split()
+    dense = numpy.zeros(
+        (len(time_indices), *(ds.sizes[dim] for dim in dims[1:])), dtype=var.dtype
+    )
+    flat_dense = dense.reshape(len(time_indices), -1)
+    for i, (_, indices, values) in enumerate(iter_sparse_cells(ds, name, time_indices)):
+        flat_dense[i, indices] = values
+    return xarray.DataArray(
+        name=name,
+        data=dense,
+        coords={
+            dim: ds[dim].isel(time=list(time_indices)) if dim == "time" else ds[dim]
+            for dim in dims
+        },
+        dims=dims,
+        attrs={
+            attr: value
+            for attr, value in var.attrs.items()
+            if attr not in ("sparse_layout", "dense_dims")
+        },
+    )
+
+
+def _convert_batch_file(
+    hdf5_file,
+    netcdf4_file,
+    profile,
+    variables,
+    z_range,
+    surface_only,
+    output_format,
+    resume,
+    max_memory,
+    sparse,
+):
+    """
+    :param :py:class:`pathlib.Path` hdf5_file:
+    :param :py:class:`pathlib.Path` netcdf4_file:
+    :param str profile:
+    :param list or None variables:
+    :param 2-tuple or None z_range:
+    :param boolean surface_only:
+    :param str output_format:
+    :param boolean resume:
+    :param int or None max_memory:
+    :param str or None sparse:
+    :rtype: dict
+    """
+    run = {
+        "hdf5_file": os.fspath(hdf5_file),
+        "netcdf4_file": os.fspath(netcdf4_file),
+    }
+    start = time.perf_counter()
+    try:
+        netcdf4_file.parent.mkdir(parents=True, exist_ok=True)
+        hdf5_to_netcdf4(
+            hdf5_file,
+            netcdf4_file,
+            profile=profile,
+            variables=variables,
+            z_range=z_range,
+            surface_only=surface_only,
+            output_format=output_format,
+            resume=resume,
+            max_memory=max_memory,
+            sparse=sparse,
+        )
+        run["status"] = "converted"
+    except Exception as exc:
+        run.update({"status": "failed", "error": f"{type(exc).__name__}: {exc}"})
+    run["seconds"] = time.perf_counter() - start
+    return run
+
+
+def calc_selection(h5file, variables=None, z_range=None, surface_only=False):
+    """Calculate the selection of fields and depth levels of a MOHID HDF5 results file
+    to transform into a netCDF4 file.
+
+    Fields are selected by their netCDF4 names; i.e. their HDF5 group names with spaces
+    replaced by underscores.
+    The selected depth levels are read from the HDF5 datasets of the (z, y, x) fields,
+    so the other levels are never decompressed.
+    The depth level index coordinate of the netCDF4 file keeps the indices of the selected
+    levels in the MOHID grid.
+
+    :param h5file: MOHID HDF5 results file.
+    :type h5file: :py:class:`tables.File`
+
+    :param variables: Names or glob patterns of the netCDF4 names of the fields to select;
+                      all fields are selected if None.
+    :type variables: list or None
+
+    :param z_range: Inclusive range of depth level indices of the (z, y, x) fields
+                    to select; all depth levels are selected if None.
+    :type z_range: 2-tuple of int or None
+
+    :param boolean surface_only: Select only the surface depth level of the (z, y, x) fields;
+                                 i.e. the last level in the MOHID grid.
+
+    :return: Namespace of the :kbd:`variables` set of netCDF4 names of the selected fields,
+             and the :kbd:`z_slice` of the selected depth levels.
+    :rtype: :py:class:`types.SimpleNamespace`
+    """
+    oil_spill = h5file.root.Results.OilSpill
+    names = [
+        group._v_name.replace(" ", "_")
+        for group in (*oil_spill.Data_2D, *oil_spill.Data_3D)
+    ]
+    if variables is None:
+        selected = set(names)
+    else:
+        selected = set()
+        for pattern in variables:
+            matches = fnmatch.filter(names, pattern)
+            if not matches:
+                raise ValueError(
+                    f"no fields match {pattern}; choose from: {', '.join(names)}"
+                )
+            selected.update(matches)
+    z_count = oil_spill.Data_3D.OilConcentration_3D.OilConcentration_3D_00001.shape[0]
+    if surface_only and z_range is not None:
+        raise ValueError("choose either a depth level range or only the surface level")
+    if surface_only:
+        z_range = (z_count - 1, z_count - 1)
+    if z_range is None:
+        z_slice = slice(0, z_count)
+    else:
+        z_start, z_stop = z_range
+        if not 0 <= z_start <= z_stop < z_count:
+            raise ValueError(
+                f"invalid depth level range {z_start} to {z_stop}; "
+                f"levels are 0 to {z_count - 1}"
             )
-            _append_oil_times_file(oil_times_file, netcdf4_file)
-    logging.info(f"created MOHID netCDF4 results in: {netcdf4_file}")
+        z_slice = slice(z_start, z_stop + 1)
+    logging.info(
+        f"selected {len(selected)} of {len(names)} fields, and depth levels "
+        f"{z_slice.start} to {z_slice.stop - 1}"
+    )
+    return SimpleNamespace(variables=selected, z_slice=z_slice)
+
+
+def calc_encoding_spec(
+    h5file,
+    profile="default",
+    selection=None,
+    packed_dtypes=None,
+    slab_levels=None,
+    sparse=None,
+):
+    """Calculate the specification of how to encode the fields of a MOHID HDF5 results file
+    in a netCDF4 file with an encoding profile.
+
+    If the profile packs fields as int16 where their range allows, all of the time steps of
+    the fields are scanned to find the fields whose largest magnitude scaled value fits in
+    int16.
+
+    :param h5file: MOHID HDF5 results file.
+    :type h5file: :py:class:`tables.File`
 
+    :param str profile: Name of the encoding profile in :py:data:`ENCODING_PROFILES`.
 
-def _init_dataset(h5file, netcdf4_file, tmp_dir):
+    :param selection: Selection of fields and depth levels to scan;
+                      all of them if None.
+                      Please see :py:func:`calc_selection`.
+    :type selection: :py:class:`types.SimpleNamespace` or None
+
+    :param packed_dtypes: Fields that are packed as a different type than int32,
+                          instead of the ones found by scanning the fields;
+                          e.g. those of an output that is being resumed.
+    :type packed_dtypes: dict or None
+
+    :param slab_levels: Number of depth levels of the (z, y, x) fields to scan at a time;
+                        all of the selected levels if None.
+                        Please see :py:func:`calc_slab_levels`.
+    :type slab_levels: int or None
+
+    :param sparse: Sparse layout in :py:data:`SPARSE_LAYOUTS` to store the time-dependent
+                   fields in; they are stored on the whole grid if None.
+    :type sparse: str or None
+
+    :return: Namespace of the profile's :kbd:`chunks`, :kbd:`complevel`, and :kbd:`shuffle`,
+             the :kbd:`packed_dtypes` dict of fields that are packed as a different
+             type than int32, and the :kbd:`sparse` layout of the time-dependent fields.
+    :rtype: :py:class:`types.SimpleNamespace`
+    """
+    encoding_profile = ENCODING_PROFILES[profile]
+    if selection is None:
+        selection = calc_selection(h5file)
+    if packed_dtypes is None:
+        packed_dtypes = {}
+        if encoding_profile.int16:
+            logging.info("scanning fields for ranges that fit in int16")
+            buffers = _alloc_slab_buffers(
+                h5file,
+                selection,
+                slab_levels or selection.z_slice.stop - selection.z_slice.start,
+            )
+            for group in _iter_field_groups(h5file, selection):
+                max_abs = max(
+                    max(numpy.nanmax(slab, initial=0), -numpy.nanmin(slab, initial=0))
+                    for field in group
+                    for _, slab in _iter_field_slabs(field, selection.z_slice, buffers)
+                )
+                if numpy.around(max_abs / SCALE_FACTOR) <= INT16_MAX:
+                    packed_dtypes[group._v_name.replace(" ", "_")] = numpy.int16
+    logging.info(f"packing {len(packed_dtypes)} fields as int16")
+    return SimpleNamespace(
+        chunks=encoding_profile.chunks,
+        complevel=encoding_profile.complevel,
+        shuffle=encoding_profile.shuffle,
+        packed_dtypes=packed_dtypes,
+        sparse=sparse,
+    )
+
+
+def calc_slab_levels(h5file, selection, max_memory=None):
+    """Calculate the number of depth levels of the (z, y, x) fields of a MOHID HDF5 results
+    file to read, pack, and write at a time to stay within a memory budget.
+
+    Each slab of depth levels of a field is read into one buffer, and packed into another
+    in the (z, y, x) order of the netCDF4 file, from which it is written.
+    The buffers are sized for the largest field, and reused for all of the fields and
+    time steps.
+
+    :param h5file: MOHID HDF5 results file.
+    :type h5file: :py:class:`tables.File`
+
+    :param selection: Selection of fields and depth levels to transform.
+                      Please see :py:func:`calc_selection`.
+    :type selection: :py:class:`types.SimpleNamespace`
+
+    :param max_memory: Budget in MiB for the slab buffers;
+                       all of the selected depth levels are processed at once if None.
+    :type max_memory: int or None
+
+    :rtype: int
+    """
+    z_count = selection.z_slice.stop - selection.z_slice.start
+    level_nbytes = max(
+        (
+            _calc_slab_nbytes(field, 1)
+            for field in (
+                _get_field(group, 1) for group in _iter_field_groups(h5file, selection)
+            )
+            if field.ndim == 3
+        ),
+        default=0,
+    )
+    if max_memory is None or level_nbytes == 0:
+        return z_count
+    slab_levels = min(z_count, max_memory * 2**20 // level_nbytes)
+    if slab_levels < 1:
+        logging.warning(
+            f"max memory of {max_memory} MiB is less than the "
+            f"{level_nbytes / 2**20:.1f} MiB needed for 1 depth level; "
+            f"processing 1 depth level at a time"
+        )
+        slab_levels = 1
+    logging.info(f"processing (z, y, x) fields in slabs of {slab_levels} depth levels")
+    return slab_levels
+
+
+def _iter_field_groups(h5file, selection):
+    """
+    :param :py:class:`tables.File` h5file:
+    :param :py:class:`types.SimpleNamespace` selection:
+    :rtype: generator
+    """
+    for group in h5file.root.Results.OilSpill.Data_2D:
+        if group._v_name in OIL_TIMES_VARS:
+            continue
+        if _is_selected(group, selection):
+            yield group
+    for group in h5file.root.Results.OilSpill.Data_3D:
+        if _is_selected(group, selection):
+            yield group
+
+
+def _is_selected(group, selection):
+    """
+    :param :py:class:`tables.Group` group:
+    :param :py:class:`types.SimpleNamespace` selection:
+    :rtype: boolean
+    """
+    return group._v_name.replace(" ", "_") in selection.variables
+
+
+def _get_field(group, index):
+    """
+    :param :py:class:`tables.Group` group:
+    :param int index:
+    :rtype: :py:class:`tables.Array`
+    """
+    return getattr(group, f"{group._v_name}_{index:05d}")
+
+
+def _calc_slab_nbytes(field, slab_levels):
+    """
+    :param :py:class:`tables.Array` field:
+    :param int slab_levels:
+    :rtype: int
+    """
+    size = int(numpy.prod(field.shape[1:] if field.ndim == 3 else field.shape))
+    if field.ndim == 3:
+        size *= min(slab_levels, field.shape[0])
+    # A read buffer of the field's type, and a packed buffer of the widest packed type
+    return size * (field.dtype.itemsize + numpy.dtype(numpy.int32).itemsize)
+
+
+def _alloc_slab_buffers(h5file, selection, slab_levels):
+    """
+    :param :py:class:`tables.File` h5file:
+    :param :py:class:`types.SimpleNamespace` selection:
+    :param int slab_levels:
+    :rtype: :py:class:`types.SimpleNamespace`
+    """
+    read_nbytes, packed_nbytes = 0, 0
+    for group in _iter_field_groups(h5file, selection):
+        field = _get_field(group, 1)
+        slab_nbytes = _calc_slab_nbytes(field, slab_levels)
+        packed_itemsize = numpy.dtype(numpy.int32).itemsize
+        size = slab_nbytes // (field.dtype.itemsize + packed_itemsize)
+        read_nbytes = max(read_nbytes, size * field.dtype.itemsize)
+        packed_nbytes = max(packed_nbytes, size * packed_itemsize)
+    return SimpleNamespace(
+        slab_levels=slab_levels,
+        read=numpy.empty(read_nbytes, dtype=numpy.uint8),
+        packed=numpy.empty(packed_nbytes, dtype=numpy.uint8),
+    )
+
+
+def _view_buffer(buffer, dtype, shape):
+    """
+    :param :py:class:`numpy.ndarray` buffer:
+    :param :py:class:`numpy.dtype` dtype:
+    :param tuple shape:
+    :rtype: :py:class:`numpy.ndarray`
+    """
+    dtype = numpy.dtype(dtype)
+    nbytes = int(numpy.prod(shape)) * dtype.itemsize
+    return buffer[:nbytes].view(dtype).reshape(shape)
+
+
+def _iter_field_slabs(field, z_slice, buffers):
+    """
+    :param :py:class:`tables.Array` field:
+    :param slice z_slice:
+    :param :py:class:`types.SimpleNamespace` buffers:
+    :rtype: generator
+    """
+    if field.ndim == 2:
+        slab = _view_buffer(buffers.read, field.dtype, field.shape)
+        field.read(out=slab)
+        yield (), slab
+        return
+    # The depth level is the first dimension of the (z, x, y) HDF5 datasets, so only the
+    # selected levels are read and decompressed, a slab at a time
+    for start in range(z_slice.start, z_slice.stop, buffers.slab_levels):
+        stop = min(start + buffers.slab_levels, z_slice.stop)
+        slab = _view_buffer(buffers.read, field.dtype, (stop - start, *field.shape[1:]))
+        field.read(start, stop, out=slab)
+        yield (slice(start - z_slice.start, stop - z_slice.start),), slab
+
+
+def _iter_packed_slabs(field, name, z_slice, encoding_spec, buffers):
+    """
+    :param :py:class:`tables.Array` field:
+    :param str name:
+    :param slice z_slice:
+    :param :py:class:`types.SimpleNamespace` encoding_spec:
+    :param :py:class:`types.SimpleNamespace` buffers:
+    :rtype: generator
+    """
+    dtype = encoding_spec.packed_dtypes.get(name, numpy.int32)
+    for region, slab in _iter_field_slabs(field, z_slice, buffers):
+        # Scale, mask, and round in place in the same way that
+        # xarray.conventions.encode_cf_variable() does with the encoding from
+        # _calc_encoding()
+        numpy.divide(slab, SCALE_FACTOR, out=slab)
+        numpy.copyto(slab, FILL_VALUE, where=numpy.isnan(slab))
+        numpy.around(slab, out=slab)
+        if dtype == numpy.int16 and max(slab.max(), -slab.min()) > INT16_MAX:
+            # Fields that are packed as int16 in an output that is being resumed were
+            # only scanned up to the time steps that were in the HDF5 file then
+            raise ValueError(
+                f"{field._v_name} values don't fit in int16; "
+                f"transform the HDF5 file again without resuming"
+            )
+        # The fields are (z, x, y) or (x, y) in the HDF5 file, and (z, y, x) or (y, x)
+        # in the output, so the slab is transposed as it is packed
+        packed = _view_buffer(
+            buffers.packed, dtype, (*slab.shape[:-2], slab.shape[-1], slab.shape[-2])
+        )
+        numpy.copyto(packed, numpy.swapaxes(slab, -1, -2), casting="unsafe")
+        yield region, packed
+
+
+def _calc_packed_shape(field, z_slice):
+    """
+    :param :py:class:`tables.Array` field:
+    :param slice z_slice:
+    :rtype: tuple
+    """
+    if field.ndim == 3:
+        return z_slice.stop - z_slice.start, field.shape[2], field.shape[1]
+    return field.shape[1], field.shape[0]
+
+
+def _init_dataset(h5file, netcdf4_file, encoding_spec, selection, output_format):
     """
     :param :py:class:`tables.File` h5file:
     :param :py:class:`pathlib.Path` netcdf4_file:
-    :param :py:class:`pathlib.Path` tmp_dir:
-    :rtype: :py:class:`types.SimpleNamespace`, :py:class:`pathlib.Path`
+    :param :py:class:`types.SimpleNamespace` encoding_spec:
+    :param :py:class:`types.SimpleNamespace` selection:
+    :param str output_format:
+    :rtype: :py:class:`types.SimpleNamespace`
     """
-    time_coord = _calc_time_coord(h5file, 1)
-    logging.info(f"initializing dataset with fields at: {time_coord.values[0]}")
-    z_index, y_index, y_index_lat, x_index, x_index_lat = _calc_zyx_indices(h5file)
+    # The dataset is created without any time steps, and all of them are written by
+    # _write_timestep() or _write_packed_timestep()
+    time_coord = _calc_time_coord(h5file, 1)[:0]
+    z_index, y_index, y_index_lat, x_index, x_index_lat = _calc_zyx_indices(
+        h5file, selection.z_slice
+    )
     logging.info(
         f"initializing dataset with (z, y, x) grid indices: "
         f"({z_index.size}, {y_index.size}, {x_index.size})"
     )
     data_vars = {}
     for group in h5file.root.Results.OilSpill.Data_2D:
-        if group._v_name in ("Beaching Time", "Oil Arrival Time", "Beaching Volume"):
+        if group._v_name in OIL_TIMES_VARS or not _is_selected(group, selection):
             continue
-        data_vars.update(_calc_data_var(group, 1, (time_coord, y_index, x_index)))
-        logging.debug(
-            f"added (t, y, x) field: {group._v_name} at {time_coord.values[0]}"
+        data_vars.update(
+            _calc_empty_var(group, (time_coord, y_index, x_index), encoding_spec.sparse)
         )
+        logging.debug(f"added (t, y, x) field: {group._v_name}")
     for group in h5file.root.Results.OilSpill.Data_3D:
+        if not _is_selected(group, selection):
+            continue
         data_vars.update(
-            _calc_data_var(group, 1, (time_coord, z_index, y_index, x_index))
-        )
-        logging.debug(
-            f"added (t, z, y, x) field: {group._v_name} at {time_coord.values[0]}"
+            _calc_empty_var(
+                group, (time_coord, z_index, y_index, x_index), encoding_spec.sparse
+            )
         )
+        logging.debug(f"added (t, z, y, x) field: {group._v_name}")
     for group in h5file.root.Grid:
         if group._v_name in ("Latitude"):
             name = group._v_name
@@ -142,96 +1121,411 @@ def _init_dataset(h5file, netcdf4_file, tmp_dir):
             x_index_lat.name: x_index_lat,
         },
     )
-    timestamp = (
-        time_coord.values[0].astype("datetime64[m]").astype(str).replace(":", "")
-    )
-    timestep_file = (tmp_dir / f"{netcdf4_file.stem}_{timestamp}").with_suffix(".nc")
-    _write_netcdf(ds, timestep_file)
-    logging.info(f"wrote initial time step to: {timestep_file}")
-    return (
-        SimpleNamespace(z_index=z_index, y_index=y_index, x_index=x_index),
-        timestep_file,
-    )
+    if output_format == "zarr":
+        _write_zarr(ds, netcdf4_file, encoding_spec)
+    else:
+        _write_netcdf(ds, netcdf4_file, encoding_spec)
+    logging.info(f"initialized dataset in: {netcdf4_file}")
+    return SimpleNamespace(z_index=z_index, y_index=y_index, x_index=x_index)
 
 
-def _calc_timestep_file(grid_indices, h5file, index, netcdf4_file, tmp_dir):
+def _calc_empty_var(group, coords, sparse=None):
+    """
+    :param :py:class:`tables.Group` group:
+    :param tuple coords:
+    :param str or None sparse:
+    :rtype: dict
+    """
+    name = group._v_name.replace(" ", "_")
+    field = _get_field(group, 1)
+    units = field.attrs["Units"].decode()
+    attrs = {"standard_name": name, "long_name": group._v_name, "units": units}
+    if sparse is None:
+        data = numpy.empty(tuple(coord.size for coord in coords), dtype=field.dtype)
+        return {
+            name: xarray.DataArray(name=name, data=data, coords=coords, attrs=attrs)
+        }
+    time_coord, grid_dims = coords[0], [coord.name for coord in coords[1:]]
+    cell_dim = f"{name}{CELL_DIM_SUFFIX}"
+    data_vars = {
+        name: xarray.DataArray(
+            name=name,
+            data=numpy.empty(0, dtype=field.dtype),
+            dims=(cell_dim,),
+            attrs={
+                **attrs,
+                "sparse_layout": sparse,
+                "dense_dims": " ".join((time_coord.name, *grid_dims)),
+            },
+        ),
+        f"{name}_count": xarray.DataArray(
+            name=f"{name}_count",
+            data=numpy.empty(0, dtype=numpy.int32),
+            coords=(time_coord,),
+            attrs={
+                "long_name": f"number of {group._v_name} cells at each time step",
+                "sample_dimension": cell_dim,
+            },
+        ),
+    }
+    if sparse == "coo":
+        data_vars[f"{name}_index"] = xarray.DataArray(
+            name=f"{name}_index",
+            data=numpy.empty(0, dtype=numpy.int32),
+            dims=(cell_dim,),
+            attrs={
+                "long_name": f"flat index of {group._v_name} cells",
+                "flat_dims": " ".join(grid_dims),
+            },
+        )
+    else:
+        data_vars[f"{name}_bbox"] = xarray.DataArray(
+            name=f"{name}_bbox",
+            data=numpy.empty((0, 2 * len(grid_dims)), dtype=numpy.int32),
+            dims=(time_coord.name, f"bbox_{len(grid_dims)}d"),
+            coords={time_coord.name: time_coord},
+            attrs={
+                "long_name": f"start and stop indices of {group._v_name} bounding box",
+                "bbox_dims": " ".join(grid_dims),
+            },
+        )
+    return data_vars
+
+
+@contextlib.contextmanager
+def _open_for_writing(netcdf4_file, output_format):
+    """
+    :param :py:class:`pathlib.Path` netcdf4_file:
+    :param str output_format:
+    :rtype: :py:class:`netCDF4.Dataset` or :py:class:`zarr.Group`
+    """
+    with _exit_on_sigterm():
+        if output_format == "zarr":
+            yield _import_zarr().open_group(netcdf4_file, mode="r+")
+            return
+        with netCDF4.Dataset(netcdf4_file, "a") as nc_dataset:
+            # Fields are packed by _iter_packed_slabs() in the same way that xarray
+            # packs them, so netCDF4 must not scale them again
+            nc_dataset.set_auto_maskandscale(False)
+            yield nc_dataset
+
+
+@contextlib.contextmanager
+def _exit_on_sigterm():
+    """Raise :py:exc:`SystemExit` on SIGTERM, like the :py:exc:`KeyboardInterrupt` of
+    SIGINT, so that a conversion that is killed by a job scheduler unwinds through the
+    context managers that close its output file.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        # Signal handlers can only be set in the main thread
+        yield
+        return
+
+    def handle_sigterm(signum, frame):
+        raise SystemExit(128 + signum)
+
+    previous_handler = signal.signal(signal.SIGTERM, handle_sigterm)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGTERM, previous_handler)
+
+
+def _write_timestep(
+    h5file, index, output, output_format, time_index, encoding_spec, selection, buffers
+):
     """
-    :param :py:class:`types.SimpleNamespace` grid_indices:
     :param :py:class:`tables.File` h5file:
     :param int index:
-    :param :py:class:`pathlib.Path` netcdf4_file:
-    :param :py:class:`pathlib.Path` tmp_dir:
-    :return:
+    :param :py:class:`netCDF4.Dataset` or :py:class:`zarr.Group` output:
+    :param str output_format:
+    :param int time_index:
+    :param :py:class:`types.SimpleNamespace` encoding_spec:
+    :param :py:class:`types.SimpleNamespace` selection:
+    :param :py:class:`types.SimpleNamespace` buffers:
     """
-    time_coord = _calc_time_coord(h5file, index)
-    logging.info(f"processing fields at: {time_coord.values[0]}")
-    data_vars = {}
-    for group in h5file.root.Results.OilSpill.Data_2D:
-        if group._v_name in ("Beaching Time", "Oil Arrival Time", "Beaching Volume"):
-            continue
-        data_vars.update(
-            _calc_data_var(
-                group, index, (time_coord, grid_indices.y_index, grid_indices.x_index)
-            )
-        )
-        logging.debug(
-            f"added (t, y, x) field: {group._v_name} at {time_coord.values[0]}"
+    for group in _iter_field_groups(h5file, selection):
+        name = group._v_name.replace(" ", "_")
+        field = _get_field(group, index)
+        packed_slabs = _iter_packed_slabs(
+            field, name, selection.z_slice, encoding_spec, buffers
         )
-    for group in h5file.root.Results.OilSpill.Data_3D:
-        data_vars.update(
-            _calc_data_var(
-                group,
-                index,
-                (
-                    time_coord,
-                    grid_indices.z_index,
-                    grid_indices.y_index,
-                    grid_indices.x_index,
-                ),
+        if encoding_spec.sparse is None:
+            var = _calc_timestep_var(output, output_format, name, time_index)
+            for region, packed in packed_slabs:
+                var[(time_index, *region)] = packed
+        else:
+            cells = _calc_sparse_cells(
+                packed_slabs,
+                _calc_packed_shape(field, selection.z_slice),
+                encoding_spec.sparse,
             )
+            _write_sparse_cells(cells, output, output_format, name, time_index)
+        logging.debug(f"wrote field: {group._v_name} at time step {index}")
+    _commit_timestep(
+        output, output_format, _pack_time(h5file, index, encoding_spec), time_index
+    )
+
+
+def _write_packed_timestep(
+    packed_vars, output, output_format, time_index, encoding_spec
+):
+    """
+    :param dict packed_vars:
+    :param :py:class:`netCDF4.Dataset` or :py:class:`zarr.Group` output:
+    :param str output_format:
+    :param int time_index:
+    :param :py:class:`types.SimpleNamespace` encoding_spec:
+    """
+    for name, packed in packed_vars.items():
+        if name == "time":
+            continue
+        if encoding_spec.sparse is None:
+            var = _calc_timestep_var(output, output_format, name, time_index)
+            var[time_index] = packed
+        else:
+            _write_sparse_cells(packed, output, output_format, name, time_index)
+    _commit_timestep(output, output_format, packed_vars["time"], time_index)
+
+
+def _calc_sparse_cells(packed_slabs, shape, sparse):
+    """
+    :param packed_slabs: Regions and packed values of the slabs of a field.
+    :type packed_slabs: iterable
+    :param tuple shape:
+    :param str sparse:
+    :rtype: :py:class:`types.SimpleNamespace`
+    """
+    slab_size = int(numpy.prod(shape[1:]))
+    indices, values = [], []
+    for region, packed in packed_slabs:
+        # Slabs are along the first dimension, so a cell's flat index in the field is its
+        # flat index in the slab offset by the cells in the slabs before it
+        offset = region[0].start * slab_size if region else 0
+        slab_indices = numpy.flatnonzero(packed)
+        indices.append(slab_indices + offset)
+        values.append(packed.ravel()[slab_indices])
+    indices, values = numpy.concatenate(indices), numpy.concatenate(values)
+    if sparse == "coo":
+        return SimpleNamespace(
+            values=values, index=indices.astype(numpy.int32), bbox=None
         )
-        logging.debug(
-            f"added (t, z, y, x) field: {group._v_name} at {time_coord.values[0]}"
+    if not indices.size:
+        return SimpleNamespace(
+            values=values, index=None, bbox=numpy.zeros(2 * len(shape), numpy.int32)
         )
-    ds = xarray.Dataset(
-        data_vars=data_vars,
-        coords={
-            time_coord.name: time_coord,
-            grid_indices.z_index.name: grid_indices.z_index,
-            grid_indices.y_index.name: grid_indices.y_index,
-            grid_indices.x_index.name: grid_indices.x_index,
-        },
+    cells = numpy.unravel_index(indices, shape)
+    starts = [axis_cells.min() for axis_cells in cells]
+    stops = [axis_cells.max() + 1 for axis_cells in cells]
+    box = numpy.zeros(
+        [stop - start for start, stop in zip(starts, stops)], dtype=values.dtype
+    )
+    box[tuple(axis_cells - start for axis_cells, start in zip(cells, starts))] = values
+    return SimpleNamespace(
+        values=box.ravel(),
+        index=None,
+        bbox=numpy.array(
+            [bound for bounds in zip(starts, stops) for bound in bounds], numpy.int32
+        ),
+    )
+
+
+def _write_sparse_cells(cells, output, output_format, name, time_index):
+    """
+    :param :py:class:`types.SimpleNamespace` cells:
+    :param :py:class:`netCDF4.Dataset` or :py:class:`zarr.Group` output:
+    :param str output_format:
+    :param str name:
+    :param int time_index:
+    """
+    count_var = _calc_timestep_var(output, output_format, f"{name}_count", time_index)
+    # The cells of a time step follow those of the time steps before it, and overwrite
+    # any that were written after the last complete time step
+    start = int(numpy.sum(count_var[:time_index]))
+    stop = start + cells.values.size
+    for var_name, var_values in ((name, cells.values), (f"{name}_index", cells.index)):
+        if var_values is None:
+            continue
+        var = output[var_name]
+        if output_format == "zarr":
+            var.resize((stop,))
+        if var_values.size:
+            var[start:stop] = var_values
+    if cells.bbox is not None:
+        _calc_timestep_var(output, output_format, f"{name}_bbox", time_index)[
+            time_index
+        ] = cells.bbox
+    count_var[time_index] = cells.values.size
+
+
+def _calc_timestep_var(output, output_format, name, time_index):
+    """
+    :param :py:class:`netCDF4.Dataset` or :py:class:`zarr.Group` output:
+    :param str output_format:
+    :param str name:
+    :param int time_index:
+    :rtype: :py:class:`netCDF4.Variable` or :py:class:`zarr.Array`
+    """
+    var = output[name]
+    if output_format == "zarr":
+        # Resizing also drops anything that was written after the last complete time step
+        var.resize((time_index + 1, *var.shape[1:]))
+    return var
+
+
+def _commit_timestep(output, output_format, packed_time, time_index):
+    """
+    :param :py:class:`netCDF4.Dataset` or :py:class:`zarr.Group` output:
+    :param str output_format:
+    :param :py:class:`numpy.float64` packed_time:
+    :param int time_index:
+    """
+    # Write the time coordinate, and then the count of written time steps last so that
+    # the time step is only counted as written when all of its fields are
+    _calc_timestep_var(output, output_format, "time", time_index)[
+        time_index
+    ] = packed_time
+    if output_format == "zarr":
+        output.attrs[TIMESTEPS_ATTR] = time_index + 1
+    else:
+        output.setncattr(TIMESTEPS_ATTR, time_index + 1)
+        # Flush the time step to disk so that it survives the process being killed
+        output.sync()
+    logging.info(f"wrote time step {time_index + 1}")
+
+
+def _pack_time(h5file, index, encoding_spec):
+    """
+    :param :py:class:`tables.File` h5file:
+    :param int index:
+    :param :py:class:`types.SimpleNamespace` encoding_spec:
+    :rtype: :py:class:`numpy.float64`
+    """
+    time_coord = _calc_time_coord(h5file, index)
+    encoding = _calc_encoding(
+        xarray.Dataset(coords={"time": time_coord}), encoding_spec
     )
-    timestamp = time_coord.values[0].astype("datetime64[m]").astype(str)
-    timestep_file = (tmp_dir / f"{netcdf4_file.stem}_{timestamp}").with_suffix(".nc")
-    _write_netcdf(ds, timestep_file)
-    logging.info(f"wrote time step to: {timestep_file}")
-    return timestep_file
+    var = time_coord.variable.copy(deep=False)
+    var.encoding = {
+        key: value
+        for key, value in encoding["time"].items()
+        if key in PACKING_ENCODING_KEYS
+    }
+    return xarray.conventions.encode_cf_variable(var).values[0]
 
 
-def _concat_timestep_files(timestep_files, netcdf4_file):
+def _pack_timesteps(hdf5_file, indices, encoding_spec, selection, slab_levels):
     """
-    :param list timestep_files:
-    :param :py:class:`pathlib.Path`netcdf4_file:
+    :param str hdf5_file:
+    :param :py:class:`range` indices:
+    :param :py:class:`types.SimpleNamespace` encoding_spec:
+    :param :py:class:`types.SimpleNamespace` selection:
+    :param int slab_levels:
+    :rtype: list
     """
-    ncrcat_cmd = "ncrcat -4 -L4 -O -o"
-    input_files = " ".join(os.fspath(f) for f in timestep_files)
-    cmd = f"{ncrcat_cmd} {netcdf4_file} {input_files}"
-    logging.debug(f"concatenating time steps with: {ncrcat_cmd} {netcdf4_file}")
-    proc = subprocess.run(shlex.split(cmd), capture_output=True, check=True, text=True)
-    expected_msg = "ncrcat: INFO/WARNING Multi-file concatenator encountered packing attribute scale_factor"
-    if proc.stderr and not proc.stderr.startswith(expected_msg):
-        logging.error(proc.stderr)
-    logging.info(f"concatenated time steps to: {netcdf4_file}")
+    with tables.open_file(hdf5_file) as h5file:
+        buffers = _alloc_slab_buffers(h5file, selection, slab_levels)
+        packed_timesteps = []
+        for index in indices:
+            packed_vars = {}
+            for group in _iter_field_groups(h5file, selection):
+                name = group._v_name.replace(" ", "_")
+                field = _get_field(group, index)
+                packed_shape = _calc_packed_shape(field, selection.z_slice)
+                packed_slabs = _iter_packed_slabs(
+                    field, name, selection.z_slice, encoding_spec, buffers
+                )
+                if encoding_spec.sparse is not None:
+                    # Only the cells are returned to the parent process
+                    packed_vars[name] = _calc_sparse_cells(
+                        packed_slabs, packed_shape, encoding_spec.sparse
+                    )
+                    continue
+                packed_vars[name] = numpy.empty(
+                    packed_shape,
+                    dtype=encoding_spec.packed_dtypes.get(name, numpy.int32),
+                )
+                for region, packed in packed_slabs:
+                    packed_vars[name][region] = packed
+            packed_vars["time"] = _pack_time(h5file, index, encoding_spec)
+            packed_timesteps.append(packed_vars)
+        return packed_timesteps
+
+
+def _pack_timesteps_parallel(
+    h5file, indices, encoding_spec, selection, slab_levels, jobs, max_memory
+):
+    """
+    :param :py:class:`tables.File` h5file:
+    :param :py:class:`range` indices:
+    :param :py:class:`types.SimpleNamespace` encoding_spec:
+    :param :py:class:`types.SimpleNamespace` selection:
+    :param int slab_levels:
+    :param int jobs:
+    :param int or None max_memory:
+    :rtype: generator
+    """
+    task_ranges = [
+        indices[start : start + TIMESTEPS_PER_TASK]
+        for start in range(0, len(indices), TIMESTEPS_PER_TASK)
+    ]
+    logging.info(
+        f"reading {len(indices)} time steps in {len(task_ranges)} ranges "
+        f"in {jobs} worker processes"
+    )
+    # Limit the number of ranges in flight so that packed time steps that are waiting
+    # to be written don't pile up in memory
+    max_pending = 2 * jobs
+    if max_memory is not None:
+        range_nbytes = TIMESTEPS_PER_TASK * sum(
+            int(numpy.prod(_calc_packed_shape(_get_field(group, 1), selection.z_slice)))
+            * numpy.dtype(
+                encoding_spec.packed_dtypes.get(
+                    group._v_name.replace(" ", "_"), numpy.int32
+                )
+            ).itemsize
+            for group in _iter_field_groups(h5file, selection)
+        )
+        max_pending = max(1, min(max_pending, max_memory * 2**20 // range_nbytes))
+        if max_pending < jobs:
+            logging.warning(
+                f"max memory of {max_memory} MiB allows only {max_pending} ranges of "
+                f"{range_nbytes / 2**20:.1f} MiB of packed time steps in flight "
+                f"for {jobs} worker processes"
+            )
+    # Workers are spawned rather than forked because the HDF5 library state of the open
+    # file in this process must not be shared with them
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=jobs, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        pending = collections.deque()
+        for task_range in task_ranges:
+            pending.append(
+                executor.submit(
+                    _pack_timesteps,
+                    h5file.filename,
+                    task_range,
+                    encoding_spec,
+                    selection,
+                    slab_levels,
+                )
+            )
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
 
 
-def _calc_oil_times_file(grid_indices, h5file, netcdf4_file, tmp_dir):
+def _write_oil_times(
+    grid_indices, h5file, netcdf4_file, encoding_spec, selection, output_format
+):
     """
     :param :py:class:`types.SimpleNamespace` grid_indices:
     :param :py:class:`tables.File` hdf5_file:
     :param :py:class:`pathlib.Path` netcdf4_file:
-    :param :py:class:`pathlib.Path` tmp_dir:
-    :rtype: :py:class:`pathlib.Path`
+    :param :py:class:`types.SimpleNamespace` encoding_spec:
+    :param :py:class:`types.SimpleNamespace` selection:
+    :param str output_format:
     """
     logging.info(f"processing oil beaching and arrival times")
     time_coord = _calc_time_coord(h5file, 1)
@@ -242,7 +1536,7 @@ def _calc_oil_times_file(grid_indices, h5file, netcdf4_file, tmp_dir):
         "Beaching Volume": None,
     }
     for group in h5file.root.Results.OilSpill.Data_2D:
-        if group._v_name not in var_timebases:
+        if group._v_name not in var_timebases or not _is_selected(group, selection):
             continue
 
         data_vars.update(
@@ -257,6 +1551,9 @@ def _calc_oil_times_file(grid_indices, h5file, netcdf4_file, tmp_dir):
         logging.debug(
             f"added (y, x) field: {group._v_name} at time step {group._v_nchildren}"
         )
+    if not data_vars:
+        logging.info("no oil beaching or arrival times selected")
+        return
     ds = xarray.Dataset(
         data_vars=data_vars,
         coords={
@@ -264,24 +1561,254 @@ def _calc_oil_times_file(grid_indices, h5file, netcdf4_file, tmp_dir):
             grid_indices.x_index.name: grid_indices.x_index,
         },
     )
-    oil_times_file = (tmp_dir / f"{netcdf4_file.stem}_oil_times").with_suffix(".nc")
-    _write_netcdf(ds, oil_times_file, time_coord=False, scaled_vars=False)
-    logging.info(f"wrote oil beaching and arrival times to: {oil_times_file}")
-    return oil_times_file
+    if output_format != "zarr":
+        output_vars = _read_output_vars(netcdf4_file, output_format)
+        written_vars = {
+            name: output_vars[name] for name in ds.data_vars if name in output_vars
+        }
+        if written_vars:
+            # The output is being resumed, and netCDF4 variables can't be replaced,
+            # so the times are rewritten with their existing encoding
+            _rewrite_netcdf_vars(ds, netcdf4_file, written_vars)
+            logging.info(f"rewrote oil beaching and arrival times in: {netcdf4_file}")
+            return
+    write_output = _write_zarr if output_format == "zarr" else _write_netcdf
+    write_output(
+        ds,
+        netcdf4_file,
+        encoding_spec,
+        time_coord=False,
+        scaled_vars=False,
+        mode="a",
+    )
+    logging.info(f"wrote oil beaching and arrival times to: {netcdf4_file}")
+
+
+def _rewrite_netcdf_vars(ds, netcdf4_file, written_vars):
+    """
+    :param :py:class:`xarray.Dataset` ds:
+    :param :py:class:`pathlib.Path` netcdf4_file:
+    :param dict written_vars:
+    """
+    packed_vars = {}
+    for name, written_var in written_vars.items():
+        var = ds[name].variable.copy(deep=False)
+        var.encoding = {"dtype": written_var.dtype}
+        if "_FillValue" in written_var.attrs:
+            var.encoding["_FillValue"] = written_var.attrs["_FillValue"]
+        if numpy.issubdtype(var.dtype, numpy.datetime64):
+            var.encoding.update(
+                units=written_var.attrs["units"],
+                calendar=written_var.attrs["calendar"],
+            )
+        packed_vars[name] = xarray.conventions.encode_cf_variable(var).values
+    with netCDF4.Dataset(netcdf4_file, "a") as nc_dataset:
+        nc_dataset.set_auto_maskandscale(False)
+        for name, packed in packed_vars.items():
+            nc_dataset.variables[name][:] = packed
+
+
+def _write_source_attrs(
+    hdf5_file,
+    netcdf4_file,
+    profile,
+    variables,
+    z_range,
+    surface_only,
+    output_format,
+    sparse,
+):
+    """
+    :param :py:class:`pathlib.Path` or str hdf5_file:
+    :param :py:class:`pathlib.Path` netcdf4_file:
+    :param str profile:
+    :param list or None variables:
+    :param 2-tuple or None z_range:
+    :param boolean surface_only:
+    :param str output_format:
+    :param str or None sparse:
+    """
+    _update_output_attrs(
+        netcdf4_file,
+        output_format,
+        _calc_source_attrs(
+            hdf5_file, profile, variables, z_range, surface_only, sparse
+        ),
+    )
+    if output_format == "zarr":
+        # Consolidating the metadata of the finished store lets it be opened by reading
+        # one object instead of one per variable
+        _import_zarr().consolidate_metadata(netcdf4_file)
+
+
+def _calc_source_attrs(hdf5_file, profile, variables, z_range, surface_only, sparse):
+    """
+    :param :py:class:`pathlib.Path` or str hdf5_file:
+    :param str profile:
+    :param list or None variables:
+    :param 2-tuple or None z_range:
+    :param boolean surface_only:
+    :param str or None sparse:
+    :rtype: dict
+    """
+    stat = Path(hdf5_file).stat()
+    return {
+        **_calc_settings_attrs(
+            hdf5_file, profile, variables, z_range, surface_only, sparse
+        ),
+        "mohid_hdf5_size": str(stat.st_size),
+        "mohid_hdf5_mtime_ns": str(stat.st_mtime_ns),
+    }
+
+
+def _calc_settings_attrs(hdf5_file, profile, variables, z_range, surface_only, sparse):
+    """
+    :param :py:class:`pathlib.Path` or str hdf5_file:
+    :param str profile:
+    :param list or None variables:
+    :param 2-tuple or None z_range:
+    :param boolean surface_only:
+    :param str or None sparse:
+    :rtype: dict
+    """
+    if surface_only:
+        selected_levels = "surface"
+    elif z_range is not None:
+        selected_levels = " ".join(str(z) for z in z_range)
+    else:
+        selected_levels = "all"
+    return {
+        "mohid_hdf5_file": os.fspath(Path(hdf5_file).resolve()),
+        "encoding_profile": profile,
+        "selected_variables": " ".join(variables) if variables is not None else "all",
+        "selected_depth_levels": selected_levels,
+        "storage_layout": sparse if sparse is not None else "dense",
+    }
+
+
+def _read_output_vars(netcdf4_file, output_format):
+    """
+    :param :py:class:`pathlib.Path` netcdf4_file:
+    :param str output_format:
+    :rtype: dict
+    """
+    # The variables are read with the netCDF4 and Zarr libraries rather than xarray
+    # because the time dimension of a partly written time step may not have the same
+    # size in all of them
+    if output_format == "zarr":
+        zarr_group = _import_zarr().open_group(netcdf4_file, mode="r")
+        return {
+            name: SimpleNamespace(
+                dtype=array.dtype,
+                dims=array.metadata.dimension_names,
+                attrs=dict(array.attrs),
+            )
+            for name, array in zarr_group.arrays()
+        }
+    with netCDF4.Dataset(netcdf4_file) as nc_dataset:
+        return {
+            name: SimpleNamespace(
+                dtype=var.dtype,
+                dims=var.dimensions,
+                attrs={attr: var.getncattr(attr) for attr in var.ncattrs()},
+            )
+            for name, var in nc_dataset.variables.items()
+        }
+
+
+def _read_output_attrs(netcdf4_file, output_format):
+    """
+    :param :py:class:`pathlib.Path` or str netcdf4_file:
+    :param str output_format:
+    :rtype: dict
+    """
+    if output_format == "zarr":
+        return dict(_import_zarr().open_group(netcdf4_file, mode="r").attrs)
+    with netCDF4.Dataset(netcdf4_file) as nc_dataset:
+        return {name: nc_dataset.getncattr(name) for name in nc_dataset.ncattrs()}
+
+
+def _update_output_attrs(netcdf4_file, output_format, attrs, delete=()):
+    """
+    :param :py:class:`pathlib.Path` or str netcdf4_file:
+    :param str output_format:
+    :param dict attrs:
+    :param tuple delete:
+    """
+    if output_format == "zarr":
+        zarr_group = _import_zarr().open_group(netcdf4_file, mode="r+")
+        output_attrs = dict(zarr_group.attrs)
+        for name in delete:
+            output_attrs.pop(name, None)
+        zarr_group.attrs.put({**output_attrs, **attrs})
+        return
+    with netCDF4.Dataset(netcdf4_file, "a") as nc_dataset:
+        for name in delete:
+            if name in nc_dataset.ncattrs():
+                nc_dataset.delncattr(name)
+        nc_dataset.setncatts(attrs)
 
 
-def _append_oil_times_file(oil_times_file, netcdf4_file):
+def _read_resume_state(netcdf4_file, output_format, settings_attrs):
     """
-    :param :py:class:`pathlib.Path` oil_times_file:
     :param :py:class:`pathlib.Path` netcdf4_file:
+    :param str output_format:
+    :param dict settings_attrs:
+    :rtype: :py:class:`types.SimpleNamespace` or None
+    """
+    if not netcdf4_file.exists():
+        logging.info(f"nothing to resume in: {netcdf4_file}")
+        return None
+    try:
+        output_attrs = _read_output_attrs(netcdf4_file, output_format)
+        packed_dtypes = {
+            name: numpy.int16
+            for name, var in _read_output_vars(netcdf4_file, output_format).items()
+            if name != "time"
+            and ("time" in var.dims or "sparse_layout" in var.attrs)
+            and var.dtype == numpy.int16
+        }
+    except OSError:
+        # Unreadable output that was interrupted before it was initialized
+        logging.warning(f"can't resume unreadable: {netcdf4_file}; starting over")
+        return None
+    if TIMESTEPS_ATTR not in output_attrs or any(
+        output_attrs.get(name) != value for name, value in settings_attrs.items()
+    ):
+        logging.warning(
+            f"can't resume {netcdf4_file} that was not started from the same HDF5 file "
+            f"with the same profile, selection, and storage layout; starting over"
+        )
+        return None
+    return SimpleNamespace(
+        timesteps=int(output_attrs[TIMESTEPS_ATTR]), packed_dtypes=packed_dtypes
+    )
+
+
+def _calc_timestep_count(h5file, selection):
+    """
+    :param :py:class:`tables.File` h5file:
+    :param :py:class:`types.SimpleNamespace` selection:
+    :rtype: int
     """
-    ncks_cmd = "ncks -4 -L4 -A"
-    cmd = f"{ncks_cmd} {oil_times_file} {netcdf4_file}"
-    logging.debug(f"appending oil times file with: {cmd}")
-    proc = subprocess.run(shlex.split(cmd), capture_output=True, check=True, text=True)
-    if proc.stderr:
-        logging.error(proc.stderr)
-    logging.info(f"appended oil times file to: {netcdf4_file}")
+    # MOHID may still be writing the HDF5 file, so only the time steps for which the time
+    # and all of the selected fields are present are counted
+    return min(
+        h5file.root.Time._v_nchildren,
+        *(group._v_nchildren for group in _iter_field_groups(h5file, selection)),
+    )
+
+
+def _log_peak_memory():
+    """Log the peak resident memory of this process and its worker processes."""
+    # ru_maxrss is in KiB on Linux; for child processes it is the peak of the largest
+    # one that has finished
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+    workers_peak_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 2**10
+    logging.info(
+        f"peak resident memory: {peak_rss:.0f} MiB, "
+        f"and {workers_peak_rss:.0f} MiB in the largest worker process"
+    )
 
 
 def _calc_time_coord(hdf5_file, index):
@@ -300,9 +1827,10 @@ def _calc_time_coord(hdf5_file, index):
     return time_coord
 
 
-def _calc_zyx_indices(h5file):
+def _calc_zyx_indices(h5file, z_slice=slice(None)):
     """
     :param :py:class:`tables.File` h5file:
+    :param slice z_slice:
     :rtype: 3-tuple of :py:class:`xarray.DataArray`
     """
     oil_conc_3d = h5file.root.Results.OilSpill.Data_3D.OilConcentration_3D
@@ -314,7 +1842,7 @@ def _calc_zyx_indices(h5file):
         data=numpy.arange(z_count, dtype=numpy.int16),
         dims="grid_z",
         attrs={"standard_name": "model_level_index", "long_name": "depth level"},
-    )
+    ).isel(grid_z=z_slice)
     y_index = xarray.DataArray(
         name="grid_y",
         data=numpy.arange(y_count, dtype=numpy.int16),
@@ -374,42 +1902,255 @@ def _calc_data_var(group, index, coords, timebase=None):
     return {name: xarray.DataArray(name=name, data=data, coords=coords, attrs=attrs)}
 
 
-def _write_netcdf(ds, netcdf4_file, time_coord=True, scaled_vars=True):
+def _write_netcdf(
+    ds, netcdf4_file, encoding_spec, time_coord=True, scaled_vars=True, mode="w"
+):
     """
     :param :py:class:`xarray.Dataset` ds:
     :param :py:class:`pathlib.Path` netcdf4_file:
+    :param :py:class:`types.SimpleNamespace` encoding_spec:
     :param boolean time_coord:
     :param boolean scaled_vars:
+    :param str mode:
     """
-    encoding = {}
-    if time_coord:
-        encoding.update(
-            {
-                "time": {
-                    "dtype": numpy.float64,
-                    "units": "seconds since 1970-01-01T00:00:00Z",
-                }
-            }
-        )
-    if scaled_vars:
-        for var in ds.data_vars:
-            encoding.update(
-                {var: {"dtype": numpy.int32, "scale_factor": 1e-4, "_FillValue": -9999}}
-            )
     ds.to_netcdf(
         netcdf4_file,
-        mode="w",
+        mode=mode,
         format="NETCDF4",
-        encoding=encoding,
-        unlimited_dims=("time",),
+        encoding=_calc_encoding(ds, encoding_spec, time_coord, scaled_vars),
+        unlimited_dims=(
+            (
+                "time",
+                *(dim for dim in ds.dims if dim.endswith(CELL_DIM_SUFFIX)),
+            )
+            if time_coord
+            else None
+        ),
         compute=True,
     )
 
 
+def _write_zarr(
+    ds, zarr_store, encoding_spec, time_coord=True, scaled_vars=True, mode="w"
+):
+    """
+    :param :py:class:`xarray.Dataset` ds:
+    :param :py:class:`pathlib.Path` zarr_store:
+    :param :py:class:`types.SimpleNamespace` encoding_spec:
+    :param boolean time_coord:
+    :param boolean scaled_vars:
+    :param str mode:
+    """
+    encoding = _calc_zarr_encoding(ds, encoding_spec, time_coord, scaled_vars)
+    if mode == "a":
+        # The encoding of variables that are already in the store can't be changed;
+        # xarray encodes them, e.g. the coordinates, or the oil beaching and arrival
+        # times when a transformation is resumed, with their existing encoding
+        written_vars = _read_output_vars(zarr_store, "zarr")
+        encoding = {
+            var: encoding[var] for var in ds.data_vars if var not in written_vars
+        }
+        # xarray replaces the attributes of the store with those of the dataset
+        ds = ds.assign_attrs(_read_output_attrs(zarr_store, "zarr"))
+    # The metadata is consolidated when the store is finished
+    ds.to_zarr(zarr_store, mode=mode, encoding=encoding, consolidated=False)
+
+
+def _import_zarr():
+    """Import zarr only when a Zarr output is written or read so that it is not
+    a dependency of netCDF4 transformations.
+
+    :rtype: module
+
+    :raises: :py:exc:`ImportError` if zarr>=3 is not installed.
+    """
+    try:
+        import zarr
+        import zarr.codecs
+    except ImportError as exc:
+        raise ImportError(
+            "the zarr output format requires the zarr>=3 package, which requires "
+            "Python>=3.11"
+        ) from exc
+    return zarr
+
+
+def _calc_zarr_encoding(ds, encoding_spec, time_coord=True, scaled_vars=True):
+    """
+    :param :py:class:`xarray.Dataset` ds:
+    :param :py:class:`types.SimpleNamespace` encoding_spec:
+    :param boolean time_coord:
+    :param boolean scaled_vars:
+    :rtype: dict
+    """
+    # Blosc with zlib compression and the byte shuffle filter is the nearest Zarr
+    # equivalent of the netCDF4 zlib and shuffle filters
+    compressors = (
+        (
+            _import_zarr().codecs.BloscCodec(
+                cname="zlib",
+                clevel=encoding_spec.complevel,
+                shuffle="shuffle" if encoding_spec.shuffle else "noshuffle",
+            ),
+        )
+        if encoding_spec.complevel > 0
+        else None
+    )
+    zarr_encoding = {}
+    for var, var_encoding in _calc_encoding(
+        ds, encoding_spec, time_coord, scaled_vars
+    ).items():
+        zarr_encoding[var] = {
+            key: value
+            for key, value in var_encoding.items()
+            if key in PACKING_ENCODING_KEYS
+        }
+        zarr_encoding[var]["compressors"] = compressors
+        if "chunksizes" in var_encoding:
+            zarr_encoding[var]["chunks"] = var_encoding["chunksizes"]
+        elif "time" in ds[var].dims:
+            # Each time step is stored in its own chunks
+            zarr_encoding[var]["chunks"] = tuple(
+                1 if dim == "time" else size for dim, size in ds[var].sizes.items()
+            )
+    return zarr_encoding
+
+
+def _calc_encoding(ds, encoding_spec, time_coord=True, scaled_vars=True):
+    """
+    :param :py:class:`xarray.Dataset` ds:
+    :param :py:class:`types.SimpleNamespace` encoding_spec:
+    :param boolean time_coord:
+    :param boolean scaled_vars:
+    :rtype: dict
+    """
+    encoding = {
+        var: {
+            "zlib": encoding_spec.complevel > 0,
+            "complevel": encoding_spec.complevel,
+            "shuffle": encoding_spec.shuffle,
+        }
+        for var in ds.variables
+    }
+    if time_coord:
+        encoding["time"].update(
+            {"dtype": numpy.float64, "units": "seconds since 1970-01-01T00:00:00Z"}
+        )
+    if scaled_vars:
+        # The counts, indices, and bounding boxes of sparse fields are stored as they are
+        for var in (var for var in ds.data_vars if ds[var].dtype.kind == "f"):
+            encoding[var].update(
+                {
+                    "dtype": encoding_spec.packed_dtypes.get(var, numpy.int32),
+                    "scale_factor": SCALE_FACTOR,
+                    "_FillValue": FILL_VALUE,
+                }
+            )
+    if encoding_spec.chunks is not None:
+        for var in ds.data_vars:
+            # The time dimension is unlimited, so its chunk size is not limited by
+            # the number of time steps in the dataset
+            encoding[var]["chunksizes"] = tuple(
+                (
+                    encoding_spec.chunks.get(dim, 1)
+                    if dim == "time"
+                    else min(encoding_spec.chunks.get(dim, size), size)
+                )
+                for dim, size in ds[var].sizes.items()
+            )
+    for var in ds.data_vars:
+        # The ragged dimensions of sparse fields are unlimited too, and their
+        # variables are read in contiguous runs of cells
+        if any(dim.endswith(CELL_DIM_SUFFIX) for dim in ds[var].dims):
+            encoding[var]["chunksizes"] = (SPARSE_CHUNK_CELLS,)
+    return encoding
+
+
 @click.command(help=hdf5_to_netcdf4.__doc__)
 @click.version_option()
 @click.argument("hdf5_file", type=click.Path(exists=True))
 @click.argument("netcdf4_file", type=click.Path(writable=True))
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="""
+        Number of worker processes to read and pack time steps in.
+    """,
+)
+@click.option(
+    "--profile",
+    type=click.Choice(tuple(ENCODING_PROFILES)),
+    default="default",
+    show_default=True,
+    help="""
+        Encoding profile of chunking, compression, and packing for the fields.
+    """,
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(tuple(OUTPUT_FORMATS)),
+    default="netcdf4",
+    show_default=True,
+    help="""
+        Format to write; zarr writes a Zarr directory store.
+    """,
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="""
+        Append only the time steps that are missing from the output of an interrupted
+        transformation, or of a MOHID HDF5 results file that is still being written.
+    """,
+)
+@click.option(
+    "--variables",
+    multiple=True,
+    help="""
+        Name or glob pattern of the netCDF4 names of fields to write;
+        e.g. 'OilWaterColumnOilVol_3D' or 'Beaching_*'.
+        Use more than once to select more fields.
+        All fields are written if omitted.
+    """,
+)
+@click.option(
+    "--z-range",
+    type=(click.IntRange(min=0), click.IntRange(min=0)),
+    help="""
+        Inclusive range of depth level indices of the (z, y, x) fields to write.
+        All depth levels are written if omitted.
+    """,
+)
+@click.option(
+    "--surface-only",
+    is_flag=True,
+    help="""
+        Write only the surface depth level of the (z, y, x) fields.
+    """,
+)
+@click.option(
+    "--max-memory",
+    type=click.IntRange(min=1),
+    help="""
+        Budget in MiB for the field values held in memory while they are read, packed,
+        and written; the (z, y, x) fields are processed in slabs of depth levels that
+        fit in it. Interpreter and library overhead is not included.
+        No budget if omitted.
+    """,
+)
+@click.option(
+    "--sparse",
+    type=click.Choice(SPARSE_LAYOUTS),
+    help="""
+        Store the time-dependent fields as their oil footprint at each time step;
+        coo stores the indices of the cells, bbox their bounding box.
+        The fields are stored on the whole grid if omitted.
+    """,
+)
 @click.option(
     "-v",
     "--verbosity",
@@ -421,7 +2162,20 @@ def _write_netcdf(ds, netcdf4_file, time_coord=True, scaled_vars=True):
         warning, error, and critical should be silent unless something bad goes wrong. 
     """,
 )
-def cli(hdf5_file, netcdf4_file, verbosity):
+def cli(
+    hdf5_file,
+    netcdf4_file,
+    jobs,
+    profile,
+    output_format,
+    resume,
+    variables,
+    z_range,
+    surface_only,
+    max_memory,
+    sparse,
+    verbosity,
+):
     """Command-line interface for :py:func:`moad_tools.midoss.hdf5_to_netcdf4`.
 
     Please see:
@@ -430,7 +2184,238 @@ def cli(hdf5_file, netcdf4_file, verbosity):
 
     :param str hdf5_file: File path and name of MOHID HDF5 results file to read from.
 
-    :param str netcdf4_file: File path and name of netCDF4 file to write to.
+    :param str netcdf4_file: File path and name of netCDF4 file, or directory of Zarr store
+                             to write to.
+
+    :param int jobs: Number of worker processes to read and pack time steps in.
+
+    :param str profile: Name of the encoding profile to use for the fields.
+
+    :param str output_format: Format to write; :kbd:`netcdf4` or :kbd:`zarr`.
+
+    :param boolean resume: Append only the time steps that are missing from the output.
+
+    :param tuple variables: Names or glob patterns of the netCDF4 names of fields to write.
+
+    :param tuple z_range: Inclusive range of depth level indices of the (z, y, x) fields
+                          to write.
+
+    :param boolean surface_only: Write only the surface depth level of the (z, y, x) fields.
+
+    :param max_memory: Budget in MiB for the field values held in memory.
+    :type max_memory: int or None
+
+    :param sparse: Sparse layout to store the time-dependent fields in.
+    :type sparse: str or None
+
+    :param str verbosity: Verbosity level of logging messages about the progress of the
+                          transformation.
+                          Choices are :kbd:`debug, info, warning, error, critical`.
+                          :kbd:`warning`, :kbd:`error`, and :kbd:`critical` should be silent
+                          unless something bad goes wrong.
+                          Default is :kbd:`warning`.
+    """
+    logging_level = getattr(logging, verbosity.upper())
+    logging.basicConfig(
+        level=logging_level,
+        format="%(asctime)s hdf5-to-netcdf4 %(levelname)s %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+        stream=sys.stdout,
+    )
+    hdf5_to_netcdf4(
+        hdf5_file,
+        netcdf4_file,
+        jobs,
+        profile,
+        variables or None,
+        z_range,
+        surface_only,
+        output_format,
+        resume,
+        max_memory,
+        sparse,
+    )
+
+
+@click.command(
+    help="""
+    Transform selected contents of many MOHID HDF5 results files into netCDF4 files
+    in one process.
+
+    \b
+    The HDF5 files are those that match the glob PATTERNS (use quotes to stop the shell
+    from expanding them), and those listed, one per line, in the --run-list file.
+    Files whose netCDF4 file is up to date are skipped.
+    """
+)
+@click.version_option()
+@click.argument("patterns", nargs=-1)
+@click.option(
+    "--run-list",
+    type=click.Path(exists=True, dir_okay=False),
+    help="""
+        File containing the paths of the HDF5 files to transform, one per line.
+    """,
+)
+@click.option(
+    "-o",
+    "--output-dir",
+    type=click.Path(file_okay=False, writable=True),
+    help="""
+        Directory to write the netCDF4 files in, under the same relative paths as
+        the HDF5 files have from their common parent directory.
+        The netCDF4 files are written beside the HDF5 files if omitted.
+    """,
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="""
+        Number of worker processes to transform files in.
+    """,
+)
+@click.option(
+    "--profile",
+    type=click.Choice(tuple(ENCODING_PROFILES)),
+    default="default",
+    show_default=True,
+    help="""
+        Encoding profile of chunking, compression, and packing for the fields.
+    """,
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(tuple(OUTPUT_FORMATS)),
+    default="netcdf4",
+    show_default=True,
+    help="""
+        Format to write; zarr writes a Zarr directory store.
+    """,
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="""
+        Append only the time steps that are missing from the output of an interrupted
+        transformation, or of a MOHID HDF5 results file that is still being written.
+    """,
+)
+@click.option(
+    "--variables",
+    multiple=True,
+    help="""
+        Name or glob pattern of the netCDF4 names of fields to write;
+        e.g. 'OilWaterColumnOilVol_3D' or 'Beaching_*'.
+        Use more than once to select more fields.
+        All fields are written if omitted.
+    """,
+)
+@click.option(
+    "--z-range",
+    type=(click.IntRange(min=0), click.IntRange(min=0)),
+    help="""
+        Inclusive range of depth level indices of the (z, y, x) fields to write.
+        All depth levels are written if omitted.
+    """,
+)
+@click.option(
+    "--surface-only",
+    is_flag=True,
+    help="""
+        Write only the surface depth level of the (z, y, x) fields.
+    """,
+)
+@click.option(
+    "--max-memory",
+    type=click.IntRange(min=1),
+    help="""
+        Budget in MiB for the field values held in memory while they are read, packed,
+        and written; the (z, y, x) fields are processed in slabs of depth levels that
+        fit in it. Interpreter and library overhead is not included.
+        No budget if omitted.
+    """,
+)
+@click.option(
+    "--sparse",
+    type=click.Choice(SPARSE_LAYOUTS),
+    help="""
+        Store the time-dependent fields as their oil footprint at each time step;
+        coo stores the indices of the cells, bbox their bounding box.
+        The fields are stored on the whole grid if omitted.
+    """,
+)
+@click.option(
+    "--manifest",
+    type=click.Path(dir_okay=False, writable=True),
+    default="hdf5_to_netcdf4_manifest.json",
+    show_default=True,
+    help="""
+        File to write the JSON manifest of transformation timings and failures to.
+    """,
+)
+@click.option(
+    "-v",
+    "--verbosity",
+    default="warning",
+    show_default=True,
+    type=click.Choice(("debug", "info", "warning", "error", "critical")),
+    help="""
+        Choose how much information you want to see about the progress of the transformation;
+        warning, error, and critical should be silent unless something bad goes wrong.
+    """,
+)
+def batch_cli(
+    patterns,
+    run_list,
+    output_dir,
+    jobs,
+    profile,
+    output_format,
+    resume,
+    variables,
+    z_range,
+    surface_only,
+    max_memory,
+    sparse,
+    manifest,
+    verbosity,
+):
+    """Command-line interface for :py:func:`moad_tools.midoss.hdf5_to_netcdf4_batch`.
+
+    :param tuple patterns: Glob patterns of MOHID HDF5 results files to read from.
+
+    :param str run_list: File path and name of file containing the paths of MOHID HDF5
+                         results files to read from, one per line.
+
+    :param str output_dir: Directory to write the netCDF4 files, or Zarr stores in.
+
+    :param int jobs: Number of worker processes to transform files in.
+
+    :param str profile: Name of the encoding profile to use for the fields.
+
+    :param str output_format: Format to write; :kbd:`netcdf4` or :kbd:`zarr`.
+
+    :param boolean resume: Append only the time steps that are missing from the output.
+
+    :param tuple variables: Names or glob patterns of the netCDF4 names of fields to write.
+
+    :param tuple z_range: Inclusive range of depth level indices of the (z, y, x) fields
+                          to write.
+
+    :param boolean surface_only: Write only the surface depth level of the (z, y, x) fields.
+
+    :param max_memory: Budget in MiB for the field values held in memory.
+    :type max_memory: int or None
+
+    :param sparse: Sparse layout to store the time-dependent fields in.
+    :type sparse: str or None
+
+    :param str manifest: File path and name of JSON file to write the manifest of
+                         transformation timings and failures to.
 
     :param str verbosity: Verbosity level of logging messages about the progress of the
                           transformation.
@@ -446,4 +2431,32 @@ def cli(hdf5_file, netcdf4_file, verbosity):
         datefmt="%Y-%m-%d %H:%M:%S",
         stream=sys.stdout,
     )
-    hdf5_to_netcdf4(hdf5_file, netcdf4_file)
+    hdf5_files = [
+        hdf5_file
+        for pattern in patterns
+        for hdf5_file in sorted(glob.glob(pattern, recursive=True))
+    ]
+    if run_list is not None:
+        with Path(run_list).open("rt") as f:
+            hdf5_files.extend(line.strip() for line in f if line.strip())
+    # Drop duplicates while keeping the order in which the files were given
+    hdf5_files = list(dict.fromkeys(hdf5_files))
+    batch_manifest = hdf5_to_netcdf4_batch(
+        hdf5_files,
+        output_dir,
+        jobs,
+        manifest,
+        profile,
+        variables or None,
+        z_range,
+        surface_only,
+        output_format,
+        resume,
+        max_memory,
+        sparse,
+    )
+    if batch_manifest["n_failed"]:
+        raise click.ClickException(
+            f"failed to transform {batch_manifest['n_failed']} of {len(hdf5_files)} "
+            f"files; please see {manifest}"
+        )
@@ -16,9 +16,14 @@
 of random oil spills to drive Monte Carlo runs of MOHID.
 """
 import collections
+import concurrent.futures
 import datetime
+import hashlib
 import logging
+import os
+import pickle
 import sys
+import tempfile
 from datetime import timedelta
 from pathlib import Path
 from types import SimpleNamespace
@@ -29,12 +34,27 @@ import geopandas
 import numpy
 import pandas
 import rasterio
+import shapely
 import shapely.geometry
 import xarray
 import yaml
 
+from moad_tools.geotiff_watermask import calc_grid_key
+from moad_tools.geotiff_watermask import calc_meshmask_key
+from moad_tools.geotiff_watermask import calc_tpoint_cell_map
+from moad_tools.geotiff_watermask import calc_water_cells
+from moad_tools.geotiff_watermask import read_watermask
+from moad_tools.geotiff_watermask import read_watermask_keys
+from moad_tools.geotiff_watermask import read_water_cells
+from moad_tools.geotiff_watermask import write_water_cells
+
 logging.getLogger(__name__).addHandler(logging.NullHandler())
 
+#: Number of spills from which :py:func:`random_oil_spills` builds the vessel type VTE
+#: cube when there is no cache dir to store it in; for fewer spills, the VTE of only the
+#: vessel type rasters of the months that are drawn are read as each spill needs them
+VESSEL_TYPE_VTE_CUBE_MIN_SPILLS = 100
+
 
 def random_oil_spills(n_spills, config_file, random_seed=None):
     """Calculate a dataframe containing parameters of a set of random oil spills
@@ -61,10 +81,26 @@ def random_oil_spills(n_spills, config_file, random_seed=None):
     logging.debug("Hello!")
     # Load GeoTIFF files for each month and add up vessel traffic exposure (VTE)
     geotiffs_dir = Path(config["geotiffs dir"])
-    geotiff_watermask = numpy.load(
-        Path(config["geotiff watermask"]), allow_pickle=False, fix_imports=False
+    geotiff_store = GeoTIFFStore(
+        geotiffs_dir, cache_dir=_calc_cache_path(config, "geotiffs")
+    )
+    geotiff_watermask = load_geotiff_watermask(
+        Path(config["geotiff watermask"]),
+        geotiff_store,
+        Path(config["nemo meshmask"]),
+    )
+    water_cells = load_water_cells(
+        geotiff_watermask, _calc_cache_path(config, "water_cells.npz")
+    )
+    vte_probability = calc_vte_probability(
+        geotiffs_dir, geotiff_watermask, geotiff_store, water_cells
+    )
+    vte_cell_samplers = load_vte_cell_samplers(
+        geotiff_store,
+        geotiff_watermask,
+        _calc_cache_path(config, "vte_cell_samplers.npz"),
+        water_cells,
     )
-    vte_probability = calc_vte_probability(geotiffs_dir, geotiff_watermask)
 
     # Initialize PCG-64 random number generator
     random_generator = numpy.random.default_rng(random_seed)
@@ -73,23 +109,49 @@ def random_oil_spills(n_spills, config_file, random_seed=None):
     end_date = arrow.get(config["end date"]).datetime
 
     ssc_mesh = xarray.open_dataset(Path(config["nemo meshmask"]))
+    spill_location_sampler = load_spill_location_sampler(
+        geotiff_store,
+        ssc_mesh,
+        Path(config["nemo meshmask"]),
+        _calc_cache_path(config, "spill_location_sampler.npz"),
+    )
 
     vessel_types = config["vessel types"]
+    # The cube is built from all of the vessel type rasters, which is only worth it if it
+    # is cached for later runs or there are enough spills to draw from most months
+    vessel_type_vte_cube = None
+    cube_dir = _calc_cache_path(config, "vessel_type_vte_cube")
+    if cube_dir is not None or n_spills >= VESSEL_TYPE_VTE_CUBE_MIN_SPILLS:
+        vessel_type_vte_cube = load_vessel_type_vte_cube(
+            geotiff_store, vessel_types, geotiff_watermask, cube_dir
+        )
 
     shapefiles_dir = Path(config["shapefiles dir"])
+    ais_track_store = AISTrackStore(
+        shapefiles_dir, cache_dir=_calc_cache_path(config, "ais_tracks")
+    )
+    track_vte_weights_store = TrackVTEWeightsStore(
+        ais_track_store,
+        geotiff_store,
+        geotiff_watermask,
+        cache_dir=_calc_cache_path(config, "track_vte_weights"),
+    )
 
     oil_attribution_file = Path(config["oil attribution"])
 
     marine_transport_data_dir = oil_attribution_file.parent
 
-    with oil_attribution_file.open("rt") as f:
-        oil_attrs = yaml.safe_load(f)
+    oil_attribution = load_oil_attribution(
+        oil_attribution_file, _calc_cache_path(config, "oil_attribution.pickle")
+    )
+    oil_attrs = oil_attribution.oil_attrs
 
+    date_sampler = calc_date_sampler(start_date, end_date)
     spill_params = collections.defaultdict(list)
     for spill in range(n_spills):
         logging.info(f"spill number: {spill=}")
         spill_date_hour = get_date(
-            start_date, end_date, vte_probability, random_generator
+            start_date, end_date, vte_probability, random_generator, date_sampler
         )
         spill_params["spill_date_hour"].append(spill_date_hour)
         spill_params["run_days"].append(7)
@@ -107,6 +169,10 @@ def random_oil_spills(n_spills, config_file, random_seed=None):
             geotiff_watermask,
             ssc_mesh,
             random_generator,
+            geotiff_store,
+            vte_cell_samplers,
+            spill_location_sampler,
+            water_cells,
         )
         spill_params["spill_lon"].append(spill_lon)
         spill_params["spill_lat"].append(spill_lat)
@@ -120,6 +186,8 @@ def random_oil_spills(n_spills, config_file, random_seed=None):
             geotiff_x_index,
             geotiff_y_index,
             random_generator,
+            geotiff_store,
+            vessel_type_vte_cube,
         )
         spill_params["vessel_type"].append(vessel_type)
 
@@ -134,6 +202,10 @@ def random_oil_spills(n_spills, config_file, random_seed=None):
             spill_date_hour.month,
             geotiff_bbox,
             random_generator,
+            ais_track_store,
+            track_vte_weights_store,
+            geotiff_x_index,
+            geotiff_y_index,
         )
         spill_params["vessel_len"].append(vessel_len)
         spill_params["vessel_mmsi"].append(vessel_mmsi)
@@ -161,18 +233,16 @@ def random_oil_spills(n_spills, config_file, random_seed=None):
         )
         spill_params["fuel_cargo"].append("fuel" if fuel_spill else "cargo")
 
-        vessel_fuel_types_file = Path(oil_attrs["files"]["fuel"]).name
-        with (marine_transport_data_dir / vessel_fuel_types_file).open("rt") as f:
-            vessel_fuel_types = yaml.safe_load(f)
         oil_type, barge_not_oil_cargo = get_oil_type(
             oil_attrs,
             vessel_type,
             vessel_origin,
             vessel_dest,
             fuel_spill,
-            vessel_fuel_types,
+            oil_attribution.vessel_fuel_types,
             marine_transport_data_dir,
             random_generator,
+            oil_attribution,
         )
         spill_params["Lagrangian_template"].append(f"Lagrangian_{oil_type}.dat")
         if barge_not_oil_cargo:
@@ -186,7 +256,635 @@ def random_oil_spills(n_spills, config_file, random_seed=None):
     return df
 
 
-def calc_vte_probability(geotiffs_dir, geotiff_watermask):
+def random_oil_spills_batch(n_spills, config_file, random_seed=None):
+    """Calculate a dataframe containing parameters of a set of random oil spills
+    to drive Monte Carlo runs of MOHID, drawing the parameters in vectorized batches
+    instead of one spill at a time.
+
+    The spill dates, months, and GeoTIFF cells for all of the spills, and their vessel types,
+    are drawn with vectorized calls.
+    The rest of the parameters are calculated for groups of spills that share the same
+    month and vessel type.
+
+    The random number stream is derived from :kbd:`random_seed` via a
+    :py:class:`numpy.random.SeedSequence`.
+    Its spawned children are used, in order, for:
+
+    * spill months and hours
+    * GeoTIFF cells and sub-grid spill locations
+    * vessel types
+
+    and the parameters of the spills in each (month, vessel type) group are drawn from a
+    stream with spawn key :kbd:`(3, month, vessel type index)`.
+    So, a given seed always produces the same dataframe, but not the same dataframe as
+    :py:func:`random_oil_spills` produces for that seed.
+
+    :param int n_spills: Number of spills to calculate parameters for.
+
+    :param str config_file: File path and name of the YAML file to read processing configuration
+                            dictionary from.
+
+    :param random_seed: Seed to initialize random number stream with.
+    :type random_seed: None or int or :py:class:`numpy.random.SeedSequence`
+
+    :return: Dataframe of random oil spill parameters with :kbd:`n_spills` rows and the same
+             columns as the dataframe returned by :py:func:`random_oil_spills`.
+    :rtype: :py:class:`pandas.DataFrame`
+    """
+    with Path(config_file).open("rt") as f:
+        config = yaml.safe_load(f)
+        logging.info(f"read config dict from {config_file}")
+
+    geotiffs_dir = Path(config["geotiffs dir"])
+    geotiff_store = GeoTIFFStore(
+        geotiffs_dir, cache_dir=_calc_cache_path(config, "geotiffs")
+    )
+    geotiff_watermask = load_geotiff_watermask(
+        Path(config["geotiff watermask"]),
+        geotiff_store,
+        Path(config["nemo meshmask"]),
+    )
+    water_cells = load_water_cells(
+        geotiff_watermask, _calc_cache_path(config, "water_cells.npz")
+    )
+    vte_probability = calc_vte_probability(
+        geotiffs_dir, geotiff_watermask, geotiff_store, water_cells
+    )
+    vte_cell_samplers = load_vte_cell_samplers(
+        geotiff_store,
+        geotiff_watermask,
+        _calc_cache_path(config, "vte_cell_samplers.npz"),
+        water_cells,
+    )
+
+    seed_seq = (
+        random_seed
+        if isinstance(random_seed, numpy.random.SeedSequence)
+        else numpy.random.SeedSequence(random_seed)
+    )
+    date_generator, location_generator, vessel_type_generator = (
+        numpy.random.default_rng(child) for child in seed_seq.spawn(3)
+    )
+
+    start_date = arrow.get(config["start date"]).datetime
+    end_date = arrow.get(config["end date"]).datetime
+
+    ssc_mesh = xarray.open_dataset(Path(config["nemo meshmask"]))
+    spill_location_sampler = load_spill_location_sampler(
+        geotiff_store,
+        ssc_mesh,
+        Path(config["nemo meshmask"]),
+        _calc_cache_path(config, "spill_location_sampler.npz"),
+    )
+
+    vessel_types = config["vessel types"]
+    vessel_type_vte_cube = load_vessel_type_vte_cube(
+        geotiff_store,
+        vessel_types,
+        geotiff_watermask,
+        _calc_cache_path(config, "vessel_type_vte_cube"),
+    )
+
+    shapefiles_dir = Path(config["shapefiles dir"])
+    ais_track_store = AISTrackStore(
+        shapefiles_dir, cache_dir=_calc_cache_path(config, "ais_tracks")
+    )
+    track_vte_weights_store = TrackVTEWeightsStore(
+        ais_track_store,
+        geotiff_store,
+        geotiff_watermask,
+        cache_dir=_calc_cache_path(config, "track_vte_weights"),
+    )
+
+    oil_attribution_file = Path(config["oil attribution"])
+
+    marine_transport_data_dir = oil_attribution_file.parent
+
+    oil_attribution = load_oil_attribution(
+        oil_attribution_file, _calc_cache_path(config, "oil_attribution.pickle")
+    )
+    oil_attrs = oil_attribution.oil_attrs
+
+    spill_date_hours = get_date_batch(
+        start_date, end_date, vte_probability, n_spills, date_generator
+    )
+    spill_months = numpy.array([date_hour.month for date_hour in spill_date_hours])
+
+    locations = get_lat_lon_indices_batch(
+        geotiffs_dir,
+        spill_months,
+        geotiff_watermask,
+        ssc_mesh,
+        location_generator,
+        geotiff_store,
+        vte_cell_samplers,
+        spill_location_sampler,
+        water_cells,
+    )
+
+    spill_vessel_types = get_vessel_type_batch(
+        geotiffs_dir,
+        vessel_types,
+        spill_months,
+        locations.geotiff_x_index,
+        locations.geotiff_y_index,
+        vessel_type_generator,
+        geotiff_store,
+        vessel_type_vte_cube,
+    )
+
+    spill_params = {
+        "spill_date_hour": spill_date_hours,
+        "run_days": numpy.full(n_spills, 7),
+        "spill_lon": locations.spill_lon,
+        "spill_lat": locations.spill_lat,
+        "geotiff_x_index": locations.geotiff_x_index,
+        "geotiff_y_index": locations.geotiff_y_index,
+        "vessel_type": spill_vessel_types,
+    }
+    for key in (
+        "vessel_len",
+        "vessel_mmsi",
+        "vessel_origin",
+        "vessel_dest",
+        "fuel_capacity",
+        "cargo_capacity",
+        "spill_volume",
+        "fuel_cargo",
+        "Lagrangian_template",
+    ):
+        spill_params[key] = numpy.empty(n_spills, dtype=object)
+
+    for month in numpy.unique(spill_months):
+        for vessel_type_index, vessel_type in enumerate(vessel_types):
+            group = numpy.flatnonzero(
+                (spill_months == month) & (spill_vessel_types == vessel_type)
+            )
+            if group.size == 0:
+                continue
+            logging.info(
+                f"calculating parameters of {group.size} spills from {vessel_type} vessels "
+                f"in 2018-{month:02d}"
+            )
+            group_generator = numpy.random.default_rng(
+                numpy.random.SeedSequence(
+                    seed_seq.entropy,
+                    spawn_key=seed_seq.spawn_key + (3, int(month), vessel_type_index),
+                )
+            )
+            for spill in group:
+                (
+                    vessel_len,
+                    vessel_origin,
+                    vessel_dest,
+                    vessel_mmsi,
+                ) = get_length_origin_destination(
+                    shapefiles_dir,
+                    vessel_type,
+                    month,
+                    locations.geotiff_bbox[spill],
+                    group_generator,
+                    ais_track_store,
+                    track_vte_weights_store,
+                    locations.geotiff_x_index[spill],
+                    locations.geotiff_y_index[spill],
+                )
+                spill_params["vessel_len"][spill] = vessel_len
+                spill_params["vessel_mmsi"][spill] = vessel_mmsi
+                spill_params["vessel_origin"][spill] = vessel_origin
+                spill_params["vessel_dest"][spill] = vessel_dest
+
+                vessel_len = adjust_tug_tank_barge_length(
+                    vessel_type, vessel_len, group_generator
+                )
+                fuel_capacity, cargo_capacity = get_oil_capacity(
+                    oil_attrs, vessel_len, vessel_type, group_generator
+                )
+                fuel_spill = fuel_or_cargo_spill(
+                    oil_attrs, vessel_type, group_generator
+                )
+                max_spill_volume = fuel_capacity if fuel_spill else cargo_capacity
+                spill_volume = max_spill_volume * choose_fraction_spilled(
+                    group_generator
+                )
+
+                oil_type, barge_not_oil_cargo = get_oil_type(
+                    oil_attrs,
+                    vessel_type,
+                    vessel_origin,
+                    vessel_dest,
+                    fuel_spill,
+                    oil_attribution.vessel_fuel_types,
+                    marine_transport_data_dir,
+                    group_generator,
+                    oil_attribution,
+                )
+                if barge_not_oil_cargo:
+                    fuel_spill = True
+                    spill_volume = fuel_capacity * choose_fraction_spilled(
+                        group_generator
+                    )
+                spill_params["fuel_capacity"][spill] = fuel_capacity
+                spill_params["cargo_capacity"][spill] = cargo_capacity
+                spill_params["spill_volume"][spill] = spill_volume
+                spill_params["fuel_cargo"][spill] = "fuel" if fuel_spill else "cargo"
+                spill_params["Lagrangian_template"][
+                    spill
+                ] = f"Lagrangian_{oil_type}.dat"
+
+    df = pandas.DataFrame(spill_params)
+    # Match the column dtypes of the spill-by-spill calculation
+    df = df.infer_objects()
+
+    return df
+
+
+def random_oil_spills_parallel(n_spills, config_file, random_seed=None, n_workers=2):
+    """Calculate a dataframe containing parameters of a set of random oil spills
+    to drive Monte Carlo runs of MOHID, using a pool of worker processes.
+
+    The spills are split into :kbd:`n_workers` chunks of nearly equal size,
+    and the parameters of each chunk are calculated by :py:func:`random_oil_spills_batch`
+    in a worker process with an independent random number stream from a child of the
+    :py:class:`numpy.random.SeedSequence` of :kbd:`random_seed`.
+    The chunks' dataframes are concatenated in chunk order,
+    so a given seed and number of workers always produce the same dataframe.
+
+    The rasters, samplers, and parsed YAML files that all of the chunks use are calculated
+    and stored in the :kbd:`cache dir` of the processing configuration before the workers
+    are started so that the workers share them as memory-mapped or quickly read files.
+    If the configuration does not have a :kbd:`cache dir`, a temporary directory is used,
+    and the AIS track VTE weights tables are not calculated because they would be
+    discarded after the run; the workers calculate the track VTE weights in only the
+    GeoTIFF cells of their spills instead.
+
+    :param int n_spills: Number of spills to calculate parameters for.
+
+    :param str config_file: File path and name of the YAML file to read processing configuration
+                            dictionary from.
+
+    :param random_seed: Seed to initialize random number stream with.
+    :type random_seed: None or int
+
+    :param int n_workers: Number of worker processes to use.
+
+    :return: Dataframe of random oil spill parameters with :kbd:`n_spills` rows and the same
+             columns as the dataframe returned by :py:func:`random_oil_spills`.
+    :rtype: :py:class:`pandas.DataFrame`
+    """
+    with Path(config_file).open("rt") as f:
+        config = yaml.safe_load(f)
+        logging.info(f"read config dict from {config_file}")
+
+    with tempfile.TemporaryDirectory(prefix="random_oil_spills_") as tmp_dir:
+        track_vte_weights = "cache dir" in config
+        if not track_vte_weights:
+            config["cache dir"] = os.fspath(Path(tmp_dir) / "cache")
+            config_file = Path(tmp_dir) / Path(config_file).name
+            with config_file.open("wt") as f:
+                yaml.safe_dump(config, f)
+            logging.warning(
+                f"no cache dir in config, so the shared data are calculated in temporary "
+                f"cache dir {config['cache dir']} and discarded after the run; "
+                f"add a cache dir to the config to calculate them only once"
+            )
+        prepare_shared_data(config, track_vte_weights)
+
+        chunk_sizes = [
+            chunk.size for chunk in numpy.array_split(numpy.arange(n_spills), n_workers)
+        ]
+        chunk_seeds = numpy.random.SeedSequence(random_seed).spawn(n_workers)
+        # Skip the empty chunks that there are if there are fewer spills than workers
+        chunk_seeds = [seed for seed, size in zip(chunk_seeds, chunk_sizes) if size > 0]
+        chunk_sizes = [size for size in chunk_sizes if size > 0]
+        logging.info(
+            f"calculating parameters of {n_spills} spills in {n_workers} worker processes"
+        )
+        with concurrent.futures.ProcessPoolExecutor(max_workers=n_workers) as executor:
+            dfs = list(
+                executor.map(
+                    random_oil_spills_batch,
+                    chunk_sizes,
+                    [config_file] * len(chunk_sizes),
+                    chunk_seeds,
+                )
+            )
+
+    df = pandas.concat(dfs, ignore_index=True)
+    return df
+
+
+def prepare_shared_data(config, track_vte_weights=True):
+    """Calculate the GeoTIFF rasters, water cells index, GeoTIFF cell samplers,
+    vessel type VTE cube,
+    parsed oil attribution YAML files, map of NEMO T-grid water points in GeoTIFF cells,
+    and AIS track VTE weights tables that spill calculations use, and store them in the
+    :kbd:`cache dir` of the processing configuration.
+
+    The AIS tracks are stored by the spill calculations for only the vessel types and
+    months that they need.
+
+    :param dict config: Processing configuration dictionary.
+
+    :param boolean track_vte_weights: Calculate and store the AIS track VTE weights tables
+                                      for all of the vessel types and months;
+                                      without them, spill calculations calculate the
+                                      track VTE weights in only the GeoTIFF cells of
+                                      their spills.
+    """
+    logging.info(f"preparing shared data in cache dir: {config['cache dir']}")
+    geotiffs_dir = Path(config["geotiffs dir"])
+    geotiff_store = GeoTIFFStore(
+        geotiffs_dir, cache_dir=_calc_cache_path(config, "geotiffs")
+    )
+    geotiff_watermask = load_geotiff_watermask(
+        Path(config["geotiff watermask"]),
+        geotiff_store,
+        Path(config["nemo meshmask"]),
+    )
+    vessel_types = config["vessel types"]
+    for vessel_type in ["all"] + vessel_types:
+        for month in range(1, 13):
+            geotiff_store.read(vessel_type, month)
+    water_cells = load_water_cells(
+        geotiff_watermask, _calc_cache_path(config, "water_cells.npz")
+    )
+    load_vte_cell_samplers(
+        geotiff_store,
+        geotiff_watermask,
+        _calc_cache_path(config, "vte_cell_samplers.npz"),
+        water_cells,
+    )
+    load_vessel_type_vte_cube(
+        geotiff_store,
+        vessel_types,
+        geotiff_watermask,
+        _calc_cache_path(config, "vessel_type_vte_cube"),
+    )
+    load_oil_attribution(
+        Path(config["oil attribution"]),
+        _calc_cache_path(config, "oil_attribution.pickle"),
+    )
+    with xarray.open_dataset(Path(config["nemo meshmask"])) as ssc_mesh:
+        load_spill_location_sampler(
+            geotiff_store,
+            ssc_mesh,
+            Path(config["nemo meshmask"]),
+            _calc_cache_path(config, "spill_location_sampler.npz"),
+        )
+    if not track_vte_weights:
+        return
+    ais_track_store = AISTrackStore(
+        Path(config["shapefiles dir"]),
+        cache_dir=_calc_cache_path(config, "ais_tracks"),
+    )
+    track_vte_weights_store = TrackVTEWeightsStore(
+        ais_track_store,
+        geotiff_store,
+        geotiff_watermask,
+        cache_dir=_calc_cache_path(config, "track_vte_weights"),
+    )
+    for vessel_type in vessel_types:
+        for month in range(1, 13):
+            track_vte_weights_store.write(vessel_type, month)
+
+
+def _calc_cache_path(config, name):
+    """Calculate the path of a file or directory in the optional :kbd:`cache dir` of the
+    processing configuration in which precomputed data are stored between runs.
+
+    :param dict config: Processing configuration dictionary.
+
+    :param str name: Name of the file or directory in the cache directory.
+
+    :return: Path of the file or directory, or None if there is no cache directory
+             in the configuration.
+    :rtype: :py:class:`pathlib.Path` or None
+    """
+    try:
+        return Path(config["cache dir"]) / name
+    except KeyError:
+        return None
+
+
+def _write_cache_file(cache_file, write):
+    """Write a file in the cache directory via a temporary file that is renamed when it is
+    complete so that processes that are sharing the cache never read a partly written file.
+
+    :param cache_file: Path of the file to write.
+    :type cache_file: :py:class:`pathlib.Path` or str
+
+    :param write: Function that writes the file contents to the temporary file path that it
+                  is called with.
+    :type write: callable
+    """
+    cache_path = Path(cache_file)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    # Keep the suffix so that Numpy functions don't append one
+    tmp_path = cache_path.with_name(
+        f".{cache_path.stem}-{os.getpid()}{cache_path.suffix}"
+    )
+    write(tmp_path)
+    os.replace(tmp_path, cache_path)
+
+
+class GeoTIFFStore:
+    """Store of AIS ship track density GeoTIFF rasters that decodes each monthly GeoTIFF
+    file once and keeps the least recently used :kbd:`max_rasters` of them in memory.
+
+    If :kbd:`cache_dir` is given, the decoded rasters are also stored there as Numpy array
+    files that are memory-mapped instead of being decoded again in later runs.
+
+    :param geotiffs_dir: Directory path to read AIS GeoTIFF files from.
+    :type geotiffs_dir: :py:class:`pathlib.Path`
+
+    :param int max_rasters: Maximum number of rasters to keep in memory.
+                            The default is enough for the 2018 "all" GeoTIFFs and those for
+                            9 vessel types.
+
+    :param cache_dir: Directory path to store decoded rasters in as Numpy array files.
+    :type cache_dir: :py:class:`pathlib.Path` or str or None
+    """
+
+    def __init__(self, geotiffs_dir, max_rasters=120, cache_dir=None):
+        self.geotiffs_dir = Path(geotiffs_dir)
+        self.max_rasters = max_rasters
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._rasters = collections.OrderedDict()
+
+    def read(self, vessel_type, month):
+        """Return the 2018 raster for a vessel type and month.
+
+        :param str vessel_type: Vessel type for which to return the raster;
+                                :kbd:`all` for the total vessel traffic exposure.
+
+        :param int month: Month number for which to return the raster.
+
+        :return: Namespace of read-only raster :kbd:`data` array, and the GeoTIFF
+                 :kbd:`transform`, :kbd:`width`, :kbd:`height`, and :kbd:`crs`.
+        :rtype: :py:class:`types.SimpleNamespace`
+        """
+        # The filenames are formatted as "{vessel_type}_2018_MM.tif"
+        geotiff_file = self.geotiffs_dir / f"{vessel_type}_2018_{month:02d}.tif"
+        try:
+            self._rasters.move_to_end(geotiff_file)
+            return self._rasters[geotiff_file]
+        except KeyError:
+            pass
+        raster = self._load(geotiff_file)
+        self._rasters[geotiff_file] = raster
+        if len(self._rasters) > self.max_rasters:
+            self._rasters.popitem(last=False)
+        return raster
+
+    def _load(self, geotiff_file):
+        """
+        :param :py:class:`pathlib.Path` geotiff_file:
+        :rtype: :py:class:`types.SimpleNamespace`
+        """
+        with rasterio.open(geotiff_file) as dataset:
+            transform, width, height = dataset.transform, dataset.width, dataset.height
+            crs = dataset.crs
+            if self.cache_dir is None:
+                data = dataset.read(1, boundless=True, fill_value=0)
+                data.flags.writeable = False
+                logging.debug(f"decoded GeoTIFF: {geotiff_file}")
+                return SimpleNamespace(
+                    data=data, transform=transform, width=width, height=height, crs=crs
+                )
+            numpy_file = (self.cache_dir / geotiff_file.name).with_suffix(".npy")
+            if (
+                not numpy_file.exists()
+                or numpy_file.stat().st_mtime < geotiff_file.stat().st_mtime
+            ):
+                data = dataset.read(1, boundless=True, fill_value=0)
+                _write_cache_file(
+                    numpy_file,
+                    lambda tmp_file: numpy.save(tmp_file, data, allow_pickle=False),
+                )
+                logging.debug(f"decoded GeoTIFF {geotiff_file} to {numpy_file}")
+        data = numpy.load(numpy_file, mmap_mode="r", allow_pickle=False)
+        return SimpleNamespace(
+            data=data, transform=transform, width=width, height=height, crs=crs
+        )
+
+
+def load_geotiff_watermask(watermask_path, geotiff_store, meshmask_file):
+    """Load the SalishSeaCast domain water mask for the grid of the AIS ship track density
+    "all" GeoTIFF files, and confirm that all of those files have the same grid.
+
+    If :kbd:`watermask_path` is a directory, it is treated as a water mask cache that was
+    written by :py:func:`moad_tools.midoss.geotiff_watermask.geotiff_watermasks`,
+    and the water mask for the GeoTIFF grid and the mesh mask is looked up in it.
+    Otherwise, :kbd:`watermask_path` is read as a water mask Numpy array file,
+    and its shape is confirmed to match that of the GeoTIFF grid,
+    and the keys of the GeoTIFF grid and mesh mask that were stored with it by
+    :py:func:`moad_tools.midoss.geotiff_watermask.write_numpy_file` are confirmed
+    to match those of the GeoTIFFs and :kbd:`meshmask_file`.
+    Water mask files that were stored without keys are only checked by shape.
+
+    :param watermask_path: Path of water mask Numpy array file or water mask cache directory.
+    :type watermask_path: :py:class:`pathlib.Path`
+
+    :param geotiff_store: Store of GeoTIFF rasters to read the "all" rasters from.
+    :type geotiff_store: :py:class:`GeoTIFFStore`
+
+    :param meshmask_file: File path and name of SalishSeaCast NEMO mesh mask to look up the
+                          water mask for in a water mask cache.
+    :type meshmask_file: :py:class:`pathlib.Path`
+
+    :return: Boolean water mask to apply to AIS ship track density GeoTIFF files to restrict
+             them to the SalishSeaCast NEMO domain.
+    :rtype: :py:class:`numpy.ndarray`
+
+    :raises: :py:exc:`ValueError` if the GeoTIFFs have different grids, or the water mask
+             does not match their grid or the mesh mask.
+    """
+    rasters = [geotiff_store.read("all", month) for month in range(1, 13)]
+    grid_keys = {
+        calc_grid_key(raster.transform, (raster.height, raster.width), raster.crs)
+        for raster in rasters
+    }
+    if len(grid_keys) > 1:
+        raise ValueError(
+            f"all_2018_MM.tif GeoTIFFs in {geotiff_store.geotiffs_dir} have "
+            f"{len(grid_keys)} different grids"
+        )
+    raster = rasters[0]
+    shape = (raster.height, raster.width)
+    if watermask_path.is_dir():
+        with xarray.open_dataset(meshmask_file) as ssc_mesh:
+            return read_watermask(
+                watermask_path, raster.transform, shape, raster.crs, ssc_mesh
+            )
+    geotiff_watermask = numpy.load(
+        watermask_path, allow_pickle=False, fix_imports=False
+    )
+    if geotiff_watermask.shape != shape:
+        raise ValueError(
+            f"shape of water mask in {watermask_path} {geotiff_watermask.shape} does not "
+            f"match shape of GeoTIFFs in {geotiff_store.geotiffs_dir} {shape}"
+        )
+    watermask_keys = read_watermask_keys(watermask_path)
+    if watermask_keys is None:
+        logging.warning(
+            f"no GeoTIFF grid and mesh mask keys are stored with water mask in "
+            f"{watermask_path}, so only its shape is checked; please calculate it again "
+            f"with geotiff-watermask to store them"
+        )
+        return geotiff_watermask
+    with xarray.open_dataset(meshmask_file) as ssc_mesh:
+        meshmask_key = calc_meshmask_key(ssc_mesh)
+    (grid_key,) = grid_keys
+    if watermask_keys != (grid_key, meshmask_key):
+        raise ValueError(
+            f"water mask in {watermask_path} was calculated for a different GeoTIFF "
+            f"grid or mesh mask than those of GeoTIFFs in {geotiff_store.geotiffs_dir} "
+            f"and {meshmask_file}"
+        )
+    return geotiff_watermask
+
+
+def load_water_cells(geotiff_watermask, npz_file=None):
+    """Read the sparse index of the water cells of the GeoTIFF water mask from a Numpy
+    :kbd:`.npz` file, or calculate it and store it in the file if it does not exist or was
+    calculated from a different water mask.
+
+    The index arrays are memory-mapped from the file.
+    Please see :py:func:`moad_tools.midoss.geotiff_watermask.calc_water_cells`
+    for details of the index.
+
+    :param geotiff_watermask: Boolean water mask to apply to AIS ship track density GeoTIFF files
+                              to restrict them to the SalishSeaCast NEMO domain.
+    :type geotiff_watermask: :py:class:`numpy.ndarray`
+
+    :param npz_file: File path and name of Numpy :kbd:`.npz` file to read the index from
+                     and write it to; the index is calculated in memory if None.
+    :type npz_file: :py:class:`pathlib.Path` or str or None
+
+    :return: Water cells index.
+    :rtype: :py:class:`types.SimpleNamespace`
+    """
+    if npz_file is None:
+        return calc_water_cells(geotiff_watermask)
+    source_key = _calc_source_key([], geotiff_watermask)
+    if Path(npz_file).exists():
+        water_cells = read_water_cells(npz_file)
+        if water_cells.source_key == source_key:
+            logging.info(f"read water cells index from: {npz_file}")
+            return water_cells
+    _write_cache_file(
+        npz_file,
+        lambda tmp_file: write_water_cells(
+            calc_water_cells(geotiff_watermask), tmp_file, source_key
+        ),
+    )
+    return read_water_cells(npz_file)
+
+
+def calc_vte_probability(
+    geotiffs_dir, geotiff_watermask, geotiff_store=None, water_cells=None
+):
     """Calculate monthly spill probability weights from vessel traffic exposure (VTE)
     in AIS GeoTIFF files, masked to include only cells that are within the SalishSeaCast
     NEMO domain.
@@ -198,20 +896,29 @@ def calc_vte_probability(geotiffs_dir, geotiff_watermask):
                               to restrict them to the SalishSeaCast NEMO domain.
     :type geotiff_watermask: :py:class:`numpy.ndarray`
 
+    :param geotiff_store: Store of GeoTIFF rasters to read from instead of reading
+                          the GeoTIFF files directly.
+    :type geotiff_store: :py:class:`GeoTIFFStore` or None
+
+    :param water_cells: Sparse index of the water cells of :kbd:`geotiff_watermask` from
+                        :py:func:`load_water_cells` to sum the VTE of instead of masking
+                        the whole GeoTIFFs.
+    :type water_cells: :py:class:`types.SimpleNamespace` or None
+
     :return: 12 elements array of monthly spill probability weights
     :rtype: :py:class:`numpy.ndarray`
     """
     logging.info("Calculating monthly spill probability weights from VTE")
+    geotiff_store = geotiff_store or GeoTIFFStore(geotiffs_dir)
     total_vte_by_month = numpy.empty(12)
 
     for month in range(1, 13):
         # The filenames are formatted as "all_2018_MM.tif"
-        f_name = geotiffs_dir / f"all_2018_{month:02d}.tif"
-
-        with rasterio.open(f_name) as dataset:
-            total_vte_by_month[month - 1] = dataset.read(
-                boundless=True, fill_value=0
-            ).sum(where=geotiff_watermask)
+        data = geotiff_store.read("all", month).data
+        if water_cells is None:
+            total_vte_by_month[month - 1] = data.sum(where=geotiff_watermask)
+        else:
+            total_vte_by_month[month - 1] = data.ravel()[water_cells.cells].sum()
 
     # calculate VTE probability by month based on total traffic for each month
     vte_probability = total_vte_by_month / total_vte_by_month.sum()
@@ -219,7 +926,9 @@ def calc_vte_probability(geotiffs_dir, geotiff_watermask):
     return vte_probability
 
 
-def get_date(start_date, end_date, vte_probability, random_generator):
+def get_date(
+    start_date, end_date, vte_probability, random_generator, date_sampler=None
+):
     """Randomly select a spill date and hour, with the month weighted by vessel traffic exposure
     (VTE) probability.
 
@@ -235,28 +944,151 @@ def get_date(start_date, end_date, vte_probability, random_generator):
     :param random_generator: PCG-64 random number generator
     :type random_generator: :py:class:`numpy.random.Generator`
 
+    :param date_sampler: Hourly date sampler for the period from :py:func:`calc_date_sampler`
+                         to use instead of calculating it.
+    :type date_sampler: :py:class:`types.SimpleNamespace` or None
+
     :return: Randomly selected spill date and hour
     :rtype: :py:class:`datetime.datetime`
     """
     logging.info("Selecting random spill date and hour, weighted by overall VTE")
+    date_sampler = date_sampler or calc_date_sampler(start_date, end_date)
     # Randomly select month based on weighting by vessel traffic
     month_random = random_generator.choice(range(1, 13), p=vte_probability)
 
     # Now that month is selected, we need to choose day, year, and time.
     # We weight these all the same.
-    time_period = end_date - start_date
-    time_period_inhours = numpy.int(time_period.total_seconds() / 3600)
-    date_arr = [
-        start_date + timedelta(hours=i) for i in range(0, time_period_inhours + 1)
-    ]
+    hour_index = random_generator.integers(date_sampler.month_hours[month_random - 1])
+    return _calc_sampled_dates(date_sampler, month_random, hour_index)
+
+
+def get_date_batch(
+    start_date,
+    end_date,
+    vte_probability,
+    n_spills,
+    random_generator,
+    date_sampler=None,
+):
+    """Randomly select spill dates and hours for a batch of spills, with the months weighted
+    by vessel traffic exposure (VTE) probability.
+
+    :param start_date: Starting date of period from which spill dates and hours are to be selected.
+    :type start_date: :py:class:`datetime.datetime`
+
+    :param end_date: Ending date of period from which spill dates and hours are to be selected.
+    :type end_date: :py:class:`datetime.datetime`
+
+    :param vte_probability: 12 elements array of monthly spill probability weights
+    :type vte_probability: :py:class:`numpy.ndarray`
+
+    :param int n_spills: Number of spills to select dates and hours for.
+
+    :param random_generator: PCG-64 random number generator
+    :type random_generator: :py:class:`numpy.random.Generator`
+
+    :param date_sampler: Hourly date sampler for the period from :py:func:`calc_date_sampler`
+                         to use instead of calculating it.
+    :type date_sampler: :py:class:`types.SimpleNamespace` or None
+
+    :return: Randomly selected spill dates and hours
+    :rtype: :py:class:`numpy.ndarray` of :py:class:`datetime.datetime`
+    """
+    logging.info(
+        f"Selecting random spill dates and hours for {n_spills} spills, weighted by overall VTE"
+    )
+    date_sampler = date_sampler or calc_date_sampler(start_date, end_date)
+    months = random_generator.choice(
+        numpy.arange(1, 13), size=n_spills, p=vte_probability
+    )
+
+    spill_date_hours = numpy.empty(n_spills, dtype=object)
+    for month in numpy.unique(months):
+        spills = months == month
+        hour_indices = random_generator.integers(
+            date_sampler.month_hours[month - 1], size=spills.sum()
+        )
+        spill_date_hours[spills] = _calc_sampled_dates(
+            date_sampler, month, hour_indices
+        )
+    return spill_date_hours
+
+
+def calc_date_sampler(start_date, end_date):
+    """Calculate a sampler that chooses the hours from :kbd:`start_date` to :kbd:`end_date`
+    in a given month without constructing a list of all of the hours in the period.
+
+    The period is split into segments of consecutive hours in the same month of each year.
+    For each month, the sampler holds the offsets in hours from :kbd:`start_date` of the first
+    hours of the month's segments, and the indices of those hours among all of the month's
+    hours in the period.
+    So, the :kbd:`i`-th hour of a month in the period is found with a binary search in
+    the indices, and integer arithmetic.
+
+    The hours are :kbd:`start_date`, :kbd:`start_date + 1 hour`, ... up to and including
+    :kbd:`end_date` if the period is a whole number of hours long.
+
+    :param start_date: Starting date of period from which spill dates and hours are to be selected.
+    :type start_date: :py:class:`datetime.datetime`
+
+    :param end_date: Ending date of period from which spill dates and hours are to be selected.
+    :type end_date: :py:class:`datetime.datetime`
+
+    :return: Namespace of the period :kbd:`start_date`, 12 element array of the number of
+             :kbd:`month_hours` in the period, and month number keyed dicts of segment
+             :kbd:`offsets` and :kbd:`first_hours` arrays.
+    :rtype: :py:class:`types.SimpleNamespace`
+    """
+    one_hour = numpy.timedelta64(1, "h")
+    start = numpy.datetime64(start_date.replace(tzinfo=None), "us")
+    n_hours = int((end_date - start_date).total_seconds() / 3600) + 1
+    end = start + (n_hours - 1) * one_hour
+    # Hour offsets from start of the first hour in each month of the period
+    month_starts = numpy.arange(
+        start.astype("datetime64[M]"), end.astype("datetime64[M]") + 2
+    )
+    boundaries = numpy.clip(-((start - month_starts) // one_hour), 0, n_hours)
+    segment_offsets = boundaries[:-1]
+    segment_hours = numpy.diff(boundaries)
+    segment_months = month_starts[:-1].astype(int) % 12 + 1
+
+    month_hours = numpy.zeros(12, dtype=int)
+    offsets, first_hours = {}, {}
+    for month in range(1, 13):
+        segments = segment_months == month
+        month_hours[month - 1] = segment_hours[segments].sum()
+        offsets[month] = segment_offsets[segments]
+        first_hours[month] = (
+            numpy.cumsum(segment_hours[segments]) - segment_hours[segments]
+        )
+    return SimpleNamespace(
+        start_date=start_date,
+        month_hours=month_hours,
+        offsets=offsets,
+        first_hours=first_hours,
+    )
 
-    # Extract dates in time period for only the month selected as month_random
-    date_arr_select = []
-    for days in date_arr:
-        if days.month == month_random:
-            date_arr_select.append(days)
 
-    return random_generator.choice(date_arr_select)
+def _calc_sampled_dates(date_sampler, month, hour_indices):
+    """
+    :param :py:class:`types.SimpleNamespace` date_sampler:
+    :param int month:
+    :param int or :py:class:`numpy.ndarray` hour_indices:
+    :rtype: :py:class:`datetime.datetime` or :py:class:`numpy.ndarray`
+    """
+    first_hours = date_sampler.first_hours[month]
+    segments = first_hours.searchsorted(hour_indices, side="right") - 1
+    hour_offsets = (
+        date_sampler.offsets[month][segments] + hour_indices - first_hours[segments]
+    )
+    if numpy.ndim(hour_offsets) == 0:
+        return date_sampler.start_date + timedelta(hours=int(hour_offsets))
+    return numpy.array(
+        [
+            date_sampler.start_date + timedelta(hours=int(hour_offset))
+            for hour_offset in hour_offsets
+        ]
+    )
 
 
 def get_lat_lon_indices(
@@ -265,6 +1097,10 @@ def get_lat_lon_indices(
     geotiff_watermask,
     ssc_mesh,
     random_generator,
+    geotiff_store=None,
+    vte_cell_samplers=None,
+    spill_location_sampler=None,
+    water_cells=None,
 ):
     """Randomly select a spill lat/lon based on vessel traffic exposure (VTE)
     in a particular month's AIS GeoTIFF file. The VTE data are masked to include
@@ -282,259 +1118,1736 @@ def get_lat_lon_indices(
                               to restrict them to the SalishSeaCast NEMO domain.
     :type geotiff_watermask: :py:class:`numpy.ndarray`
 
-    :param ssc_mesh: SalishSeaCast NEMO mesh mask dataset to use the NEMO grid lons/lats
-                     and T-grid water/land maks from to calculate the water mask.
-    :type ssc_mesh: :py:class:`xarray.Dataset`
+    :param ssc_mesh: SalishSeaCast NEMO mesh mask dataset to use the NEMO grid lons/lats
+                     and T-grid water/land maks from to calculate the water mask.
+    :type ssc_mesh: :py:class:`xarray.Dataset`
+
+    :param random_generator: PCG-64 random number generator.
+    :type random_generator: :py:class:`numpy.random.Generator`
+
+    :param geotiff_store: Store of GeoTIFF rasters to read from instead of reading
+                          the GeoTIFF files directly.
+    :type geotiff_store: :py:class:`GeoTIFFStore` or None
+
+    :param dict vte_cell_samplers: Month number keyed dict of GeoTIFF cell samplers from
+                                   :py:func:`calc_vte_cell_samplers` to choose the GeoTIFF
+                                   cell with instead of calculating the month's sampler.
+
+    :param spill_location_sampler: Map of SalishSeaCast NEMO T-grid water points in GeoTIFF
+                                   cells from :py:func:`calc_spill_location_sampler`
+                                   to choose the NEMO grid cell from instead of searching
+                                   the whole NEMO grid.
+    :type spill_location_sampler: :py:class:`types.SimpleNamespace` or None
+
+    :param water_cells: Sparse index of the water cells of :kbd:`geotiff_watermask` from
+                        :py:func:`load_water_cells` to calculate the month's sampler from
+                        instead of masking the whole GeoTIFF.
+    :type water_cells: :py:class:`types.SimpleNamespace` or None
+
+    :return: 6-tuple composed of:
+
+             * spill latitude [°N in [-90°, 90°] range]
+             * spill longitude [°E in [-180°, 180°] range]
+             * x-index of GeoTIFF cell in which spill is located
+             * y-index of GeoTIFF cell in which spill is located
+             * GeoTIFF cell bounding box
+             * value of GeoTIFF cell in which spill is located (for QA/QC)
+
+    :rtype: tuple
+    """
+    logging.info(
+        f"Selecting random spill location within SalishSeaCast domain, "
+        f"weighted by VTE in 2018-{spill_month:02d}"
+    )
+    geotiff_store = geotiff_store or GeoTIFFStore(geotiffs_dir)
+    raster = geotiff_store.read("all", spill_month)
+    try:
+        sampler = vte_cell_samplers[spill_month]
+    except (KeyError, TypeError):
+        sampler = _calc_vte_cell_sampler(raster, geotiff_watermask, water_cells)
+
+    # Choose a random GeoTIFF cell, weighted by the month's VTE probability distribution
+    # of water cells, and calculated the cell's x/y indices
+    mp = _choose_geotiff_cells(sampler, random_generator.random())
+    px = mp // sampler.width
+    py = mp % sampler.width
+
+    geotiff_bbox = _calc_geotiff_bbox(sampler.transform, px, py)
+    lat, lon = _choose_spill_lat_lon(
+        ssc_mesh,
+        geotiff_bbox,
+        random_generator,
+        spill_location_sampler,
+        mp if _is_same_grid(spill_location_sampler, sampler) else None,
+    )
+
+    return lat, lon, px, py, geotiff_bbox, raster.data[px, py]
+
+
+def get_lat_lon_indices_batch(
+    geotiffs_dir,
+    spill_months,
+    geotiff_watermask,
+    ssc_mesh,
+    random_generator,
+    geotiff_store=None,
+    vte_cell_samplers=None,
+    spill_location_sampler=None,
+    water_cells=None,
+):
+    """Randomly select spill lats/lons for a batch of spills based on vessel traffic
+    exposure (VTE) in the spill months' AIS GeoTIFF files.
+    Please see :py:func:`get_lat_lon_indices` for details of the selection algorithm.
+
+    :param geotiffs_dir: Directory path to read AIS GeoTIFF files from.
+    :type geotiffs_dir: :py:class:`pathlib.Path`
+
+    :param spill_months: Month numbers for which to choose spill locations.
+    :type spill_months: :py:class:`numpy.ndarray`
+
+    :param geotiff_watermask: Boolean water mask to apply to AIS ship track density GeoTIFF files
+                              to restrict them to the SalishSeaCast NEMO domain.
+    :type geotiff_watermask: :py:class:`numpy.ndarray`
+
+    :param ssc_mesh: SalishSeaCast NEMO mesh mask dataset to use the NEMO grid lons/lats
+                     and T-grid water/land maks from to calculate the water mask.
+    :type ssc_mesh: :py:class:`xarray.Dataset`
+
+    :param random_generator: PCG-64 random number generator.
+    :type random_generator: :py:class:`numpy.random.Generator`
+
+    :param geotiff_store: Store of GeoTIFF rasters to read from instead of reading
+                          the GeoTIFF files directly.
+    :type geotiff_store: :py:class:`GeoTIFFStore` or None
+
+    :param dict vte_cell_samplers: Month number keyed dict of GeoTIFF cell samplers from
+                                   :py:func:`calc_vte_cell_samplers` to choose the GeoTIFF
+                                   cells with instead of calculating the months' samplers.
+
+    :param spill_location_sampler: Map of SalishSeaCast NEMO T-grid water points in GeoTIFF
+                                   cells from :py:func:`calc_spill_location_sampler`
+                                   to choose the NEMO grid cells from instead of searching
+                                   the whole NEMO grid.
+    :type spill_location_sampler: :py:class:`types.SimpleNamespace` or None
+
+    :param water_cells: Sparse index of the water cells of :kbd:`geotiff_watermask` from
+                        :py:func:`load_water_cells` to calculate the months' samplers from
+                        instead of masking the whole GeoTIFFs.
+    :type water_cells: :py:class:`types.SimpleNamespace` or None
+
+    :return: Namespace of :kbd:`spill_lat`, :kbd:`spill_lon`, :kbd:`geotiff_x_index`,
+             :kbd:`geotiff_y_index`, and :kbd:`geotiff_bbox` arrays with an element for
+             each spill.
+    :rtype: :py:class:`types.SimpleNamespace`
+    """
+    n_spills = spill_months.size
+    logging.info(
+        f"Selecting random spill locations for {n_spills} spills within SalishSeaCast domain, "
+        f"weighted by monthly VTE"
+    )
+    # Draw the uniform deviates for the GeoTIFF cell choices in spill order so that the
+    # stream does not depend on the order in which the months are processed
+    cell_uniforms = random_generator.random(n_spills)
+    geotiff_store = geotiff_store or GeoTIFFStore(geotiffs_dir)
+    geotiff_x_index = numpy.empty(n_spills, dtype=int)
+    geotiff_y_index = numpy.empty(n_spills, dtype=int)
+    geotiff_bbox = numpy.empty(n_spills, dtype=object)
+    geotiff_cells = numpy.full(n_spills, None, dtype=object)
+    for month in numpy.unique(spill_months):
+        spills = numpy.flatnonzero(spill_months == month)
+        try:
+            sampler = vte_cell_samplers[month]
+        except (KeyError, TypeError):
+            sampler = _calc_vte_cell_sampler(
+                geotiff_store.read("all", month), geotiff_watermask, water_cells
+            )
+        cells = _choose_geotiff_cells(sampler, cell_uniforms[spills])
+        geotiff_x_index[spills] = cells // sampler.width
+        geotiff_y_index[spills] = cells % sampler.width
+        if _is_same_grid(spill_location_sampler, sampler):
+            geotiff_cells[spills] = cells
+        for spill in spills:
+            geotiff_bbox[spill] = _calc_geotiff_bbox(
+                sampler.transform, geotiff_x_index[spill], geotiff_y_index[spill]
+            )
+
+    spill_lat = numpy.empty(n_spills)
+    spill_lon = numpy.empty(n_spills)
+    for spill in range(n_spills):
+        spill_lat[spill], spill_lon[spill] = _choose_spill_lat_lon(
+            ssc_mesh,
+            geotiff_bbox[spill],
+            random_generator,
+            spill_location_sampler,
+            geotiff_cells[spill],
+        )
+
+    return SimpleNamespace(
+        spill_lat=spill_lat,
+        spill_lon=spill_lon,
+        geotiff_x_index=geotiff_x_index,
+        geotiff_y_index=geotiff_y_index,
+        geotiff_bbox=geotiff_bbox,
+    )
+
+
+def calc_vte_cell_samplers(geotiff_store, geotiff_watermask, water_cells=None):
+    """Calculate samplers for each month that choose GeoTIFF cells weighted by the month's
+    vessel traffic exposure (VTE).
+
+    The samplers hold the cumulative VTE probability distribution of only the cells that are
+    within the SalishSeaCast NEMO domain and have non-zero VTE, and the flattened indices of
+    those cells.
+    So, choosing a cell is a binary search in the cumulative distribution.
+
+    :param geotiff_store: Store of GeoTIFF rasters to read the "all" rasters from.
+    :type geotiff_store: :py:class:`GeoTIFFStore`
+
+    :param geotiff_watermask: Boolean water mask to apply to AIS ship track density GeoTIFF files
+                              to restrict them to the SalishSeaCast NEMO domain.
+    :type geotiff_watermask: :py:class:`numpy.ndarray`
+
+    :param water_cells: Sparse index of the water cells of :kbd:`geotiff_watermask` from
+                        :py:func:`load_water_cells` to calculate the samplers from
+                        instead of masking the whole GeoTIFFs.
+    :type water_cells: :py:class:`types.SimpleNamespace` or None
+
+    :return: Month number keyed dict of samplers that are namespaces of :kbd:`cells`,
+             :kbd:`cdf`, and the GeoTIFF :kbd:`width` and :kbd:`transform`.
+    :rtype: dict
+    """
+    logging.info("Calculating monthly GeoTIFF cell samplers from VTE")
+    return {
+        month: _calc_vte_cell_sampler(
+            geotiff_store.read("all", month), geotiff_watermask, water_cells
+        )
+        for month in range(1, 13)
+    }
+
+
+def _calc_vte_cell_sampler(raster, geotiff_watermask, water_cells=None):
+    """
+    :param :py:class:`types.SimpleNamespace` raster:
+    :param :py:class:`numpy.ndarray` geotiff_watermask:
+    :param :py:class:`types.SimpleNamespace` or None water_cells:
+    :rtype: :py:class:`types.SimpleNamespace`
+    """
+    if water_cells is None:
+        # Zero any points that are non-water or outside the SalishSeaCast domain
+        data = (raster.data * geotiff_watermask).flatten()
+        # Calculate probability of traffic by VTE in the month, and its cumulative
+        # distribution in the same way as numpy.random.Generator.choice() does so that
+        # a cell chosen with the sampler is the one that choice() would have chosen for the
+        # same random deviate
+        cdf = numpy.cumsum(data / data.sum())
+        cdf /= cdf[-1]
+        cells = numpy.flatnonzero(data)
+        return SimpleNamespace(
+            cells=cells, cdf=cdf[cells], width=raster.width, transform=raster.transform
+        )
+    # Only the water cells contribute to the cumulative distribution; the zero VTE of the
+    # other cells adds nothing to it
+    data = raster.data.ravel()[water_cells.cells]
+    nonzero = numpy.flatnonzero(data)
+    cdf = numpy.cumsum(data[nonzero] / data.sum())
+    cdf /= cdf[-1]
+    return SimpleNamespace(
+        cells=water_cells.cells[nonzero],
+        cdf=cdf,
+        width=raster.width,
+        transform=raster.transform,
+    )
+
+
+def _choose_geotiff_cells(sampler, uniforms):
+    """
+    :param :py:class:`types.SimpleNamespace` sampler:
+    :param float or :py:class:`numpy.ndarray` uniforms:
+    :rtype: int or :py:class:`numpy.ndarray`
+    """
+    return sampler.cells[sampler.cdf.searchsorted(uniforms, side="right")]
+
+
+def write_vte_cell_samplers(vte_cell_samplers, npz_file, source_key=""):
+    """Store monthly GeoTIFF cell samplers in a Numpy :kbd:`.npz` file.
+
+    :param dict vte_cell_samplers: Month number keyed dict of GeoTIFF cell samplers from
+                                   :py:func:`calc_vte_cell_samplers`.
+
+    :param npz_file: File path and name of Numpy :kbd:`.npz` file to write the samplers to.
+    :type npz_file: :py:class:`pathlib.Path` or str
+
+    :param str source_key: Key that identifies the GeoTIFFs and water mask that the
+                           samplers were calculated from.
+    """
+    arrays = {"source_key": numpy.array(source_key)}
+    for month, sampler in vte_cell_samplers.items():
+        arrays.update(
+            {
+                f"cells_{month:02d}": sampler.cells,
+                f"cdf_{month:02d}": sampler.cdf,
+                f"width_{month:02d}": numpy.array(sampler.width),
+                f"transform_{month:02d}": numpy.array(sampler.transform[:6]),
+            }
+        )
+    _write_cache_file(npz_file, lambda tmp_file: numpy.savez(tmp_file, **arrays))
+    logging.info(f"wrote GeoTIFF cell samplers to: {npz_file}")
+
+
+def read_vte_cell_samplers(npz_file):
+    """Read monthly GeoTIFF cell samplers from a Numpy :kbd:`.npz` file that was written by
+    :py:func:`write_vte_cell_samplers`.
+
+    :param npz_file: File path and name of Numpy :kbd:`.npz` file to read the samplers from.
+    :type npz_file: :py:class:`pathlib.Path` or str
+
+    :return: 2-tuple composed of:
+
+             * month number keyed dict of GeoTIFF cell samplers
+             * key that identifies the GeoTIFFs and water mask that the samplers were
+               calculated from (str)
+
+    :rtype: tuple
+    """
+    with numpy.load(npz_file, allow_pickle=False) as npz:
+        vte_cell_samplers = {
+            int(name[-2:]): SimpleNamespace(
+                cells=npz[f"cells_{name[-2:]}"],
+                cdf=npz[f"cdf_{name[-2:]}"],
+                width=int(npz[f"width_{name[-2:]}"]),
+                transform=rasterio.Affine(*npz[f"transform_{name[-2:]}"]),
+            )
+            for name in npz.files
+            if name.startswith("cells_")
+        }
+        source_key = str(npz["source_key"])
+    return vte_cell_samplers, source_key
+
+
+def load_vte_cell_samplers(
+    geotiff_store, geotiff_watermask, npz_file=None, water_cells=None
+):
+    """Read monthly GeoTIFF cell samplers from a Numpy :kbd:`.npz` file, or calculate them
+    and store them in the file if it does not exist or was calculated from different
+    GeoTIFFs or water mask.
+
+    :param geotiff_store: Store of GeoTIFF rasters to read the "all" rasters from.
+    :type geotiff_store: :py:class:`GeoTIFFStore`
+
+    :param geotiff_watermask: Boolean water mask to apply to AIS ship track density GeoTIFF files
+                              to restrict them to the SalishSeaCast NEMO domain.
+    :type geotiff_watermask: :py:class:`numpy.ndarray`
+
+    :param npz_file: File path and name of Numpy :kbd:`.npz` file to read the samplers from
+                     and write them to; samplers are calculated in memory if None.
+    :type npz_file: :py:class:`pathlib.Path` or str or None
+
+    :param water_cells: Sparse index of the water cells of :kbd:`geotiff_watermask` from
+                        :py:func:`load_water_cells` to calculate the samplers from
+                        instead of masking the whole GeoTIFFs.
+    :type water_cells: :py:class:`types.SimpleNamespace` or None
+
+    :return: Month number keyed dict of GeoTIFF cell samplers.
+    :rtype: dict
+    """
+    if npz_file is None:
+        return calc_vte_cell_samplers(geotiff_store, geotiff_watermask, water_cells)
+    geotiff_files = [
+        geotiff_store.geotiffs_dir / f"all_2018_{month:02d}.tif"
+        for month in range(1, 13)
+    ]
+    source_key = _calc_source_key(geotiff_files, geotiff_watermask)
+    if Path(npz_file).exists():
+        vte_cell_samplers, cached_source_key = read_vte_cell_samplers(npz_file)
+        if cached_source_key == source_key:
+            logging.info(f"read GeoTIFF cell samplers from: {npz_file}")
+            return vte_cell_samplers
+    vte_cell_samplers = calc_vte_cell_samplers(
+        geotiff_store, geotiff_watermask, water_cells
+    )
+    write_vte_cell_samplers(vte_cell_samplers, npz_file, source_key)
+    return vte_cell_samplers
+
+
+def _calc_source_key(source_files, *arrays):
+    """Calculate a key that identifies the versions of the files and the contents of the
+    arrays that precomputed data are calculated from.
+
+    :param list source_files: Paths of files that precomputed data are calculated from.
+
+    :param arrays: Arrays that precomputed data are calculated from.
+    :type arrays: :py:class:`numpy.ndarray`
+
+    :rtype: str
+    """
+    key = hashlib.sha256()
+    for source_file in source_files:
+        stat = Path(source_file).stat()
+        key.update(f"{source_file}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    for array in arrays:
+        key.update(numpy.ascontiguousarray(array).tobytes())
+    return key.hexdigest()
+
+
+def _inverse_cdf_choice(weights, uniforms):
+    """Choose indices from weights by inverting their cumulative distribution at uniform
+    deviates.
+
+    This is the algorithm that :py:meth:`numpy.random.Generator.choice` uses when it is given
+    a probability distribution, so, for the same deviates, the choices are the same.
+    If :kbd:`weights` is 2-dimensional, each row is a separate distribution for the
+    corresponding element of :kbd:`uniforms`.
+
+    :param weights: Non-negative weights to choose indices by.
+    :type weights: :py:class:`numpy.ndarray`
+
+    :param uniforms: Uniform deviates in [0, 1).
+    :type uniforms: :py:class:`numpy.ndarray`
+
+    :return: Chosen indices.
+    :rtype: :py:class:`numpy.ndarray`
+
+    :raises: :py:exc:`ValueError` if weights are negative or a distribution has no
+             positive weights, as :py:meth:`numpy.random.Generator.choice` does.
+    """
+    totals = weights.sum(axis=-1, keepdims=True)
+    # Written so that NaN weights fail the checks too
+    if not numpy.all(weights >= 0):
+        raise ValueError("weights must be non-negative")
+    if not numpy.all(totals > 0):
+        raise ValueError("weights must have a positive sum")
+    cdf = numpy.cumsum(weights / totals, axis=-1)
+    cdf /= cdf[..., -1:]
+    if cdf.ndim == 1:
+        return cdf.searchsorted(uniforms, side="right")
+    return (cdf <= uniforms[:, numpy.newaxis]).sum(axis=-1)
+
+
+def _calc_geotiff_bbox(transform, px, py):
+    """Construct the bounding box of a GeoTIFF cell from the lats/lons of its lower-right and
+    upper-left corners.
+
+    :param transform: Affine transform of the GeoTIFF.
+    :type transform: :py:class:`affine.Affine`
+
+    :param int px: x-index of the GeoTIFF cell.
+
+    :param int py: y-index of the GeoTIFF cell.
+
+    :rtype: :py:class:`shapely.geometry.Polygon`
+    """
+    llx, lly = rasterio.transform.xy(transform, px + 0.5, py - 0.5)
+    urx, ury = rasterio.transform.xy(transform, px - 0.5, py + 0.5)
+    return shapely.geometry.Polygon(
+        [(llx, lly), (urx, lly), (urx, ury), (llx, ury), (llx, lly)]
+    )
+
+
+def _choose_spill_lat_lon(
+    ssc_mesh,
+    geotiff_bbox,
+    random_generator,
+    spill_location_sampler=None,
+    geotiff_cell=None,
+):
+    """Randomly choose a spill lat/lon at one of 9 uniformly distributed sub-grid points within
+    a randomly chosen SalishSeaCast NEMO surface water grid cell in a GeoTIFF cell.
+
+    :param ssc_mesh: SalishSeaCast NEMO mesh mask dataset to use the NEMO grid lons/lats
+                     and T-grid water/land maks from.
+    :type ssc_mesh: :py:class:`xarray.Dataset`
+
+    :param geotiff_bbox: GeoTIFF cell bounding box.
+    :type geotiff_bbox: :py:class:`shapely.geometry.Polygon`
+
+    :param random_generator: PCG-64 random number generator.
+    :type random_generator: :py:class:`numpy.random.Generator`
+
+    :param spill_location_sampler: Map of SalishSeaCast NEMO T-grid water points in GeoTIFF
+                                   cells from :py:func:`calc_spill_location_sampler`.
+                                   It is only used if :kbd:`geotiff_cell` is also given.
+    :type spill_location_sampler: :py:class:`types.SimpleNamespace` or None
+
+    :param int geotiff_cell: Flattened index of the GeoTIFF cell in the
+                             :kbd:`spill_location_sampler` grid.
+
+    :return: 2-tuple of spill latitude [°N] and longitude [°E]
+    :rtype: tuple
+    """
+    if spill_location_sampler is not None and geotiff_cell is not None:
+        ssc_lons = spill_location_sampler.lons
+        ssc_lats = spill_location_sampler.lats
+        width = spill_location_sampler.nemo_width
+        indptr = spill_location_sampler.indptr
+        inner_points = spill_location_sampler.tpoints[
+            indptr[geotiff_cell] : indptr[geotiff_cell + 1]
+        ]
+        if inner_points.size == 0:
+            raise ValueError(
+                f"no SalishSeaCast T-grid water points in GeoTIFF cell {geotiff_bbox.bounds}"
+            )
+        # Choose a random SalishSeaCast T-grid water point in the GeoTIFF cell with the same
+        # uniform deviate and cumulative distribution inversion that choice() uses below
+        ssp = inner_points[
+            _inverse_cdf_choice(
+                numpy.ones(inner_points.size), random_generator.random()
+            )
+        ]
+    else:
+        llx, lly, urx, ury = geotiff_bbox.bounds
+
+        # Find the SalishSeaCast T-grid water points in the GeoTIFF cell
+        ssc_lons = ssc_mesh.glamt.isel(t=0).values.ravel()
+        ssc_lats = ssc_mesh.gphit.isel(t=0).values.ravel()
+        ssc_tmask = ssc_mesh.tmask.isel(t=0, z=0)
+        width = ssc_tmask.x.size
+        inner_points = (
+            numpy.where(ssc_tmask.values.ravel() == 1, 1, 0)
+            * numpy.where(ssc_lons > llx, 1, 0)
+            * numpy.where(ssc_lons < urx, 1, 0)
+            * numpy.where(ssc_lats > lly, 1, 0)
+            * numpy.where(ssc_lats < ury, 1, 0)
+        )
+
+        # Choose a random SalishSeaCast T-grid water point, and calculate its lat/lon.
+        # The probability distribution here acts as a filter to restrict the choice of
+        # SalishSeaCast T-grid points to those that were found above to be within the chosen
+        # GeoTIFF cell.
+        ssp = random_generator.choice(
+            ssc_tmask.size,
+            p=inner_points / inner_points.sum(),
+        )
+    sslon = ssc_lons[ssp]
+    sslat = ssc_lats[ssp]
+
+    # Choose a random one of the nine points in the horizontal plane of a
+    # SalishSeaCast T-grid cell
+    shift = random_generator.choice(list(SUB_GRID_POINTS.keys()))
+
+    # Calculate the SalishSeaCast T-grid cell size in degrees of lat & lon
+    londx, latdx = (
+        ssc_lons[ssp + 1] - ssc_lons[ssp],
+        ssc_lats[ssp + 1] - ssc_lats[ssp],
+    )
+    londy, latdy = (
+        ssc_lons[ssp + width] - ssc_lons[ssp],
+        ssc_lats[ssp + width] - ssc_lats[ssp],
+    )
+
+    # Calculate lat/lon of the spill
+    lat = sslat + latdx * SUB_GRID_POINTS[shift].dx + latdy * SUB_GRID_POINTS[shift].dy
+    lon = sslon + londx * SUB_GRID_POINTS[shift].dx + londy * SUB_GRID_POINTS[shift].dy
+
+    return lat, lon
+
+
+#: Nine points in the horizontal plane of a SalishSeaCast T-grid cell at which spills are
+#: located, as fractions of the grid cell size in the x and y directions
+SUB_GRID_POINTS = {
+    "center": SimpleNamespace(dx=0, dy=0),
+    "left": SimpleNamespace(dx=1 / 3, dy=0),
+    "uleft": SimpleNamespace(dx=1 / 3, dy=1 / 3),
+    "upper": SimpleNamespace(dx=0, dy=1 / 3),
+    "uright": SimpleNamespace(dx=-1 / 3, dy=1 / 3),
+    "right": SimpleNamespace(dx=-1 / 3, dy=0),
+    "lright": SimpleNamespace(dx=-1 / 3, dy=-1 / 3),
+    "lower": SimpleNamespace(dx=0, dy=-1 / 3),
+    "lleft": SimpleNamespace(dx=1 / 3, dy=-1 / 3),
+}
+
+
+def calc_spill_location_sampler(transform, shape, ssc_mesh):
+    """Calculate a map of the SalishSeaCast NEMO T-grid water points that are in each cell of
+    the AIS ship track density GeoTIFF grid so that the NEMO grid cells in which spills can be
+    located in a GeoTIFF cell are found by lookup instead of by searching the NEMO grid.
+
+    Please see :py:func:`moad_tools.midoss.geotiff_watermask.calc_tpoint_cell_map`
+    for details of the map.
+
+    :param transform: Affine transform of the GeoTIFF grid.
+    :type transform: :py:class:`affine.Affine`
+
+    :param tuple shape: Shape of the GeoTIFF grid.
+
+    :param ssc_mesh: SalishSeaCast NEMO mesh mask dataset to use the NEMO grid lons/lats
+                     and T-grid water/land maks from.
+    :type ssc_mesh: :py:class:`xarray.Dataset`
+
+    :return: Namespace of CSR :kbd:`indptr` and :kbd:`tpoints` arrays, the GeoTIFF
+             :kbd:`transform` and :kbd:`width`, the flattened NEMO T-grid :kbd:`lons`
+             and :kbd:`lats` arrays, and the NEMO grid :kbd:`nemo_width`.
+    :rtype: :py:class:`types.SimpleNamespace`
+    """
+    logging.info(
+        "Calculating map of SalishSeaCast T-grid water points in GeoTIFF cells"
+    )
+    indptr, tpoints = calc_tpoint_cell_map(transform, shape, ssc_mesh)
+    return _calc_spill_location_sampler(indptr, tpoints, transform, shape[1], ssc_mesh)
+
+
+def _calc_spill_location_sampler(indptr, tpoints, transform, width, ssc_mesh):
+    """
+    :param :py:class:`numpy.ndarray` indptr:
+    :param :py:class:`numpy.ndarray` tpoints:
+    :param :py:class:`affine.Affine` transform:
+    :param int width:
+    :param :py:class:`xarray.Dataset` ssc_mesh:
+    :rtype: :py:class:`types.SimpleNamespace`
+    """
+    return SimpleNamespace(
+        indptr=indptr,
+        tpoints=tpoints,
+        transform=transform,
+        width=width,
+        lons=ssc_mesh.glamt.isel(t=0).values.ravel(),
+        lats=ssc_mesh.gphit.isel(t=0).values.ravel(),
+        nemo_width=ssc_mesh.x.size,
+    )
+
+
+def _is_same_grid(spill_location_sampler, vte_cell_sampler):
+    """
+    :param :py:class:`types.SimpleNamespace` or None spill_location_sampler:
+    :param :py:class:`types.SimpleNamespace` vte_cell_sampler:
+    :rtype: boolean
+    """
+    # The map can only be used for cells of the GeoTIFF grid that it was calculated for
+    return (
+        spill_location_sampler is not None
+        and spill_location_sampler.transform == vte_cell_sampler.transform
+        and spill_location_sampler.width == vte_cell_sampler.width
+    )
+
+
+def load_spill_location_sampler(geotiff_store, ssc_mesh, meshmask_file, npz_file=None):
+    """Read the map of SalishSeaCast NEMO T-grid water points in GeoTIFF cells from a Numpy
+    :kbd:`.npz` file, or calculate it for the grid of the January "all" GeoTIFF and store it
+    in the file if it does not exist or was calculated from a different GeoTIFF or mesh mask.
+
+    :param geotiff_store: Store of GeoTIFF rasters to read the "all" raster grid from.
+    :type geotiff_store: :py:class:`GeoTIFFStore`
+
+    :param ssc_mesh: SalishSeaCast NEMO mesh mask dataset to use the NEMO grid lons/lats
+                     and T-grid water/land maks from.
+    :type ssc_mesh: :py:class:`xarray.Dataset`
+
+    :param meshmask_file: File path and name of the SalishSeaCast NEMO mesh mask that
+                          :kbd:`ssc_mesh` was opened from.
+    :type meshmask_file: :py:class:`pathlib.Path`
+
+    :param npz_file: File path and name of Numpy :kbd:`.npz` file to read the map from
+                     and write it to; the map is calculated in memory if None.
+    :type npz_file: :py:class:`pathlib.Path` or str or None
+
+    :return: Map of T-grid water points in GeoTIFF cells; see
+             :py:func:`calc_spill_location_sampler`.
+    :rtype: :py:class:`types.SimpleNamespace`
+    """
+    raster = geotiff_store.read("all", 1)
+    if npz_file is None:
+        return calc_spill_location_sampler(
+            raster.transform, (raster.height, raster.width), ssc_mesh
+        )
+    source_key = _calc_source_key(
+        [geotiff_store.geotiffs_dir / "all_2018_01.tif", meshmask_file]
+    )
+    if Path(npz_file).exists():
+        with numpy.load(npz_file, allow_pickle=False) as npz:
+            if str(npz["source_key"]) == source_key:
+                logging.info(
+                    f"read map of T-grid points in GeoTIFF cells from: {npz_file}"
+                )
+                return _calc_spill_location_sampler(
+                    npz["indptr"],
+                    npz["tpoints"],
+                    rasterio.Affine(*npz["transform"]),
+                    int(npz["width"]),
+                    ssc_mesh,
+                )
+    spill_location_sampler = calc_spill_location_sampler(
+        raster.transform, (raster.height, raster.width), ssc_mesh
+    )
+    arrays = {
+        "indptr": spill_location_sampler.indptr,
+        "tpoints": spill_location_sampler.tpoints,
+        "transform": numpy.array(spill_location_sampler.transform[:6]),
+        "width": numpy.array(spill_location_sampler.width),
+        "source_key": numpy.array(source_key),
+    }
+    _write_cache_file(npz_file, lambda tmp_file: numpy.savez(tmp_file, **arrays))
+    logging.info(f"wrote map of T-grid points in GeoTIFF cells to: {npz_file}")
+    return spill_location_sampler
+
+
+def get_vessel_type(
+    geotiffs_dir,
+    vessel_types,
+    spill_month,
+    geotiff_x_index,
+    geotiff_y_index,
+    random_generator,
+    geotiff_store=None,
+    vessel_type_vte_cube=None,
+):
+    """Randomly choose a vessel type from which the spill occurs, with the choice weighted by the
+    vessel traffic exposure (VTE) for the specified month and GeoTIFF cell.
+
+    :param geotiffs_dir: Directory path to read AIS GeoTIFF files from.
+    :type geotiffs_dir: :py:class:`pathlib.Path`
+
+    :param list vessel_types: Vessel types from which spill can occur,
+                              and for which there are monthly 2018 VTE GeoTIFFs.
+
+    :param int spill_month: Month number for which to choose a spill location.
+
+    :param int geotiff_x_index: x-index of GeoTIFF cell in which spill is located
+
+    :param int geotiff_y_index: y-index of GeoTIFF cell in which spill is located
+
+    :param random_generator: PCG-64 random number generator.
+    :type random_generator: :py:class:`numpy.random.Generator`
+
+    :param geotiff_store: Store of GeoTIFF rasters to read from instead of reading
+                          the GeoTIFF files directly.
+    :type geotiff_store: :py:class:`GeoTIFFStore` or None
+
+    :param vessel_type_vte_cube: Vessel type VTE cube from
+                                 :py:func:`calc_vessel_type_vte_cube` to look up the VTE
+                                 in instead of reading the GeoTIFF rasters.
+    :type vessel_type_vte_cube: :py:class:`types.SimpleNamespace` or None
+
+    :return: Randomly selected vessel type from which spill occurs.
+    :rtype: str
+    """
+    logging.info(
+        f"Selecting random vessel type from which spill occurs, "
+        f"weighted by VTE in 2018-{spill_month:02d} GeoTIFF cell "
+        f"({geotiff_x_index}, {geotiff_y_index})"
+    )
+    # Calculate vessel traffic exposure (VTE) [hours/km^2] for each vessel type
+    # at the spill location for the month in which the spill occurs
+    if vessel_type_vte_cube is not None:
+        vte_by_vessel_type = lookup_vessel_type_vte(
+            vessel_type_vte_cube,
+            vessel_types,
+            numpy.array([spill_month]),
+            numpy.array([geotiff_x_index]),
+            numpy.array([geotiff_y_index]),
+        )[0]
+    else:
+        geotiff_store = geotiff_store or GeoTIFFStore(geotiffs_dir)
+        vte_by_vessel_type = numpy.empty(len(vessel_types))
+        for i, vessel_type in enumerate(vessel_types):
+            data = geotiff_store.read(vessel_type, spill_month).data
+
+            vte_by_vessel_type[i] = data[geotiff_x_index, geotiff_y_index]
+
+    # Choose a random vessel type, weighted by the vessel type VTE probability distribution
+    # for the month
+    probability = vte_by_vessel_type / vte_by_vessel_type.sum()
+    vessel_type = random_generator.choice(vessel_types, p=probability)
+
+    return vessel_type
+
+
+def get_vessel_type_batch(
+    geotiffs_dir,
+    vessel_types,
+    spill_months,
+    geotiff_x_indices,
+    geotiff_y_indices,
+    random_generator,
+    geotiff_store=None,
+    vessel_type_vte_cube=None,
+):
+    """Randomly choose the vessel types from which a batch of spills occur, with the choices
+    weighted by the vessel traffic exposure (VTE) for the spill months and GeoTIFF cells.
+
+    :param geotiffs_dir: Directory path to read AIS GeoTIFF files from.
+    :type geotiffs_dir: :py:class:`pathlib.Path`
+
+    :param list vessel_types: Vessel types from which spill can occur,
+                              and for which there are monthly 2018 VTE GeoTIFFs.
+
+    :param spill_months: Month numbers in which spills occur.
+    :type spill_months: :py:class:`numpy.ndarray`
+
+    :param geotiff_x_indices: x-indices of GeoTIFF cells in which spills are located
+    :type geotiff_x_indices: :py:class:`numpy.ndarray`
+
+    :param geotiff_y_indices: y-indices of GeoTIFF cells in which spills are located
+    :type geotiff_y_indices: :py:class:`numpy.ndarray`
+
+    :param random_generator: PCG-64 random number generator.
+    :type random_generator: :py:class:`numpy.random.Generator`
+
+    :param geotiff_store: Store of GeoTIFF rasters to read from instead of reading
+                          the GeoTIFF files directly.
+    :type geotiff_store: :py:class:`GeoTIFFStore` or None
+
+    :param vessel_type_vte_cube: Vessel type VTE cube from
+                                 :py:func:`calc_vessel_type_vte_cube` to look up the VTE
+                                 in instead of reading the GeoTIFF rasters.
+    :type vessel_type_vte_cube: :py:class:`types.SimpleNamespace` or None
+
+    :return: Randomly selected vessel types from which spills occur.
+    :rtype: :py:class:`numpy.ndarray` of str
+    """
+    n_spills = spill_months.size
+    logging.info(
+        f"Selecting random vessel types from which {n_spills} spills occur, "
+        f"weighted by monthly VTE in spill GeoTIFF cells"
+    )
+    uniforms = random_generator.random(n_spills)
+    if vessel_type_vte_cube is None:
+        geotiff_store = geotiff_store or GeoTIFFStore(geotiffs_dir)
+        geotiff_watermask = numpy.zeros(
+            geotiff_store.read("all", spill_months[0]).data.shape, dtype=bool
+        )
+        geotiff_watermask[geotiff_x_indices, geotiff_y_indices] = True
+        vessel_type_vte_cube = calc_vessel_type_vte_cube(
+            geotiff_store, vessel_types, geotiff_watermask, numpy.unique(spill_months)
+        )
+    vte_by_vessel_type = lookup_vessel_type_vte(
+        vessel_type_vte_cube,
+        vessel_types,
+        spill_months,
+        geotiff_x_indices,
+        geotiff_y_indices,
+    )
+    vessel_type_indices = _inverse_cdf_choice(vte_by_vessel_type, uniforms)
+    return numpy.array(vessel_types)[vessel_type_indices]
+
+
+def calc_vessel_type_vte_cube(
+    geotiff_store, vessel_types, geotiff_watermask, months=range(1, 13)
+):
+    """Calculate a (month, vessel type, water cell) cube of vessel traffic exposure (VTE)
+    from the vessel type AIS GeoTIFF rasters.
+
+    Only the GeoTIFF cells that are within the SalishSeaCast NEMO domain are included in
+    the cube, so it is sparse over the water cells.
+
+    :param geotiff_store: Store of GeoTIFF rasters to read the vessel type rasters from.
+    :type geotiff_store: :py:class:`GeoTIFFStore`
+
+    :param list vessel_types: Vessel types from which spill can occur,
+                              and for which there are monthly 2018 VTE GeoTIFFs.
+
+    :param geotiff_watermask: Boolean water mask to apply to AIS ship track density GeoTIFF files
+                              to restrict them to the SalishSeaCast NEMO domain.
+    :type geotiff_watermask: :py:class:`numpy.ndarray`
+
+    :param months: Month numbers to include in the cube;
+                   VTE for months that are not included are zero.
+    :type months: iterable of int
+
+    :return: Namespace of :kbd:`vessel_types` list, flattened GeoTIFF indices of the water
+             :kbd:`cells`, :kbd:`vte` array with shape
+             :kbd:`(12, len(vessel_types), cells.size)`, and GeoTIFF :kbd:`width`.
+    :rtype: :py:class:`types.SimpleNamespace`
+    """
+    logging.info("Calculating vessel type VTE cube over GeoTIFF water cells")
+    cells = numpy.flatnonzero(geotiff_watermask)
+    raster = geotiff_store.read(vessel_types[0], 1)
+    vte = numpy.zeros((12, len(vessel_types), cells.size), dtype=raster.data.dtype)
+    for month in months:
+        for i, vessel_type in enumerate(vessel_types):
+            vte[month - 1, i] = geotiff_store.read(vessel_type, month).data.flat[cells]
+    return SimpleNamespace(
+        vessel_types=list(vessel_types), cells=cells, vte=vte, width=raster.width
+    )
+
+
+def lookup_vessel_type_vte(
+    vessel_type_vte_cube, vessel_types, months, geotiff_x_indices, geotiff_y_indices
+):
+    """Look up the vessel traffic exposure (VTE) for each vessel type in a batch of months and
+    GeoTIFF cells in a single indexing operation on a vessel type VTE cube.
+
+    :param vessel_type_vte_cube: Vessel type VTE cube from
+                                 :py:func:`calc_vessel_type_vte_cube`.
+    :type vessel_type_vte_cube: :py:class:`types.SimpleNamespace`
+
+    :param list vessel_types: Vessel types to look up the VTE for,
+                              in the order of the cube's vessel types.
+
+    :param months: Month numbers for which to look up VTE.
+    :type months: :py:class:`numpy.ndarray`
+
+    :param geotiff_x_indices: x-indices of GeoTIFF cells for which to look up VTE.
+    :type geotiff_x_indices: :py:class:`numpy.ndarray`
+
+    :param geotiff_y_indices: y-indices of GeoTIFF cells for which to look up VTE.
+    :type geotiff_y_indices: :py:class:`numpy.ndarray`
+
+    :return: VTE array with shape :kbd:`(months.size, len(vessel_types))`.
+    :rtype: :py:class:`numpy.ndarray`
+    """
+    if list(vessel_types) != vessel_type_vte_cube.vessel_types:
+        raise ValueError(
+            f"vessel types {vessel_types} do not match those of VTE cube: "
+            f"{vessel_type_vte_cube.vessel_types}"
+        )
+    width = vessel_type_vte_cube.width
+    flat_indices = geotiff_x_indices * width + geotiff_y_indices
+    cube_cells = vessel_type_vte_cube.cells.searchsorted(flat_indices)
+    cube_cells = numpy.minimum(cube_cells, vessel_type_vte_cube.cells.size - 1)
+    if numpy.any(vessel_type_vte_cube.cells[cube_cells] != flat_indices):
+        raise ValueError(
+            "GeoTIFF cell(s) outside of water cells of vessel type VTE cube"
+        )
+    return vessel_type_vte_cube.vte[months - 1, :, cube_cells].astype(float)
+
+
+def write_vessel_type_vte_cube(vessel_type_vte_cube, cube_dir, source_key=""):
+    """Store a vessel type VTE cube as Numpy array files in a directory so that the cube can be
+    memory-mapped when it is read.
+
+    :param vessel_type_vte_cube: Vessel type VTE cube from
+                                 :py:func:`calc_vessel_type_vte_cube`.
+    :type vessel_type_vte_cube: :py:class:`types.SimpleNamespace`
+
+    :param cube_dir: Directory path to write the cube files to.
+    :type cube_dir: :py:class:`pathlib.Path` or str
+
+    :param str source_key: Key that identifies the GeoTIFFs, vessel types, and water mask
+                           that the cube was calculated from.
+    """
+    cube_path = Path(cube_dir)
+    for name in ("vte", "cells"):
+        _write_cache_file(
+            cube_path / f"{name}.npy",
+            lambda tmp_file: numpy.save(
+                tmp_file, getattr(vessel_type_vte_cube, name), allow_pickle=False
+            ),
+        )
+    # The metadata are written last because their source key is what marks the cube as
+    # complete for load_vessel_type_vte_cube()
+    _write_cache_file(
+        cube_path / "metadata.npz",
+        lambda tmp_file: numpy.savez(
+            tmp_file,
+            vessel_types=numpy.array(vessel_type_vte_cube.vessel_types),
+            width=numpy.array(vessel_type_vte_cube.width),
+            source_key=numpy.array(source_key),
+        ),
+    )
+    logging.info(f"wrote vessel type VTE cube to: {cube_path}")
+
+
+def read_vessel_type_vte_cube(cube_dir):
+    """Read a vessel type VTE cube that was stored by :py:func:`write_vessel_type_vte_cube`,
+    memory-mapping its VTE array.
+
+    :param cube_dir: Directory path to read the cube files from.
+    :type cube_dir: :py:class:`pathlib.Path` or str
+
+    :return: 2-tuple composed of:
+
+             * vessel type VTE cube (:py:class:`types.SimpleNamespace`)
+             * key that identifies the GeoTIFFs, vessel types, and water mask that the cube
+               was calculated from (str)
+
+    :rtype: tuple
+    """
+    cube_path = Path(cube_dir)
+    with numpy.load(cube_path / "metadata.npz", allow_pickle=False) as metadata:
+        vessel_types = metadata["vessel_types"].tolist()
+        width = int(metadata["width"])
+        source_key = str(metadata["source_key"])
+    vessel_type_vte_cube = SimpleNamespace(
+        vessel_types=vessel_types,
+        cells=numpy.load(cube_path / "cells.npy", allow_pickle=False),
+        vte=numpy.load(cube_path / "vte.npy", mmap_mode="r", allow_pickle=False),
+        width=width,
+    )
+    return vessel_type_vte_cube, source_key
+
+
+def load_vessel_type_vte_cube(
+    geotiff_store, vessel_types, geotiff_watermask, cube_dir=None
+):
+    """Read a vessel type VTE cube from a directory, or calculate it and store it there if it
+    does not exist or was calculated from different GeoTIFFs, vessel types, or water mask.
+
+    :param geotiff_store: Store of GeoTIFF rasters to read the vessel type rasters from.
+    :type geotiff_store: :py:class:`GeoTIFFStore`
+
+    :param list vessel_types: Vessel types from which spill can occur,
+                              and for which there are monthly 2018 VTE GeoTIFFs.
+
+    :param geotiff_watermask: Boolean water mask to apply to AIS ship track density GeoTIFF files
+                              to restrict them to the SalishSeaCast NEMO domain.
+    :type geotiff_watermask: :py:class:`numpy.ndarray`
+
+    :param cube_dir: Directory path to read the cube files from and write them to;
+                     the cube is calculated in memory if None.
+    :type cube_dir: :py:class:`pathlib.Path` or str or None
+
+    :return: Vessel type VTE cube.
+    :rtype: :py:class:`types.SimpleNamespace`
+    """
+    if cube_dir is None:
+        return calc_vessel_type_vte_cube(geotiff_store, vessel_types, geotiff_watermask)
+    geotiff_files = [
+        geotiff_store.geotiffs_dir / f"{vessel_type}_2018_{month:02d}.tif"
+        for month in range(1, 13)
+        for vessel_type in vessel_types
+    ]
+    source_key = _calc_source_key(geotiff_files, geotiff_watermask)
+    if (Path(cube_dir) / "metadata.npz").exists():
+        vessel_type_vte_cube, cached_source_key = read_vessel_type_vte_cube(cube_dir)
+        if cached_source_key == source_key:
+            logging.info(f"read vessel type VTE cube from: {cube_dir}")
+            return vessel_type_vte_cube
+    vessel_type_vte_cube = calc_vessel_type_vte_cube(
+        geotiff_store, vessel_types, geotiff_watermask
+    )
+    write_vessel_type_vte_cube(vessel_type_vte_cube, cube_dir, source_key)
+    return read_vessel_type_vte_cube(cube_dir)[0]
+
+
+def get_length_origin_destination(
+    shapefiles_dir,
+    vessel_type,
+    spill_month,
+    geotiff_bbox,
+    random_generator,
+    ais_track_store=None,
+    track_vte_weights_store=None,
+    geotiff_x_index=None,
+    geotiff_y_index=None,
+):
+    """Randomly choose an AIS vessel track from which the spill occurs, with the choice
+    weighted by the vessel traffic exposure (VTE) for the specified vessel type, month,
+    and GeoTIFF cell. Return the length of the vessel, and voyage origin & destination,
+    and vessel MMSI from the chosen AIS track.
+
+    :param shapefiles_dir: Directory path to read shapefiles from
+    :type shapefiles_dir: :py:class:`pathlib.Path`
+
+    :param str vessel_type: Vessel type from which spill occurs.
+
+    :param int spill_month: Month number in which spill occurs.
+
+    :param geotiff_bbox: Bounding box of GeoTIFF cell containing spill location.
+    :type geotiff_bbox: :py:class:`shapely.geometry.Polygon`
+
+    :param random_generator: PCG-64 random number generator.
+    :type random_generator: :py:class:`numpy.random.Generator`
+
+    :param ais_track_store: Store of AIS tracks to query instead of reading the shapefile.
+    :type ais_track_store: :py:class:`AISTrackStore` or None
+
+    :param track_vte_weights_store: Store of precomputed AIS track VTE weights in GeoTIFF
+                                    cells to look up the track choice weights in instead of
+                                    calculating them from the track geometries.
+                                    The weights are only looked up if
+                                    :kbd:`geotiff_x_index` and :kbd:`geotiff_y_index` are
+                                    also given, and the store has a table for the vessel
+                                    type and month.
+    :type track_vte_weights_store: :py:class:`TrackVTEWeightsStore` or None
+
+    :param int geotiff_x_index: x-index of GeoTIFF cell containing spill location.
+
+    :param int geotiff_y_index: y-index of GeoTIFF cell containing spill location.
+
+    :return: 4-tuple composed of:
+
+             * length of vessel from which spill occurs [m] (int)
+             * origin of AIS track from which spill occurs (str or None)
+             * destination of AIS track from which spill occurs (str or None)
+             * vessel MMSI (str)
+
+    :rtype: tuple
+    """
+    logging.info(
+        f"Selecting random AIS vessel track from which spill occurs, "
+        f"weighted by VTE for 2018-{spill_month:02d} {vessel_type} vessels in GeoTIFF cell "
+        f"{geotiff_bbox.bounds}"
+    )
+    ais_tracks, vte = None, None
+    if track_vte_weights_store is not None and geotiff_x_index is not None:
+        track_vte_weights = track_vte_weights_store.read(vessel_type, spill_month)
+        if track_vte_weights is not None:
+            ais_tracks, vte = lookup_track_vte_weights(
+                track_vte_weights, geotiff_x_index, geotiff_y_index
+            )
+    if ais_tracks is None:
+        ais_tracks, vte = _calc_track_vte(
+            shapefiles_dir,
+            vessel_type,
+            spill_month,
+            geotiff_bbox,
+            ais_track_store,
+        )
+
+    try:
+        chosen_track_index = random_generator.choice(
+            range(ais_tracks.length.size), p=vte / vte.sum()
+        )
+    except ValueError:
+        # Handle the corner case of AIS track(s) that graze(s) the bounding box but have zero VTE
+        # in it by using a uniform probability distribution
+        chosen_track_index = random_generator.choice(range(ais_tracks.length.size))
+    vessel_len = ais_tracks.length[chosen_track_index]
+    vessel_origin = (
+        ais_tracks.origin[chosen_track_index] if ais_tracks.origin is not None else None
+    )
+    vessel_dest = (
+        ais_tracks.destination[chosen_track_index]
+        if ais_tracks.destination is not None
+        else None
+    )
+    # MMSI is a label that happens to be composed of digits
+    # Cast it to a str even though it is stored as a float in the shapefile
+    vessel_mmsi = f"{ais_tracks.mmsi[chosen_track_index]:.0f}"
+
+    return vessel_len, vessel_origin, vessel_dest, vessel_mmsi
+
+
+def _calc_track_vte(
+    shapefiles_dir, vessel_type, spill_month, geotiff_bbox, ais_track_store=None
+):
+    """
+    :param :py:class:`pathlib.Path` shapefiles_dir:
+    :param str vessel_type:
+    :param int spill_month:
+    :param :py:class:`shapely.geometry.Polygon` geotiff_bbox:
+    :param :py:class:`AISTrackStore` or None ais_track_store:
+    :rtype: tuple
+    """
+    # Load AIS track segments that pass through or are contained in GeoTIFF cell in which
+    # spill occurs
+    if ais_track_store is not None:
+
+        def read_ais_tracks(bbox):
+            return ais_track_store.query(vessel_type, spill_month, bbox)
+
+    else:
+        shapefile = shapefiles_dir / f"{vessel_type}_2018_{spill_month:02d}.shp"
+
+        def read_ais_tracks(bbox):
+            return _calc_ais_track_columns(geopandas.read_file(shapefile, bbox=bbox))
+
+    ais_tracks = read_ais_tracks(geotiff_bbox)
+    if ais_tracks.length.size == 0:
+        # Handle the edge case of no AIS tracks in the GeoTIFF cell that can occasionally
+        # happen because the GeoTIFF calculation algorithm that Cam uses can "smear"
+        # vessel traffic exposure into adjacent GoeTIFF cells:
+        # Expand the bounding box in steps to capture AIS tracks associated with smeared VTE
+        expansions = [0.3, 0.3]
+        while ais_tracks.length.size == 0:
+            expansion = expansions.pop(0)
+            geotiff_bbox = _expand_geotiff_bbox(geotiff_bbox, expansion)
+            logging.debug(
+                f"No AIS tracks found in bbox; expanded bbox by {expansion} to {geotiff_bbox.bounds}"
+            )
+            ais_tracks = read_ais_tracks(geotiff_bbox)
+
+    vte = _calc_track_vte_in_bbox(ais_tracks, geotiff_bbox)
+    return ais_tracks, vte
+
+
+def _expand_geotiff_bbox(geotiff_bbox, expansion):
+    """
+    :param :py:class:`shapely.geometry.Polygon` geotiff_bbox:
+    :param float expansion:
+    :rtype: :py:class:`shapely.geometry.Polygon`
+    """
+    bbox_increment = expansion * (
+        numpy.abs(geotiff_bbox.bounds[2] - geotiff_bbox.bounds[0])
+    )
+    return shapely.geometry.Polygon(geotiff_bbox.buffer(bbox_increment).exterior)
+
+
+def _calc_track_vte_in_bbox(ais_tracks, geotiff_bbox):
+    """
+    :param :py:class:`types.SimpleNamespace` ais_tracks:
+    :param :py:class:`shapely.geometry.Polygon` or :py:class:`numpy.ndarray` geotiff_bbox:
+    :rtype: :py:class:`numpy.ndarray`
+    """
+    track_in_cell = shapely.intersection(ais_tracks.geometry, geotiff_bbox)
+    # The lengths used here are Cartesian plane lengths,
+    # note spherical coordinate distances, but we are working on
+    # a small patch of the Earth's surface, and we are using the
+    # length construct consistently, so the error is acceptably small.
+    frac_in_cell = shapely.length(track_in_cell) / shapely.length(ais_tracks.geometry)
+    return frac_in_cell * ais_tracks.duration
+
+
+class TrackVTEWeightsStore:
+    """Store of precomputed vessel traffic exposure (VTE) weights of the AIS tracks in each
+    GeoTIFF cell, so that choosing the track from which a spill occurs is a weighted lookup
+    rather than a geometric calculation.
+
+    The weights tables for all of the cells of a vessel type and month are calculated by
+    :py:func:`calc_track_vte_weights` and stored in :kbd:`cache_dir` as Numpy :kbd:`.npz`
+    files by :py:meth:`write`, which :py:func:`prepare_shared_data` does for all of the
+    vessel types and months, so that they are calculated once rather than by every spill
+    calculation process.
+    :py:meth:`read` only reads the stored tables; if there is no cache dir, or no up to date
+    table for a vessel type and month in it, the spill calculations calculate the weights
+    of the tracks in only the cell of each spill instead.
+
+    :param ais_track_store: Store of AIS tracks to calculate the weights from.
+    :type ais_track_store: :py:class:`AISTrackStore`
+
+    :param geotiff_store: Store of GeoTIFF rasters to read the vessel type rasters from.
+    :type geotiff_store: :py:class:`GeoTIFFStore`
+
+    :param geotiff_watermask: Boolean water mask to apply to AIS ship track density GeoTIFF files
+                              to restrict them to the SalishSeaCast NEMO domain.
+    :type geotiff_watermask: :py:class:`numpy.ndarray`
+
+    :param int max_tables: Maximum number of vessel type and month weights tables to keep
+                           in memory.
+                           The default is enough for the 2018 shapefiles for 9 vessel types.
+
+    :param cache_dir: Directory path to store weights tables in.
+    :type cache_dir: :py:class:`pathlib.Path` or str or None
+    """
+
+    def __init__(
+        self,
+        ais_track_store,
+        geotiff_store,
+        geotiff_watermask,
+        max_tables=108,
+        cache_dir=None,
+    ):
+        self.ais_track_store = ais_track_store
+        self.geotiff_store = geotiff_store
+        self.geotiff_watermask = geotiff_watermask
+        self.max_tables = max_tables
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._tables = collections.OrderedDict()
+        self._watermask_key = None
+
+    def read(self, vessel_type, month):
+        """Return the AIS track VTE weights in GeoTIFF cells for a vessel type and month.
+
+        :param str vessel_type: Vessel type for which to return the weights.
+
+        :param int month: Month number for which to return the weights.
+
+        :return: Weights table; see :py:func:`calc_track_vte_weights`,
+                 or None if there is no up to date table in the cache dir.
+        :rtype: :py:class:`types.SimpleNamespace` or None
+        """
+        try:
+            self._tables.move_to_end((vessel_type, month))
+            return self._tables[(vessel_type, month)]
+        except KeyError:
+            pass
+        track_vte_weights = self._load(vessel_type, month)
+        self._tables[(vessel_type, month)] = track_vte_weights
+        if len(self._tables) > self.max_tables:
+            self._tables.popitem(last=False)
+        return track_vte_weights
+
+    def write(self, vessel_type, month):
+        """Calculate the AIS track VTE weights in GeoTIFF cells for a vessel type and month,
+        and store them in the cache dir, unless they are already stored there and up to date.
+
+        :param str vessel_type: Vessel type for which to calculate the weights.
+
+        :param int month: Month number for which to calculate the weights.
+
+        :raises: :py:exc:`ValueError` if the store has no cache dir.
+        """
+        if self.cache_dir is None:
+            raise ValueError(
+                "AIS track VTE weights tables can only be stored in a cache dir"
+            )
+        if self._load(vessel_type, month) is not None:
+            return
+        track_vte_weights = calc_track_vte_weights(
+            self.ais_track_store,
+            self.geotiff_store,
+            vessel_type,
+            month,
+            self.geotiff_watermask,
+        )
+        write_track_vte_weights(
+            track_vte_weights,
+            self._calc_npz_file(vessel_type, month),
+            self._calc_source_key(vessel_type, month),
+        )
+        # Forget a miss that read() may have remembered
+        self._tables.pop((vessel_type, month), None)
+
+    def _load(self, vessel_type, month):
+        """
+        :param str vessel_type:
+        :param int month:
+        :rtype: :py:class:`types.SimpleNamespace` or None
+        """
+        if self.cache_dir is None:
+            return None
+        npz_file = self._calc_npz_file(vessel_type, month)
+        if npz_file.exists():
+            track_vte_weights, cached_source_key = read_track_vte_weights(npz_file)
+            if cached_source_key == self._calc_source_key(vessel_type, month):
+                logging.debug(f"read AIS track VTE weights from: {npz_file}")
+                return track_vte_weights
+        logging.debug(
+            f"no up to date AIS track VTE weights for 2018-{month:02d} {vessel_type} "
+            f"vessels in: {self.cache_dir}"
+        )
+        return None
+
+    def _calc_npz_file(self, vessel_type, month):
+        """
+        :param str vessel_type:
+        :param int month:
+        :rtype: :py:class:`pathlib.Path`
+        """
+        return self.cache_dir / f"{vessel_type}_2018_{month:02d}.npz"
+
+    def _calc_source_key(self, vessel_type, month):
+        """
+        :param str vessel_type:
+        :param int month:
+        :rtype: str
+        """
+        if self._watermask_key is None:
+            self._watermask_key = _calc_source_key([], self.geotiff_watermask)
+        source_files = [
+            self.ais_track_store.shapefiles_dir / f"{vessel_type}_2018_{month:02d}.shp",
+            self.geotiff_store.geotiffs_dir / f"{vessel_type}_2018_{month:02d}.tif",
+        ]
+        return _calc_source_key(source_files, numpy.array(self._watermask_key))
+
+
+def calc_track_vte_weights(
+    ais_track_store, geotiff_store, vessel_type, month, geotiff_watermask
+):
+    """Calculate the vessel traffic exposure (VTE) weights of the AIS tracks in each of the
+    GeoTIFF cells in which a spill from a vessel type can occur in a month.
+
+    Those are the water cells within the SalishSeaCast NEMO domain that have non-zero VTE
+    in the vessel type's GeoTIFF for the month.
+    The weight of a track in a cell is the fraction of the track's length that is in the
+    cell multiplied by the track's duration.
+    Cells that have no tracks in them are handled by expanding their bounding boxes in the
+    same way as :py:func:`get_length_origin_destination` does.
+
+    The candidate track ids and weights are stored in compressed sparse row (CSR) layout;
+    i.e. those for the cell :kbd:`cells[i]` are
+    :kbd:`track_ids[indptr[i]:indptr[i+1]]` and :kbd:`weights[indptr[i]:indptr[i+1]]`,
+    in the order that the tracks are stored in the shapefile.
+
+    :param ais_track_store: Store of AIS tracks to calculate the weights from.
+    :type ais_track_store: :py:class:`AISTrackStore`
+
+    :param geotiff_store: Store of GeoTIFF rasters to read the vessel type raster from.
+    :type geotiff_store: :py:class:`GeoTIFFStore`
+
+    :param str vessel_type: Vessel type for which to calculate the weights.
+
+    :param int month: Month number for which to calculate the weights.
+
+    :param geotiff_watermask: Boolean water mask to apply to AIS ship track density GeoTIFF files
+                              to restrict them to the SalishSeaCast NEMO domain.
+    :type geotiff_watermask: :py:class:`numpy.ndarray`
+
+    :return: Namespace of sorted flattened GeoTIFF :kbd:`cells` indices, CSR :kbd:`indptr`,
+             :kbd:`track_ids`, and :kbd:`weights` arrays, the GeoTIFF :kbd:`width`,
+             and :kbd:`tracks` namespace of the :kbd:`length`, :kbd:`origin`,
+             :kbd:`destination`, and :kbd:`mmsi` arrays of all of the tracks.
+    :rtype: :py:class:`types.SimpleNamespace`
+    """
+    logging.info(
+        f"Calculating AIS track VTE weights in GeoTIFF cells for 2018-{month:02d} "
+        f"{vessel_type} vessels"
+    )
+    raster = geotiff_store.read(vessel_type, month)
+    ais_tracks = ais_track_store.read(vessel_type, month)
+    cells = numpy.flatnonzero(raster.data * geotiff_watermask)
+    geotiff_bboxes = numpy.array(
+        [
+            _calc_geotiff_bbox(raster.transform, px, py)
+            for px, py in zip(*numpy.divmod(cells, raster.width))
+        ],
+        dtype=object,
+    )
+
+    cell_indices, track_ids = ais_tracks.tree.query(
+        geotiff_bboxes, predicate="intersects"
+    )
+    # Expand the bounding boxes of cells that have no AIS tracks in them in steps to capture
+    # tracks associated with VTE that is "smeared" into them from adjacent cells
+    expansions = [0.3, 0.3]
+    empty_cells = numpy.setdiff1d(numpy.arange(cells.size), cell_indices)
+    while empty_cells.size > 0 and expansions:
+        expansion = expansions.pop(0)
+        for cell_index in empty_cells:
+            geotiff_bboxes[cell_index] = _expand_geotiff_bbox(
+                geotiff_bboxes[cell_index], expansion
+            )
+        expanded_cell_indices, expanded_track_ids = ais_tracks.tree.query(
+            geotiff_bboxes[empty_cells], predicate="intersects"
+        )
+        cell_indices = numpy.concatenate(
+            [cell_indices, empty_cells[expanded_cell_indices]]
+        )
+        track_ids = numpy.concatenate([track_ids, expanded_track_ids])
+        empty_cells = numpy.setdiff1d(empty_cells, cell_indices)
+    if empty_cells.size > 0:
+        logging.warning(
+            f"No AIS tracks found in {empty_cells.size} expanded GeoTIFF cell bboxes for "
+            f"2018-{month:02d} {vessel_type} vessels"
+        )
+
+    order = numpy.lexsort((track_ids, cell_indices))
+    cell_indices, track_ids = cell_indices[order], track_ids[order]
+    weights = _calc_track_vte_in_bbox(
+        _select_ais_tracks(ais_tracks, track_ids), geotiff_bboxes[cell_indices]
+    )
+    indptr = numpy.zeros(cells.size + 1, dtype=int)
+    indptr[1:] = numpy.cumsum(numpy.bincount(cell_indices, minlength=cells.size))
+    return SimpleNamespace(
+        cells=cells,
+        indptr=indptr,
+        track_ids=track_ids,
+        weights=weights,
+        width=raster.width,
+        tracks=SimpleNamespace(
+            length=ais_tracks.length,
+            origin=ais_tracks.origin,
+            destination=ais_tracks.destination,
+            mmsi=ais_tracks.mmsi,
+        ),
+    )
+
+
+def lookup_track_vte_weights(track_vte_weights, geotiff_x_index, geotiff_y_index):
+    """Look up the AIS tracks and their vessel traffic exposure (VTE) weights in a
+    GeoTIFF cell.
+
+    :param track_vte_weights: Weights table from :py:func:`calc_track_vte_weights`.
+    :type track_vte_weights: :py:class:`types.SimpleNamespace`
 
-    :param random_generator: PCG-64 random number generator.
-    :type random_generator: :py:class:`numpy.random.Generator`
+    :param int geotiff_x_index: x-index of GeoTIFF cell.
 
-    :return: 6-tuple composed of:
+    :param int geotiff_y_index: y-index of GeoTIFF cell.
 
-             * spill latitude [°N in [-90°, 90°] range]
-             * spill longitude [°E in [-180°, 180°] range]
-             * x-index of GeoTIFF cell in which spill is located
-             * y-index of GeoTIFF cell in which spill is located
-             * GeoTIFF cell bounding box
-             * value of GeoTIFF cell in which spill is located (for QA/QC)
+    :return: 2-tuple composed of:
+
+             * namespace of :kbd:`length`, :kbd:`origin`, :kbd:`destination`,
+               and :kbd:`mmsi` arrays of the tracks in the cell
+             * VTE weights of the tracks in the cell (:py:class:`numpy.ndarray`)
+
+             or :kbd:`(None, None)` if the table has no tracks for the cell.
 
     :rtype: tuple
     """
-    logging.info(
-        f"Selecting random spill location within SalishSeaCast domain, "
-        f"weighted by VTE in 2018-{spill_month:02d}"
+    cell = geotiff_x_index * track_vte_weights.width + geotiff_y_index
+    i = track_vte_weights.cells.searchsorted(cell)
+    if i == track_vte_weights.cells.size or track_vte_weights.cells[i] != cell:
+        return None, None
+    start, stop = track_vte_weights.indptr[i : i + 2]
+    if start == stop:
+        return None, None
+    ais_tracks = _select_ais_tracks(
+        track_vte_weights.tracks, track_vte_weights.track_ids[start:stop]
     )
-    with rasterio.open(geotiffs_dir / f"all_2018_{spill_month:02d}.tif") as dataset:
-        data = dataset.read(1, boundless=True, fill_value=0)
+    return ais_tracks, track_vte_weights.weights[start:stop]
 
-        # Zero any points that are non-water or outside the SalishSeaCast domain
-        data = data * geotiff_watermask
 
-        # Calculate probability of traffic by VTE in the month
-        probability_distribution = data / data.sum()
+def write_track_vte_weights(track_vte_weights, npz_file, source_key=""):
+    """Store an AIS track VTE weights table in a Numpy :kbd:`.npz` file.
 
-        # Choose a random GeoTIFF cell, weighted by the month's VTE probability distribution,
-        # and calculated the cell's x/y indices
-        mp = random_generator.choice(data.size, p=probability_distribution.flatten())
-        px = mp // dataset.width
-        py = mp % dataset.width
+    :param track_vte_weights: Weights table from :py:func:`calc_track_vte_weights`.
+    :type track_vte_weights: :py:class:`types.SimpleNamespace`
 
-        # Get lats/lons of lower-right and upper-left corners of the chosen GeoTIFF cell
-        # and construct its bounding box
-        llx, lly = rasterio.transform.xy(dataset.transform, px + 0.5, py - 0.5)
-        urx, ury = rasterio.transform.xy(dataset.transform, px - 0.5, py + 0.5)
-        geotiff_bbox = shapely.geometry.Polygon(
-            [(llx, lly), (urx, lly), (urx, ury), (llx, ury), (llx, lly)]
-        )
+    :param npz_file: File path and name of Numpy :kbd:`.npz` file to write the table to.
+    :type npz_file: :py:class:`pathlib.Path` or str
 
-        # Find the SalishSeaCast T-grid water points in the GeoTIFF cell
-        ssc_lons = ssc_mesh.glamt.isel(t=0)
-        ssc_lats = ssc_mesh.gphit.isel(t=0)
-        ssc_tmask = ssc_mesh.tmask.isel(t=0, z=0)
-        inner_points = (
-            numpy.where(ssc_tmask == 1, 1, 0)
-            * numpy.where(ssc_lons > llx, 1, 0)
-            * numpy.where(ssc_lons < urx, 1, 0)
-            * numpy.where(ssc_lats > lly, 1, 0)
-            * numpy.where(ssc_lats < ury, 1, 0)
+    :param str source_key: Key that identifies the shapefile, GeoTIFF, and water mask that
+                           the table was calculated from.
+    """
+    arrays = {
+        "cells": track_vte_weights.cells,
+        "indptr": track_vte_weights.indptr,
+        "track_ids": track_vte_weights.track_ids,
+        "weights": track_vte_weights.weights,
+        "width": numpy.array(track_vte_weights.width),
+        "length": track_vte_weights.tracks.length,
+        "mmsi": track_vte_weights.tracks.mmsi,
+        "source_key": numpy.array(source_key),
+    }
+    for name in ("origin", "destination"):
+        arrays.update(
+            _calc_str_column_arrays(name, getattr(track_vte_weights.tracks, name))
         )
+    _write_cache_file(npz_file, lambda tmp_file: numpy.savez(tmp_file, **arrays))
+    logging.debug(f"wrote AIS track VTE weights to: {npz_file}")
 
-        # Choose a random SalishSeaCast T-grid water point, and calculate its lat/lon.
-        # The probability distribution here acts as a filter to restrict the choice of
-        # SalishSeaCast T-grid points to those that were found above to be within the chosen
-        # GeoTIFF cell.
-        ssp = random_generator.choice(
-            ssc_tmask.size,
-            p=inner_points.flatten() / inner_points.sum(),
-        )
-        sslon = ssc_lons.values.flat[ssp]
-        sslat = ssc_lats.values.flat[ssp]
-
-        # Define nine points in the horizontal plane of a SalishSeaCast T-grid cell,
-        # and choose a random one of them.
-        # This could be factored out into a separate function to avoid repeatedly building
-        # this dict, if performance becomes an issue.
-        one_third = 1 / 3
-        within_box = {
-            "center": SimpleNamespace(dx=0, dy=0),
-            "left": SimpleNamespace(dx=one_third, dy=0),
-            "uleft": SimpleNamespace(dx=one_third, dy=one_third),
-            "upper": SimpleNamespace(dx=0, dy=one_third),
-            "uright": SimpleNamespace(dx=-one_third, dy=one_third),
-            "right": SimpleNamespace(dx=-one_third, dy=0),
-            "lright": SimpleNamespace(dx=-one_third, dy=-one_third),
-            "lower": SimpleNamespace(dx=0, dy=-one_third),
-            "lleft": SimpleNamespace(dx=one_third, dy=-one_third),
-        }
-        shift = random_generator.choice(list(within_box.keys()))
 
-        # Calculate the SalishSeaCast T-grid cell size in degrees of lat & lon
-        width = ssc_tmask.x.size
-        londx, latdx = (
-            ssc_lons.values.flat[ssp + 1] - ssc_lons.values.flat[ssp],
-            ssc_lats.values.flat[ssp + 1] - ssc_lats.values.flat[ssp],
-        )
-        londy, latdy = (
-            ssc_lons.values.flat[ssp + width] - ssc_lons.values.flat[ssp],
-            ssc_lats.values.flat[ssp + width] - ssc_lats.values.flat[ssp],
-        )
+def read_track_vte_weights(npz_file):
+    """Read an AIS track VTE weights table from a Numpy :kbd:`.npz` file that was written by
+    :py:func:`write_track_vte_weights`.
 
-        # Calculate lat/lon of the spill
-        lat = sslat + latdx * within_box[shift].dx + latdy * within_box[shift].dy
-        lon = sslon + londx * within_box[shift].dx + londy * within_box[shift].dy
+    :param npz_file: File path and name of Numpy :kbd:`.npz` file to read the table from.
+    :type npz_file: :py:class:`pathlib.Path` or str
 
-        return lat, lon, px, py, geotiff_bbox, data[px, py]
+    :return: 2-tuple composed of:
 
+             * weights table; see :py:func:`calc_track_vte_weights`
+             * key that identifies the shapefile, GeoTIFF, and water mask that the table
+               was calculated from (str)
 
-def get_vessel_type(
-    geotiffs_dir,
-    vessel_types,
-    spill_month,
-    geotiff_x_index,
-    geotiff_y_index,
-    random_generator,
-):
-    """Randomly choose a vessel type from which the spill occurs, with the choice weighted by the
-    vessel traffic exposure (VTE) for the specified month and GeoTIFF cell.
+    :rtype: tuple
+    """
+    with numpy.load(npz_file, allow_pickle=False) as npz:
+        track_vte_weights = SimpleNamespace(
+            cells=npz["cells"],
+            indptr=npz["indptr"],
+            track_ids=npz["track_ids"],
+            weights=npz["weights"],
+            width=int(npz["width"]),
+            tracks=SimpleNamespace(
+                length=npz["length"],
+                origin=_read_str_column(npz, "origin"),
+                destination=_read_str_column(npz, "destination"),
+                mmsi=npz["mmsi"],
+            ),
+        )
+        source_key = str(npz["source_key"])
+    return track_vte_weights, source_key
 
-    :param geotiffs_dir: Directory path to read AIS GeoTIFF files from.
-    :type geotiffs_dir: :py:class:`pathlib.Path`
 
-    :param list vessel_types: Vessel types from which spill can occur,
-                              and for which there are monthly 2018 VTE GeoTIFFs.
+class AISTrackStore:
+    """Store of AIS ship tracks that reads each monthly vessel type shapefile once
+    and answers bounding box queries from a spatial index of the tracks.
 
-    :param int spill_month: Month number for which to choose a spill location.
+    The tracks are held as columnar arrays of their geometries, and the
+    :kbd:`LENGTH`, :kbd:`FROM_`, :kbd:`TO`, :kbd:`MMSI_NUM`, :kbd:`ST_DATE`, and
+    :kbd:`EN_DATE` attributes from the shapefiles.
+    If :kbd:`cache_dir` is given, the arrays are also stored there as Numpy :kbd:`.npz` files
+    that are read instead of the shapefiles in later runs.
 
-    :param int geotiff_x_index: x-index of GeoTIFF cell in which spill is located
+    :param shapefiles_dir: Directory path to read shapefiles from
+    :type shapefiles_dir: :py:class:`pathlib.Path`
 
-    :param int geotiff_y_index: y-index of GeoTIFF cell in which spill is located
+    :param int max_shapefiles: Maximum number of shapefiles' tracks to keep in memory.
+                               The default is enough for the 2018 shapefiles for 9 vessel types.
 
-    :param random_generator: PCG-64 random number generator.
-    :type random_generator: :py:class:`numpy.random.Generator`
+    :param cache_dir: Directory path to store tracks arrays in.
+    :type cache_dir: :py:class:`pathlib.Path` or str or None
+    """
 
-    :return: Randomly selected vessel type from which spill occurs.
-    :rtype: str
+    def __init__(self, shapefiles_dir, max_shapefiles=108, cache_dir=None):
+        self.shapefiles_dir = Path(shapefiles_dir)
+        self.max_shapefiles = max_shapefiles
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._tracks = collections.OrderedDict()
+
+    def read(self, vessel_type, month):
+        """Return the 2018 AIS tracks for a vessel type and month.
+
+        :param str vessel_type: Vessel type for which to return the tracks.
+
+        :param int month: Month number for which to return the tracks.
+
+        :return: Namespace of track :kbd:`geometry`, :kbd:`length`, :kbd:`origin`,
+                 :kbd:`destination`, :kbd:`mmsi`, :kbd:`st_date`, :kbd:`en_date`,
+                 and :kbd:`duration` arrays, and the spatial index :kbd:`tree` of the
+                 geometries.
+                 :kbd:`origin` and :kbd:`destination` are None if the shapefile does not
+                 have :kbd:`FROM_` and :kbd:`TO` attributes.
+        :rtype: :py:class:`types.SimpleNamespace`
+        """
+        # The filenames are formatted as "{vessel_type}_2018_MM.shp"
+        shapefile = self.shapefiles_dir / f"{vessel_type}_2018_{month:02d}.shp"
+        try:
+            self._tracks.move_to_end(shapefile)
+            return self._tracks[shapefile]
+        except KeyError:
+            pass
+        ais_tracks = self._load(shapefile)
+        ais_tracks.tree = shapely.STRtree(ais_tracks.geometry)
+        self._tracks[shapefile] = ais_tracks
+        if len(self._tracks) > self.max_shapefiles:
+            self._tracks.popitem(last=False)
+        return ais_tracks
+
+    def query(self, vessel_type, month, bbox):
+        """Return the 2018 AIS tracks for a vessel type and month that intersect a
+        bounding box, in the order that they are stored in the shapefile.
+
+        :param str vessel_type: Vessel type for which to return the tracks.
+
+        :param int month: Month number for which to return the tracks.
+
+        :param bbox: Bounding box to return the tracks in.
+        :type bbox: :py:class:`shapely.geometry.Polygon`
+
+        :return: Namespace of track arrays; see :py:meth:`read`.
+        :rtype: :py:class:`types.SimpleNamespace`
+        """
+        ais_tracks = self.read(vessel_type, month)
+        indices = numpy.sort(ais_tracks.tree.query(bbox, predicate="intersects"))
+        return _select_ais_tracks(ais_tracks, indices)
+
+    def _load(self, shapefile):
+        """
+        :param :py:class:`pathlib.Path` shapefile:
+        :rtype: :py:class:`types.SimpleNamespace`
+        """
+        if self.cache_dir is None:
+            logging.debug(f"reading AIS tracks from: {shapefile}")
+            return _calc_ais_track_columns(geopandas.read_file(shapefile))
+        npz_file = (self.cache_dir / shapefile.name).with_suffix(".npz")
+        source_key = _calc_source_key([shapefile])
+        if npz_file.exists():
+            ais_tracks, cached_source_key = read_ais_tracks(npz_file)
+            if cached_source_key == source_key:
+                logging.debug(f"read AIS tracks from: {npz_file}")
+                return ais_tracks
+        logging.debug(f"reading AIS tracks from: {shapefile}")
+        ais_tracks = _calc_ais_track_columns(geopandas.read_file(shapefile))
+        write_ais_tracks(ais_tracks, npz_file, source_key)
+        return ais_tracks
+
+
+def _calc_ais_track_columns(ais_tracks):
     """
-    logging.info(
-        f"Selecting random vessel type from which spill occurs, "
-        f"weighted by VTE in 2018-{spill_month:02d} GeoTIFF cell "
-        f"({geotiff_x_index}, {geotiff_y_index})"
+    :param :py:class:`geopandas.GeoDataFrame` ais_tracks:
+    :rtype: :py:class:`types.SimpleNamespace`
+    """
+    # Parse the format of each date separately, as parsing them one track at a time did,
+    # rather than inferring one format for the whole column from its first date
+    st_date = pandas.to_datetime(ais_tracks.ST_DATE, format="mixed").to_numpy()
+    en_date = pandas.to_datetime(ais_tracks.EN_DATE, format="mixed").to_numpy()
+    return SimpleNamespace(
+        geometry=numpy.asarray(ais_tracks.geometry),
+        length=ais_tracks.LENGTH.to_numpy(),
+        origin=(
+            ais_tracks.FROM_.to_numpy(dtype=object) if "FROM_" in ais_tracks else None
+        ),
+        destination=(
+            ais_tracks.TO.to_numpy(dtype=object) if "TO" in ais_tracks else None
+        ),
+        mmsi=ais_tracks.MMSI_NUM.to_numpy(),
+        st_date=st_date,
+        en_date=en_date,
+        duration=(en_date - st_date) / numpy.timedelta64(1, "s"),
     )
-    # Calculate vessel traffic exposure (VTE) [hours/km^2] for each vessel type
-    # at the spill location for the month in which the spill occurs
-    vte_by_vessel_type = numpy.empty(len(vessel_types))
-    for i, vessel_type in enumerate(vessel_types):
-        geotiff_file = geotiffs_dir / f"{vessel_type}_2018_{spill_month:02d}.tif"
-        with rasterio.open(geotiff_file) as dataset:
-            data = dataset.read(1, boundless=True, fill_value=0)
-
-        vte_by_vessel_type[i] = data[geotiff_x_index, geotiff_y_index]
-
-    # Choose a random vessel type, weighted by the vessel type VTE probability distribution
-    # for the month
-    probability = vte_by_vessel_type / vte_by_vessel_type.sum()
-    vessel_type = random_generator.choice(vessel_types, p=probability)
 
-    return vessel_type
 
+def _select_ais_tracks(ais_tracks, indices):
+    """
+    :param :py:class:`types.SimpleNamespace` ais_tracks:
+    :param :py:class:`numpy.ndarray` indices:
+    :rtype: :py:class:`types.SimpleNamespace`
+    """
+    return SimpleNamespace(
+        **{
+            name: column[indices] if column is not None else None
+            for name, column in vars(ais_tracks).items()
+            if name != "tree"
+        }
+    )
 
-def get_length_origin_destination(
-    shapefiles_dir,
-    vessel_type,
-    spill_month,
-    geotiff_bbox,
-    random_generator,
-):
-    """Randomly choose an AIS vessel track from which the spill occurs, with the choice
-    weighted by the vessel traffic exposure (VTE) for the specified vessel type, month,
-    and GeoTIFF cell. Return the length of the vessel, and voyage origin & destination,
-    and vessel MMSI from the chosen AIS track.
 
-    :param shapefiles_dir: Directory path to read shapefiles from
-    :type shapefiles_dir: :py:class:`pathlib.Path`
+def write_ais_tracks(ais_tracks, npz_file, source_key=""):
+    """Store AIS track arrays in a Numpy :kbd:`.npz` file.
 
-    :param str vessel_type: Vessel type from which spill occurs.
+    The track geometries are stored as ragged arrays of coordinates and offsets.
 
-    :param int spill_month: Month number in which spill occurs.
+    :param ais_tracks: Namespace of track arrays; see :py:meth:`AISTrackStore.read`.
+    :type ais_tracks: :py:class:`types.SimpleNamespace`
 
-    :param geotiff_bbox: Bounding box of GeoTIFF cell containing spill location.
-    :type geotiff_bbox: :py:class:`shapely.geometry.Polygon`
+    :param npz_file: File path and name of Numpy :kbd:`.npz` file to write the tracks to.
+    :type npz_file: :py:class:`pathlib.Path` or str
 
-    :param random_generator: PCG-64 random number generator.
-    :type random_generator: :py:class:`numpy.random.Generator`
+    :param str source_key: Key that identifies the shapefile that the tracks were read from.
+    """
+    geometry_type, coords, offsets = shapely.to_ragged_array(ais_tracks.geometry)
+    arrays = {
+        "geometry_type": numpy.array(int(geometry_type)),
+        "coords": coords,
+        "length": ais_tracks.length,
+        "mmsi": ais_tracks.mmsi,
+        "st_date": ais_tracks.st_date,
+        "en_date": ais_tracks.en_date,
+        "source_key": numpy.array(source_key),
+    }
+    arrays.update({f"offsets_{i}": offset for i, offset in enumerate(offsets)})
+    for name in ("origin", "destination"):
+        arrays.update(_calc_str_column_arrays(name, getattr(ais_tracks, name)))
+    _write_cache_file(npz_file, lambda tmp_file: numpy.savez(tmp_file, **arrays))
+    logging.debug(f"wrote AIS tracks to: {npz_file}")
+
+
+def read_ais_tracks(npz_file):
+    """Read AIS track arrays from a Numpy :kbd:`.npz` file that was written by
+    :py:func:`write_ais_tracks`.
+
+    :param npz_file: File path and name of Numpy :kbd:`.npz` file to read the tracks from.
+    :type npz_file: :py:class:`pathlib.Path` or str
 
-    :return: 4-tuple composed of:
+    :return: 2-tuple composed of:
 
-             * length of vessel from which spill occurs [m] (int)
-             * origin of AIS track from which spill occurs (str or None)
-             * destination of AIS track from which spill occurs (str or None)
-             * vessel MMSI (str)
+             * namespace of track arrays; see :py:meth:`AISTrackStore.read`
+             * key that identifies the shapefile that the tracks were read from (str)
 
     :rtype: tuple
     """
-    logging.info(
-        f"Selecting random AIS vessel track from which spill occurs, "
-        f"weighted by VTE for 2018-{spill_month:02d} {vessel_type} vessels in GeoTIFF cell "
-        f"{geotiff_bbox.bounds}"
-    )
-    # Load AIS track segments that pass through or are contained in GeoTIFF cell in which
-    # spill occurs
-    shapefile = shapefiles_dir / f"{vessel_type}_2018_{spill_month:02d}.shp"
-    ais_tracks = geopandas.read_file(shapefile, bbox=geotiff_bbox)
-    if ais_tracks.empty:
-        # Handle the edge case of no AIS tracks in the GeoTIFF cell that can occasionally
-        # happen because the GeoTIFF calculation algorithm that Cam uses can "smear"
-        # vessel traffic exposure into adjacent GoeTIFF cells:
-        # Expand the bounding box in steps to capture AIS tracks associated with smeared VTE
-        expansions = [0.3, 0.3]
-        while ais_tracks.empty:
-            expansion = expansions.pop(0)
-            bbox_increment = expansion * (
-                numpy.abs(geotiff_bbox.bounds[2] - geotiff_bbox.bounds[0])
-            )
-            geotiff_bbox = shapely.geometry.Polygon(
-                geotiff_bbox.buffer(bbox_increment).exterior
-            )
-            logging.debug(
-                f"No AIS tracks found in bbox; expanded bbox by {expansion} to {geotiff_bbox.bounds}"
-            )
-            ais_tracks = geopandas.read_file(shapefile, bbox=geotiff_bbox)
-
-    vte = numpy.empty(len(ais_tracks.index))
-    for i, ais_track in ais_tracks.iterrows():
-        track_in_cell = ais_track.geometry.intersection(geotiff_bbox)
-        # The lengths used here are Cartesian plane lengths,
-        # note spherical coordinate distances, but we are working on
-        # a small patch of the Earth's surface, and we are using the
-        # length construct consistently, so the error is acceptably small.
-        frac_in_cell = track_in_cell.length / ais_track.geometry.length
-        track_duration = pandas.to_datetime(ais_track.EN_DATE) - pandas.to_datetime(
-            ais_track.ST_DATE
+    with numpy.load(npz_file, allow_pickle=False) as npz:
+        offsets = tuple(
+            npz[f"offsets_{i}"]
+            for i in range(sum(name.startswith("offsets_") for name in npz.files))
         )
-        vte[i] = frac_in_cell * track_duration.total_seconds()
-
-    try:
-        chosen_track_index = random_generator.choice(
-            range(len(ais_tracks.index)), p=vte / vte.sum()
+        st_date, en_date = npz["st_date"], npz["en_date"]
+        ais_tracks = SimpleNamespace(
+            geometry=shapely.from_ragged_array(
+                shapely.GeometryType(int(npz["geometry_type"])), npz["coords"], offsets
+            ),
+            length=npz["length"],
+            origin=_read_str_column(npz, "origin"),
+            destination=_read_str_column(npz, "destination"),
+            mmsi=npz["mmsi"],
+            st_date=st_date,
+            en_date=en_date,
+            duration=(en_date - st_date) / numpy.timedelta64(1, "s"),
         )
-    except ValueError:
-        # Handle the corner case of AIS track(s) that graze(s) the bounding box but have zero VTE
-        # in it by using a uniform probability distribution
-        chosen_track_index = random_generator.choice(range(len(ais_tracks.index)))
-    vessel_len = ais_tracks.LENGTH[chosen_track_index]
-    try:
-        vessel_origin = ais_tracks.FROM_[chosen_track_index]
-    except AttributeError:
-        vessel_origin = None
-    try:
-        vessel_dest = ais_tracks.TO[chosen_track_index]
-    except AttributeError:
-        vessel_dest = None
-    # MMSI is a label that happens to be composed of digits
-    # Cast it to a str even though it is stored as a float in the shapefile
-    vessel_mmsi = f"{ais_tracks.MMSI_NUM[chosen_track_index]:.0f}"
+        source_key = str(npz["source_key"])
+    return ais_tracks, source_key
 
-    return vessel_len, vessel_origin, vessel_dest, vessel_mmsi
+
+def _calc_str_column_arrays(name, column):
+    """
+    :param str name:
+    :param :py:class:`numpy.ndarray` or None column:
+    :rtype: dict
+    """
+    if column is None:
+        return {}
+    # Store missing values as empty strings and a mask so that the file can be
+    # read without unpickling object arrays
+    missing = pandas.isna(column)
+    return {
+        name: numpy.where(missing, "", column).astype(str),
+        f"{name}_missing": missing,
+    }
+
+
+def _read_str_column(npz, name):
+    """
+    :param :py:class:`numpy.lib.npyio.NpzFile` npz:
+    :param str name:
+    :rtype: :py:class:`numpy.ndarray` or None
+    """
+    if name not in npz.files:
+        return None
+    column = npz[name].astype(object)
+    column[npz[f"{name}_missing"]] = None
+    return column
 
 
 def adjust_tug_tank_barge_length(vessel_type, vessel_len, random_generator):
@@ -920,6 +3233,7 @@ def get_oil_type(
     vessel_fuel_types,
     marine_transport_data_dir,
     random_generator,
+    oil_attribution=None,
 ):
     """Randomly choose a type of oil spilled based on vessel type, AIS origin & destination,
     and whether fuel or cargo is spilled.
@@ -943,6 +3257,11 @@ def get_oil_type(
     :param random_generator: PCG-64 random number generator
     :type random_generator: :py:class:`numpy.random.Generator`
 
+    :param oil_attribution: Parsed oil attribution YAML files from
+                            :py:func:`load_oil_attribution` to use instead of reading the
+                            cargo oil type attribution YAML files.
+    :type oil_attribution: :py:class:`types.SimpleNamespace` or None
+
     :return: 2-tuple composed of:
 
              * Type of oil spilled (str).
@@ -981,6 +3300,7 @@ def get_oil_type(
                 vessel_dest,
                 marine_transport_data_dir,
                 random_generator,
+                oil_attribution,
             )
         elif vessel_type == "barge":
             oil_type, barge_not_oil_cargo = get_oil_type_barge(
@@ -989,6 +3309,7 @@ def get_oil_type(
                 vessel_dest,
                 marine_transport_data_dir,
                 random_generator,
+                oil_attribution,
             )
             if barge_not_oil_cargo:
                 oil_type = random_generator.choice(
@@ -1002,12 +3323,18 @@ def get_oil_type(
                 vessel_dest,
                 marine_transport_data_dir,
                 random_generator,
+                oil_attribution,
             )
     return oil_type, barge_not_oil_cargo
 
 
 def get_oil_type_atb(
-    oil_attrs, origin, destination, transport_data_dir, random_generator
+    oil_attrs,
+    origin,
+    destination,
+    transport_data_dir,
+    random_generator,
+    oil_attribution=None,
 ):
     """Randomly choose type of cargo oil spilled from an ATB (articulated tug and barge) based on
     AIS track origin & destination, and oil cargo attribution analysis.
@@ -1034,6 +3361,11 @@ def get_oil_type_atb(
     :param random_generator: PCG-64 random number generator
     :type random_generator: :py:class:`numpy.random.Generator`
 
+    :param oil_attribution: Parsed oil attribution YAML files from
+                            :py:func:`load_oil_attribution` to use instead of reading the
+                            cargo oil type attribution YAML files.
+    :type oil_attribution: :py:class:`types.SimpleNamespace` or None
+
     :return: Type of oil spilled.
     :rtype: str
     """
@@ -1044,28 +3376,19 @@ def get_oil_type_atb(
     US_origin_destination = oil_attrs["categories"]["US_origin_destination"]
 
     # Get cargo oil type attribution information from oil-type yaml files
-    yaml_file = transport_data_dir / Path(oil_attrs["files"]["CAD_origin"]).name
-    with yaml_file.open("rt") as f:
-        CAD_yaml = yaml.safe_load(f)
-    yaml_file = transport_data_dir / Path(oil_attrs["files"]["WA_destination"]).name
-    with yaml_file.open("rt") as f:
-        WA_in_yaml = yaml.safe_load(f)
-        WA_in_noinfo = _calc_no_info_facilities(WA_in_yaml)
-    yaml_file = transport_data_dir / Path(oil_attrs["files"]["WA_origin"]).name
-    with yaml_file.open("rt") as f:
-        WA_out_yaml = yaml.safe_load(f)
-        WA_out_noinfo = _calc_no_info_facilities(WA_out_yaml)
+    oil_attribution = oil_attribution or _read_cargo_attribution(
+        oil_attrs, transport_data_dir
+    )
+    CAD_yaml = _select_cargo_samplers(oil_attribution, "CAD_origin")
+    WA_in_yaml = _select_cargo_samplers(oil_attribution, "WA_destination")
+    WA_in_noinfo = oil_attribution.WA_destination_noinfo
+    WA_out_yaml = _select_cargo_samplers(oil_attribution, "WA_origin")
+    WA_out_noinfo = oil_attribution.WA_origin_noinfo
     # US_origin is for US as origin
-    yaml_file = transport_data_dir / Path(oil_attrs["files"]["US_origin"]).name
-    with yaml_file.open("rt") as f:
-        US_yaml = yaml.safe_load(f)
+    US_yaml = _select_cargo_samplers(oil_attribution, "US_origin")
     # US_combined represents the combined import and export of oil
-    yaml_file = transport_data_dir / Path(oil_attrs["files"]["US_combined"]).name
-    with yaml_file.open("rt") as f:
-        USall_yaml = yaml.safe_load(f)
-    yaml_file = transport_data_dir / Path(oil_attrs["files"]["Pacific_origin"]).name
-    with yaml_file.open("rt") as f:
-        Pacific_yaml = yaml.safe_load(f)
+    USall_yaml = _select_cargo_samplers(oil_attribution, "US_combined")
+    Pacific_yaml = _select_cargo_samplers(oil_attribution, "Pacific_origin")
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # NOTE: these pairs need to be used together for "get_oil_type_cargo"
@@ -1150,7 +3473,12 @@ def get_oil_type_atb(
 
 
 def get_oil_type_barge(
-    oil_attrs, origin, destination, transport_data_dir, random_generator
+    oil_attrs,
+    origin,
+    destination,
+    transport_data_dir,
+    random_generator,
+    oil_attribution=None,
 ):
     """Randomly choose type of cargo oil spilled from abarge based on AIS track
     origin & destination, and oil cargo attribution analysis.
@@ -1172,6 +3500,11 @@ def get_oil_type_barge(
     :param random_generator: PCG-64 random number generator
     :type random_generator: :py:class:`numpy.random.Generator`
 
+    :param oil_attribution: Parsed oil attribution YAML files from
+                            :py:func:`load_oil_attribution` to use instead of reading the
+                            cargo oil type attribution YAML files.
+    :type oil_attribution: :py:class:`types.SimpleNamespace` or None
+
     :return: 2-tuple composed of:
 
              * Type of oil spilled (str or None)
@@ -1204,28 +3537,19 @@ def get_oil_type_barge(
     US_origin_destination = oil_attrs["categories"]["US_origin_destination"]
 
     # Get cargo oil type attribution information from oil-type yaml files
-    yaml_file = transport_data_dir / Path(oil_attrs["files"]["CAD_origin"]).name
-    with yaml_file.open("rt") as f:
-        CAD_yaml = yaml.safe_load(f)
-    yaml_file = transport_data_dir / Path(oil_attrs["files"]["WA_destination"]).name
-    with yaml_file.open("rt") as f:
-        WA_in_yaml = yaml.safe_load(f)
-        WA_in_noinfo = _calc_no_info_facilities(WA_in_yaml)
-    yaml_file = transport_data_dir / Path(oil_attrs["files"]["WA_origin"]).name
-    with yaml_file.open("rt") as f:
-        WA_out_yaml = yaml.safe_load(f)
-        WA_out_noinfo = _calc_no_info_facilities(WA_out_yaml)
+    oil_attribution = oil_attribution or _read_cargo_attribution(
+        oil_attrs, transport_data_dir
+    )
+    CAD_yaml = _select_cargo_samplers(oil_attribution, "CAD_origin")
+    WA_in_yaml = _select_cargo_samplers(oil_attribution, "WA_destination")
+    WA_in_noinfo = oil_attribution.WA_destination_noinfo
+    WA_out_yaml = _select_cargo_samplers(oil_attribution, "WA_origin")
+    WA_out_noinfo = oil_attribution.WA_origin_noinfo
     # US_origin is for US as origin
-    yaml_file = transport_data_dir / Path(oil_attrs["files"]["US_origin"]).name
-    with yaml_file.open("rt") as f:
-        US_yaml = yaml.safe_load(f)
+    US_yaml = _select_cargo_samplers(oil_attribution, "US_origin")
     # US_combined represents the combined import and export of oil
-    yaml_file = transport_data_dir / Path(oil_attrs["files"]["US_combined"]).name
-    with yaml_file.open("rt") as f:
-        USall_yaml = yaml.safe_load(f)
-    yaml_file = transport_data_dir / Path(oil_attrs["files"]["Pacific_origin"]).name
-    with yaml_file.open("rt") as f:
-        Pacific_yaml = yaml.safe_load(f)
+    USall_yaml = _select_cargo_samplers(oil_attribution, "US_combined")
+    Pacific_yaml = _select_cargo_samplers(oil_attribution, "Pacific_origin")
 
     # get probability of non-allocated track being an oil-barge
     probability_oilcargo = oil_attrs["vessel_attributes"]["barge"][
@@ -1425,7 +3749,12 @@ def get_oil_type_barge(
 
 
 def get_oil_type_tanker(
-    oil_attrs, origin, destination, transport_data_dir, random_generator
+    oil_attrs,
+    origin,
+    destination,
+    transport_data_dir,
+    random_generator,
+    oil_attribution=None,
 ):
     """Randomly choose type of cargo oil spilled from a tanker based on AIS track
     origin & destination, and oil cargo attribution analysis.
@@ -1447,6 +3776,11 @@ def get_oil_type_tanker(
     :param random_generator: PCG-64 random number generator
     :type random_generator: :py:class:`numpy.random.Generator`
 
+    :param oil_attribution: Parsed oil attribution YAML files from
+                            :py:func:`load_oil_attribution` to use instead of reading the
+                            cargo oil type attribution YAML files.
+    :type oil_attribution: :py:class:`types.SimpleNamespace` or None
+
     :return: Type of oil spilled.
     :rtype: str
     """
@@ -1457,28 +3791,19 @@ def get_oil_type_tanker(
     US_origin_destination = oil_attrs["categories"]["US_origin_destination"]
 
     # Get cargo oil type attribution information from oil-type yaml files
-    yaml_file = transport_data_dir / Path(oil_attrs["files"]["CAD_origin"]).name
-    with yaml_file.open("rt") as f:
-        CAD_yaml = yaml.safe_load(f)
-    yaml_file = transport_data_dir / Path(oil_attrs["files"]["WA_destination"]).name
-    with yaml_file.open("rt") as f:
-        WA_in_yaml = yaml.safe_load(f)
-        WA_in_noinfo = _calc_no_info_facilities(WA_in_yaml)
-    yaml_file = transport_data_dir / Path(oil_attrs["files"]["WA_origin"]).name
-    with yaml_file.open("rt") as f:
-        WA_out_yaml = yaml.safe_load(f)
-        WA_out_noinfo = _calc_no_info_facilities(WA_out_yaml)
+    oil_attribution = oil_attribution or _read_cargo_attribution(
+        oil_attrs, transport_data_dir
+    )
+    CAD_yaml = _select_cargo_samplers(oil_attribution, "CAD_origin")
+    WA_in_yaml = _select_cargo_samplers(oil_attribution, "WA_destination")
+    WA_in_noinfo = oil_attribution.WA_destination_noinfo
+    WA_out_yaml = _select_cargo_samplers(oil_attribution, "WA_origin")
+    WA_out_noinfo = oil_attribution.WA_origin_noinfo
     # US_origin is for US as origin
-    yaml_file = transport_data_dir / Path(oil_attrs["files"]["US_origin"]).name
-    with yaml_file.open("rt") as f:
-        US_yaml = yaml.safe_load(f)
+    US_yaml = _select_cargo_samplers(oil_attribution, "US_origin")
     # US_combined represents the combined import and export of oil
-    yaml_file = transport_data_dir / Path(oil_attrs["files"]["US_combined"]).name
-    with yaml_file.open("rt") as f:
-        USall_yaml = yaml.safe_load(f)
-    yaml_file = transport_data_dir / Path(oil_attrs["files"]["Pacific_origin"]).name
-    with yaml_file.open("rt") as f:
-        Pacific_yaml = yaml.safe_load(f)
+    USall_yaml = _select_cargo_samplers(oil_attribution, "US_combined")
+    Pacific_yaml = _select_cargo_samplers(oil_attribution, "Pacific_origin")
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # NOTE: these pairs need to be used together for
@@ -1530,6 +3855,247 @@ def get_oil_type_tanker(
     return oil_type
 
 
+#: Version of the contents of oil attribution pickle files;
+#: increment it when attributes are added to the namespace that is pickled,
+#: or the contents of its cargo samplers change
+_OIL_ATTRIBUTION_PICKLE_VERSION = 3
+
+#: Keys in :kbd:`oil_attrs["files"]` of the cargo oil type attribution YAML files
+CARGO_ATTRIBUTION_FILES = (
+    "CAD_origin",
+    "WA_destination",
+    "WA_origin",
+    "US_origin",
+    "US_combined",
+    "Pacific_origin",
+)
+
+
+def load_oil_attribution(oil_attribution_file, pickle_file=None):
+    """Read the oil attribution YAML file, and the vessel fuel types and cargo oil type
+    attribution YAML files that it refers to, or read them from a pickle file to which they
+    were stored by a previous run if none of the YAML files have changed since then.
+
+    :param oil_attribution_file: File path and name of oil attribution YAML file from the
+                                 output of make_oil_attrs.py.
+                                 The other YAML files are read from the directory that
+                                 it is in.
+    :type oil_attribution_file: :py:class:`pathlib.Path`
+
+    :param pickle_file: File path and name of pickle file to read the parsed YAML files from
+                        and write them to; the YAML files are always read if None.
+    :type pickle_file: :py:class:`pathlib.Path` or str or None
+
+    :return: Namespace of the parsed YAML files.
+             :kbd:`oil_attrs` is the oil attribution information,
+             :kbd:`vessel_fuel_types` is the mapping of fuel types and probabilities for
+             vessel types,
+             and the other attributes are the cargo oil type attribution information
+             from the YAML files with the same names in :kbd:`oil_attrs["files"]`,
+             the lists of facilities for which there is no oil transfer data in the
+             :kbd:`WA_destination` and :kbd:`WA_origin` files,
+             and the :kbd:`cargo_samplers` compiled from the cargo oil type attribution
+             information by :py:func:`compile_cargo_samplers`.
+    :rtype: :py:class:`types.SimpleNamespace`
+    """
+    oil_attribution_file = Path(oil_attribution_file)
+    transport_data_dir = oil_attribution_file.parent
+    with oil_attribution_file.open("rt") as f:
+        oil_attrs = yaml.safe_load(f)
+    if pickle_file is not None:
+        source_files = [oil_attribution_file] + [
+            transport_data_dir / Path(oil_attrs["files"][key]).name
+            for key in ("fuel",) + CARGO_ATTRIBUTION_FILES
+        ]
+        source_key = _calc_source_key(
+            source_files, numpy.array(_OIL_ATTRIBUTION_PICKLE_VERSION)
+        )
+        if Path(pickle_file).exists():
+            try:
+                with Path(pickle_file).open("rb") as f:
+                    cached = pickle.load(f)
+                oil_attribution = (
+                    cached["oil_attribution"]
+                    if cached["source_key"] == source_key
+                    else None
+                )
+            except Exception as exc:
+                # A truncated, corrupted, or foreign pickle, or one that refers to
+                # classes that have changed, is a cache miss; it is rewritten below
+                logging.warning(
+                    f"ignored unreadable oil attribution: {pickle_file}: "
+                    f"{type(exc).__name__}: {exc}"
+                )
+                oil_attribution = None
+            if oil_attribution is not None:
+                logging.info(f"read oil attribution from: {pickle_file}")
+                return oil_attribution
+
+    oil_attribution = _read_cargo_attribution(oil_attrs, transport_data_dir)
+    oil_attribution.oil_attrs = oil_attrs
+    vessel_fuel_types_file = Path(oil_attrs["files"]["fuel"]).name
+    with (transport_data_dir / vessel_fuel_types_file).open("rt") as f:
+        oil_attribution.vessel_fuel_types = yaml.safe_load(f)
+    logging.info(f"read oil attribution YAML files from: {transport_data_dir}")
+
+    if pickle_file is not None:
+
+        def write_pickle(tmp_file):
+            with Path(tmp_file).open("wb") as f:
+                pickle.dump(
+                    {"source_key": source_key, "oil_attribution": oil_attribution},
+                    f,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+
+        _write_cache_file(pickle_file, write_pickle)
+        logging.info(f"wrote oil attribution to: {pickle_file}")
+    return oil_attribution
+
+
+def _read_cargo_attribution(oil_attrs, transport_data_dir):
+    """
+    :param dict oil_attrs:
+    :param :py:class:`pathlib.Path` transport_data_dir:
+    :rtype: :py:class:`types.SimpleNamespace`
+    """
+    cargo_attribution = SimpleNamespace()
+    for key in CARGO_ATTRIBUTION_FILES:
+        yaml_file = transport_data_dir / Path(oil_attrs["files"][key]).name
+        with yaml_file.open("rt") as f:
+            setattr(cargo_attribution, key, yaml.safe_load(f))
+    cargo_attribution.WA_destination_noinfo = _calc_no_info_facilities(
+        cargo_attribution.WA_destination
+    )
+    cargo_attribution.WA_origin_noinfo = _calc_no_info_facilities(
+        cargo_attribution.WA_origin
+    )
+    cargo_attribution.cargo_samplers = compile_cargo_samplers(
+        {key: getattr(cargo_attribution, key) for key in CARGO_ATTRIBUTION_FILES}
+    )
+    return cargo_attribution
+
+
+def _select_cargo_samplers(oil_attribution, yaml_source):
+    """
+    :param :py:class:`types.SimpleNamespace` oil_attribution:
+    :param str yaml_source:
+    :rtype: :py:class:`types.SimpleNamespace`
+    """
+    return SimpleNamespace(
+        yaml_source=yaml_source, samplers=oil_attribution.cargo_samplers
+    )
+
+
+def compile_cargo_samplers(cargo_infos):
+    """Compile cargo oil type attribution information into categorical samplers of oil types
+    keyed by :kbd:`(yaml_source, facility, vessel_type)`.
+
+    :kbd:`facility` is None for the samplers of the vessel type entries that are used for
+    facilities that do not have their own entries.
+
+    The samplers hold the oil types in the order that they are in the YAML file, and their
+    cumulative probability distribution for choosing one oil type in the same way as
+    :py:meth:`numpy.random.Generator.choice` does.
+    The sum of each entry's :kbd:`fraction_of_total` values is validated here;
+    samplers of entries with sums that are not close to 1 hold the error message that
+    :py:func:`get_oil_type_cargo` raises a :py:exc:`ValueError` with if the entry is used.
+
+    :param dict cargo_infos: Cargo oil type attribution information from the output of
+                             make_cargo_*.ipynb notebooks, keyed by YAML source name.
+
+    :return: Dict of samplers that are namespaces of :kbd:`oil_types`, :kbd:`cdf`,
+             and :kbd:`error` message (None if the entry is valid).
+    :rtype: dict
+    """
+    cargo_samplers = {}
+    for yaml_source, cargo_info in cargo_infos.items():
+        for key, value in cargo_info.items():
+            if _is_cargo_attribution_entry(value):
+                cargo_samplers[(yaml_source, None, key)] = _compile_cargo_sampler(
+                    value, None, key
+                )
+                continue
+            if not isinstance(value, dict):
+                # Handle "names" stanza in YAML
+                continue
+            for vessel_type, ship in value.items():
+                if _is_cargo_attribution_entry(ship):
+                    sampler = _compile_cargo_sampler(ship, key, vessel_type)
+                    cargo_samplers[(yaml_source, key, vessel_type)] = sampler
+    return cargo_samplers
+
+
+def _is_cargo_attribution_entry(value):
+    """
+    :param value:
+    :rtype: boolean
+    """
+    return isinstance(value, dict) and all(
+        isinstance(oil_type_info, dict) and "fraction_of_total" in oil_type_info
+        for oil_type_info in value.values()
+    )
+
+
+def _compile_cargo_sampler(ship, facility, vessel_type):
+    """
+    :param dict ship:
+    :param str or None facility:
+    :param str vessel_type:
+    :rtype: :py:class:`types.SimpleNamespace`
+    """
+    oil_types = numpy.array(list(ship.keys()))
+    raw_probs = numpy.array(
+        [ship[oil_type]["fraction_of_total"] for oil_type in ship], dtype=float
+    )
+    error = None
+    # Written so that NaN fractions fail the check too
+    if not numpy.all(raw_probs >= 0):
+        error = (
+            f"Probable data entry error - raw probabilities are not all non-negative: "
+            f"{raw_probs[~(raw_probs >= 0)]} for {facility=}, {vessel_type=}"
+        )
+    elif abs(raw_probs.sum() - 1) > 1e-4:
+        error = (
+            f"Probable data entry error - sum of raw probabilities is not close to 1: "
+            f"{raw_probs.sum()} for {facility=}, {vessel_type=}"
+        )
+    if error is not None:
+        return SimpleNamespace(oil_types=oil_types, cdf=None, error=error)
+    probs = raw_probs / raw_probs.sum()
+    cdf = numpy.cumsum(probs)
+    cdf /= cdf[-1]
+    return SimpleNamespace(oil_types=oil_types, cdf=cdf, error=None)
+
+
+def _resolve_cargo_sampler_key(cargo_samplers, yaml_source, facility, vessel_type):
+    """Resolve the key of the sampler to use for a facility and vessel type in the same way
+    that :py:func:`get_oil_type_cargo` chooses the entry in a cargo oil type attribution
+    YAML file; i.e. use the vessel type entry if there is no entry for the vessel type at
+    the facility.
+
+    :param dict cargo_samplers: Samplers from :py:func:`compile_cargo_samplers`.
+
+    :param str yaml_source: Name of the YAML file that the samplers were compiled from.
+
+    :param str or None facility: Vessel origin or destination from AIS.
+
+    :param str vessel_type: Vessel type from which spill occurs.
+
+    :return: Sampler key.
+    :rtype: tuple
+
+    :raises: :py:exc:`KeyError` if there is no sampler for the vessel type.
+    """
+    key = (yaml_source, facility, vessel_type)
+    if facility is not None and key in cargo_samplers:
+        return key
+    key = (yaml_source, None, vessel_type)
+    if key not in cargo_samplers:
+        raise KeyError(vessel_type)
+    return key
+
+
 def _calc_no_info_facilities(oil_xfer_info):
     """Calculate vessel type keyed dict of lists of facilities for which there is
     no oil transfer data.
@@ -1564,8 +4130,10 @@ def get_oil_type_cargo(cargo_info, facility, vessel_type, random_generator):
     """Randomly choose cargo oil type based on facility and vessel type
     by querying information in input yaml_file.
 
-    :param dict cargo_info: Cargo oil type attribution information from the output of a
-                            make_cargo_*.ipynb notebooks.
+    :param cargo_info: Cargo oil type attribution information from the output of a
+                       make_cargo_*.ipynb notebooks, or namespace of :kbd:`yaml_source` name
+                       and :kbd:`samplers` compiled by :py:func:`compile_cargo_samplers`.
+    :type cargo_info: dict or :py:class:`types.SimpleNamespace`
 
     :param str or None facility: Vessel origin from AIS.
 
@@ -1577,6 +4145,19 @@ def get_oil_type_cargo(cargo_info, facility, vessel_type, random_generator):
     :return: Cargo oil type.
     :rtype: str
     """
+    if not isinstance(cargo_info, dict):
+        key = _resolve_cargo_sampler_key(
+            cargo_info.samplers, cargo_info.yaml_source, facility, vessel_type
+        )
+        sampler = cargo_info.samplers[key]
+        if sampler.error is not None:
+            logging.warning(sampler.error)
+            raise ValueError(sampler.error)
+        # Invert the cumulative distribution at a uniform deviate in the same way as
+        # numpy.random.Generator.choice() does
+        return sampler.oil_types[
+            sampler.cdf.searchsorted(random_generator.random(), side="right")
+        ]
     try:
         ship = cargo_info[facility][vessel_type]
     except KeyError:
@@ -1641,7 +4222,54 @@ def write_csv_file(df, csv_file):
         warning, error, and critical should be silent unless something bad goes wrong. 
     """,
 )
-def cli(n_spills, config_file, csv_file, verbosity):
+@click.option(
+    "--batch/--no-batch",
+    default=False,
+    show_default=True,
+    help="""
+        Calculate the spill parameters in vectorized batches instead of one spill at a time.
+    """,
+)
+@click.option(
+    "--random-seed",
+    type=int,
+    default=None,
+    help="""
+        Seed to initialize random number generator with to get a reproducible set of spills.
+    """,
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="""
+        Number of worker processes to calculate chunks of spills in.
+        More than 1 worker implies --batch.
+        The set of spills for a given random seed depends on the number of workers.
+    """,
+)
+@click.option(
+    "--prepare-cache/--no-prepare-cache",
+    default=False,
+    show_default=True,
+    help="""
+        Calculate and store the data that spill calculations share, including the AIS
+        track VTE weights tables, in the cache dir of the config file before calculating
+        the spills. The config file must have a cache dir.
+        More than 1 worker implies --prepare-cache.
+    """,
+)
+def cli(
+    n_spills,
+    config_file,
+    csv_file,
+    verbosity,
+    batch,
+    random_seed,
+    workers,
+    prepare_cache,
+):
     """Command-line interface for :py:func:`moad_tools.midoss.random_oil_spills`.
 
     :param int n_spills: Number of spills to calculate parameters for.
@@ -1658,6 +4286,20 @@ def cli(n_spills, config_file, csv_file, verbosity):
                           :kbd:`warning`, :kbd:`error`, and :kbd:`critical` should be silent
                           unless something bad goes wrong.
                           Default is :kbd:`warning`.
+
+    :param boolean batch: Calculate the spill parameters in vectorized batches via
+                          :py:func:`moad_tools.midoss.random_oil_spills_batch`.
+
+    :param random_seed: Seed to initialize random number generator with.
+    :type random_seed: None or int
+
+    :param int workers: Number of worker processes to calculate chunks of spills in via
+                        :py:func:`moad_tools.midoss.random_oil_spills_parallel`.
+
+    :param boolean prepare_cache: Calculate and store the shared data in the cache dir of
+                                  the processing configuration via
+                                  :py:func:`moad_tools.midoss.random_oil_spills.prepare_shared_data`
+                                  before calculating the spills.
     """
     logging_level = getattr(logging, verbosity.upper())
     logging.basicConfig(
@@ -1668,7 +4310,20 @@ def cli(n_spills, config_file, csv_file, verbosity):
     )
     logging.getLogger("fiona").setLevel(logging.WARNING)
     logging.getLogger("rasterio").setLevel(logging.WARNING)
-    df = random_oil_spills(n_spills, config_file)
+    if prepare_cache and workers == 1:
+        with Path(config_file).open("rt") as f:
+            config = yaml.safe_load(f)
+        if "cache dir" not in config:
+            raise click.UsageError(
+                f"--prepare-cache requires a cache dir in {config_file}"
+            )
+        prepare_shared_data(config)
+    if workers > 1:
+        df = random_oil_spills_parallel(n_spills, config_file, random_seed, workers)
+    elif batch:
+        df = random_oil_spills_batch(n_spills, config_file, random_seed)
+    else:
+        df = random_oil_spills(n_spills, config_file, random_seed)
     write_csv_file(df, csv_file)
 
 
@@ -1,8 +1,16 @@
 """Module to Incrementally Sum MOHID results
+
+The aggregates are held in memory in preallocated arrays that are updated in place,
+only in the grid cells that each spill touched, and are flushed to netCDF files
+at checkpoints.
+
+The Poisson bootstrap weights of a spill are applied to its values in those cells only,
+either as each spill is read, or to the pending contributions of many spills at once.
 """
 import numpy as np
 import pandas as pd
 from pathlib import Path
+import os
 from os import fspath
 import sys
 import xarray as xr
@@ -33,6 +41,7 @@ def initialize(oiltype, mcsize=49, nsize=896, esize=396):
              grid_y=(["grid_y"], np.arange(nsize)),
              filecount=(["nf"], np.arange(10000)), )
 
+    # every variable needs its own array because they are updated in place
     data_vars = dict(
         beaching_time=(["c", "grid_y", "grid_x"], beaching_time),
         beachpresence=(["grid_y", "grid_x"], beachpresence),
@@ -42,7 +51,7 @@ def initialize(oiltype, mcsize=49, nsize=896, esize=396):
         surface_oil=(["c", "grid_y", "grid_x"], surface_oil),
         deeppresence=(["grid_y", "grid_x"], deeppresence),
         deep_oil=(["c", "grid_y", "grid_x"], deep_oil),
-        deep_location=(["c", "grid_y", "grid_x"], deep_oil),
+        deep_location=(["c", "grid_y", "grid_x"], deep_location),
         files_aggregate=(["nf"], files_aggregate),
         nofiles = ([], 0)   )
 
@@ -52,118 +61,313 @@ def initialize(oiltype, mcsize=49, nsize=896, esize=396):
 
 
 def read_aggregate(oiltype, filename):
-    ds = xr.open_dataset(f'{filename}_{oiltype}.nc')
+    # load into memory, rather than open lazily, so that the aggregates can be
+    # updated in place
+    ds = xr.load_dataset(f'{filename}_{oiltype}.nc')
+    # file names are read as fixed width strings that would truncate longer ones
+    ds['files_aggregate'] = ds.files_aggregate.astype(object)
 
     return ds
 
 
 def write_aggregate(oiltype, filename, ds):
-    ds.to_netcdf(f'{filename}_{oiltype}.nc')
+    # write to a temporary file and then rename it so that an interrupted checkpoint
+    # doesn't destroy the previous one
+    path = Path(f'{filename}_{oiltype}.nc')
+    tmp_path = path.with_name(f'{path.name}.tmp')
+    ds.to_netcdf(tmp_path)
+    os.replace(tmp_path, path)
 
     return
 
-    
-def readfile_aggregate(filename, depths, rng, specific, oils, mcsize=49, minoil=5, minSurf=3):
-    pois = np.ones(mcsize+1)
+
+def write_water_cells(filename, mesh_file='~/MEOPAR/grid/mesh_mask201702.nc'):
+    """Write the water cells of the aggregation grid to a water cells index .npz file
+    for aggregate_a_directory
+
+    The aggregation grid is the MOHID grid, which is the SalishSeaCast NEMO grid without
+    its outermost rows and columns
+    """
+    from moad_tools.geotiff_watermask import calc_meshmask_key, calc_tmask_water_cells
+    from moad_tools.geotiff_watermask import write_water_cells as write_index
+
+    with xr.open_dataset(mesh_file) as mesh:
+        source_key = calc_meshmask_key(mesh)
+        water_cells = calc_tmask_water_cells(mesh.isel(y=slice(1, -1), x=slice(1, -1)))
+    write_index(water_cells, filename, source_key)
+
+    return
+
+
+def read_water_cells(filename, shape):
+    """Read the flattened grid indices of the water cells from a water cells index .npz file
+    written by write_water_cells, and check that they are for a grid of shape
+    """
+    with np.load(filename) as npz:
+        water_cells_shape = tuple(int(size) for size in npz['shape'])
+        if water_cells_shape != tuple(shape):
+            raise ValueError(
+                f'water cells in {filename} are for a {water_cells_shape} grid, '
+                f'not the {tuple(shape)} aggregation grid')
+        water_cells = npz['cells']
+
+    return water_cells
+
+
+def add_weighted(ds, name, cells, values, pois):
+    """Add values in cells weighted by each of the Poisson bootstrap weights to ds[name]
+    in place
+
+    cells is the (grid_y, grid_x) index arrays of the cells, which must be unique;
+    the weighted values are their outer product with the weights, so only
+    (mcsize+1, len(values)) values are calculated instead of a whole weighted map
+    """
+    ds[name].values[(slice(None), *cells)] += np.outer(pois, values)
+
+    return
+
+
+def init_pending():
+    """Initialize the store of the contributions of spills whose Poisson bootstrap
+    weighted values have not been added to the aggregates yet
+    """
+    pending = dict(pois=[], weighted={})
+
+    return pending
+
+
+def add_pending(pending, weighted, pois):
+    """Store the contributions of a spill to the weighted aggregates, and its Poisson
+    bootstrap weights, to be added to the aggregates by apply_pending
+    """
+    pending['pois'].append(pois)
+    for name, (cells, values) in weighted.items():
+        pending['weighted'].setdefault(name, []).append((cells, values))
+
+    return
+
+
+def apply_pending(pending, datasets):
+    """Add the pending contributions of spills weighted by their Poisson bootstrap weights
+    to the aggregates in datasets in place, and clear them
+
+    The weighted contributions of all of the spills are sorted by cell and summed per cell
+    with reduceat, so each aggregate cell is updated once rather than once for each spill,
+    and only (mcsize+1, contributions) values are calculated rather than a dense
+    (spills, cells) block on the union of the cells that the spills touched
+    """
+    if not pending['pois']:
+        return
+    pois = np.array(pending['pois'])
+    shape = datasets[0].beachpresence.shape
+    for name, contributions in pending['weighted'].items():
+        flat_cells = np.concatenate(
+            [np.ravel_multi_index(cells, shape) for cells, _ in contributions])
+        if not flat_cells.size:
+            continue
+        values = np.concatenate([values for _, values in contributions])
+        spills = np.repeat(np.arange(len(contributions)),
+                           [spill_values.size for _, spill_values in contributions])
+        order = np.argsort(flat_cells, kind='stable')
+        cells, starts = np.unique(flat_cells[order], return_index=True)
+        weighted = np.add.reduceat(
+            pois[spills[order]] * values[order, np.newaxis], starts, axis=0).T
+        for ds in datasets:
+            ds[name].values[(slice(None), *np.unravel_index(cells, shape))] += weighted
+    pending['pois'].clear()
+    pending['weighted'].clear()
+
+    return
+
+
+def add_presence(ds, name, cells):
+    """Count the presence of oil in cells in ds[name] in place
+    """
+    ds[name].values[cells] += 1
+
+    return
+
+
+def read_run_fields(data, surface=39, zmax=0, zmin_surface=38):
+    """Reduce the oil volume of a run over its time steps, one time step at a time,
+    so that the whole run never has to be in memory
+
+    Returns the maximum and the sum over time of the surface level, and the sum over time
+    of the levels zmax to zmin_surface; the levels are selected by label so that files
+    converted with only some of the levels (hdf5-to-netcdf4 --z-range) can be aggregated
+    """
+    field = data.OilWaterColumnOilVol_3D
+    grid_z = data.grid_z.values
+    nsize, esize = data.sizes['grid_y'], data.sizes['grid_x']
+    isurface = data.indexes['grid_z'].get_loc(surface)
+    column = data.indexes['grid_z'].slice_indexer(zmax, zmin_surface)
+    surface_max = np.zeros((nsize, esize))
+    surface_sum = np.zeros((nsize, esize))
+    column_sum = np.zeros((column.stop - column.start, nsize, esize))
+    if 'sparse_layout' in field.attrs:
+        # sparse files (hdf5-to-netcdf4 --sparse) store only the cells with oil, and
+        # the cells that are not stored are zero; moad_tools is only needed to read them
+        from moad_tools.hdf5_to_netcdf4 import iter_sparse_cells
+        level_size = nsize * esize
+        for _, indices, values in iter_sparse_cells(data, field.name):
+            values = np.nan_to_num(values)
+            levels, cells = np.divmod(indices, level_size)
+            at_surface = levels == isurface
+            in_column = (levels >= column.start) & (levels < column.stop)
+            surface_cells = cells[at_surface]
+            surface_max.flat[surface_cells] = np.maximum(
+                surface_max.flat[surface_cells], values[at_surface])
+            surface_sum.flat[surface_cells] += values[at_surface]
+            column_sum.flat[indices[in_column] - column.start * level_size] += values[in_column]
+    else:
+        for time_index in range(data.sizes['time']):
+            # NaN values are skipped, as xarray's max and sum do
+            surface_oil = np.nan_to_num(field[time_index, isurface].values)
+            np.maximum(surface_max, surface_oil, out=surface_max)
+            surface_sum += surface_oil
+            column_sum += np.nan_to_num(field[time_index, column].values)
+
+    return surface_max, surface_sum, column_sum, grid_z[column]
+
+
+def calc_contributions(data, depths, minoil=5, minSurf=3, water_mask=None):
+    """Calculate the contributions of a run to the aggregates in the cells that it touched
+
+    Returns a dict of the (grid_y, grid_x) cells and the values to add to each of the
+    weighted aggregates, and a dict of the cells to count for each of the presences
+    """
     eps = 1e-7
+
+    beached = data.Beaching_Volume.values > minoil/1000.
+    beachtime = (np.array(data.Beaching_Time - data.Beaching_Time.min())
+          ) /  np.timedelta64(1, 's') /3600./24.
+    beach_oil = np.log(data.Beaching_Volume.values + eps)
+
+    surface_max, surface_sum, column_sum, column_levels = read_run_fields(data)
+
+    oiled = surface_max > minSurf/1000.
+    oiltime = (np.array(data.Oil_Arrival_Time - data.Oil_Arrival_Time.min())
+          ) /  np.timedelta64(1, 's') /3600./24.
+    oil_vol = np.log(surface_sum + eps)
+
+    deep_oiled = column_sum.max(axis=0) > minSurf/1000.
+    column_oil = column_sum.sum(axis=0) + eps
+    deep_oil = np.log(column_oil)
+    location = np.tensordot(depths[column_levels], column_sum, axes=1) / column_oil
+    print(deep_oiled.sum())
+
+    if water_mask is not None:
+        # only the water cells are aggregated
+        beached, oiled, deep_oiled = (
+            mask & water_mask for mask in (beached, oiled, deep_oiled))
+    presences = {
+        'beachpresence': np.nonzero(beached),
+        'oilpresence': np.nonzero(oiled),
+        'deeppresence': np.nonzero(deep_oiled),
+    }
+    weighted = {
+        'beaching_time': nonzero_cells(beached, beachtime),
+        'beaching_oil': nonzero_cells(beached, beach_oil),
+        'oiling_time': nonzero_cells(oiled, oiltime),
+        'surface_oil': nonzero_cells(oiled, oil_vol),
+        'deep_oil': nonzero_cells(deep_oiled, deep_oil),
+        'deep_location': nonzero_cells(deep_oiled, location),
+    }
+
+    return weighted, presences
+
+
+def nonzero_cells(mask, field):
+    """Return the (grid_y, grid_x) cells in mask where field is not zero, and their values,
+    because the weighted values of the others would add nothing to the aggregates
+    """
+    cells = np.nonzero(mask & (field != 0))
+
+    return cells, field[cells]
+
+
+def readfile_aggregate(filename, depths, rng, specific, oils, mcsize=49, minoil=5, minSurf=3,
+                       water_mask=None, pending=None):
+    """Add the contributions of the spill in filename to the aggregates of its oil type
+    and of all oils
+
+    If pending is given, the weighted contributions are stored in it to be added by
+    apply_pending instead of being added now
+    """
+    pois = np.ones(mcsize+1)
+    pois[1:] = rng.poisson(1, mcsize)
     with xr.open_dataset(filename) as data:
-        print (data.dims['time'])
-        specific['nofiles'] = specific.nofiles + 1
-        oils['nofiles'] = oils.nofiles + 1
-        pois[1:] = rng.poisson(1, mcsize)
-        
-        beached = data.Beaching_Volume > minoil/1000.
-        
-        beachtime = (np.array(data.Beaching_Time - data.Beaching_Time.min())
-              ) /  np.timedelta64(1, 's') /3600./24. * beached
-        beach_oil = np.log(data.Beaching_Volume + eps) * beached
-        
-        specific['beachpresence'][:] = specific.beachpresence[:] + beached[:, :]
-        oils['beachpresence'] = oils.beachpresence + beached
-        specific['beaching_time'] = specific.beaching_time + (np.broadcast_to(beachtime, (mcsize+1, 896, 396)) 
-                                                 * np.broadcast_to(pois, (396, 896, mcsize+1)).transpose())
-        oils['beaching_time'] = oils.beaching_time + (np.broadcast_to(beachtime, (mcsize+1, 896, 396)) 
-                                                 * np.broadcast_to(pois, (396, 896, mcsize+1)).transpose()) 
-        specific['beaching_oil'] = specific.beaching_oil + (np.broadcast_to(beach_oil, (mcsize+1, 896, 396)) 
-                                                 * np.broadcast_to(pois, (396, 896, mcsize+1)).transpose()) 
-        oils['beaching_oil'] = oils.beaching_oil + (np.broadcast_to(beach_oil, (mcsize+1, 896, 396)) 
-                                                 * np.broadcast_to(pois, (396, 896, mcsize+1)).transpose()) 
-        
-        oiled = data.OilWaterColumnOilVol_3D[:, 39].max(axis=0) > minSurf/1000.
-        
-        oiltime = (np.array(data.Oil_Arrival_Time - data.Oil_Arrival_Time.min())
-              ) /  np.timedelta64(1, 's') /3600./24. * oiled
-        oil_vol = np.log(data.OilWaterColumnOilVol_3D[:, 39].sum(axis=0) + eps) * oiled 
-        
-        specific['oilpresence'] = specific.oilpresence + oiled
-        oils['oilpresence'] = oils.oilpresence + oiled
-        specific['oiling_time'] = specific.oiling_time + (np.broadcast_to(oiltime, (mcsize+1, 896, 396)) 
-                                                 * np.broadcast_to(pois, (396, 896, mcsize+1)).transpose())
-        oils['oiling_time'] = oils.oiling_time + (np.broadcast_to(oiltime, (mcsize+1, 896, 396)) 
-                                                 * np.broadcast_to(pois, (396, 896, mcsize+1)).transpose())
-        specific['surface_oil'] = specific.surface_oil + (np.broadcast_to(oil_vol, (mcsize+1, 896, 396)) 
-                                                 * np.broadcast_to(pois, (396, 896, mcsize+1)).transpose()) 
-        oils['surface_oil'] = oils.surface_oil + (np.broadcast_to(oil_vol, (mcsize+1, 896, 396)) 
-                                                 * np.broadcast_to(pois, (396, 896, mcsize+1)).transpose()) 
-        
-        specific['files_aggregate'][specific.nofiles-1] = fspath(filename)
-        oils['files_aggregate'][oils.nofiles-1] = fspath(filename)
-        print (specific.nofiles.values, oils.nofiles.values)
-        
-        zmax = 0
-        
-        water_column_oil = data.OilWaterColumnOilVol_3D[:, zmax:39].sum(axis=0)        
-        print (water_column_oil.shape)
-        data.close()   # yes, this should happen anyway...
-    oiled = water_column_oil.max(axis=0) > minSurf/1000.
-    column_oil = water_column_oil.sum(axis=0) + eps
-    oil_vol = np.log(column_oil) * oiled
-    
-    specific['deeppresence'] = specific.deeppresence + oiled
-    oils['deeppresence'] = oils.deeppresence + oiled
-    specific['deep_oil'] = specific.deep_oil + (np.broadcast_to(oil_vol, (mcsize+1, 896, 396)) 
-                                                 * np.broadcast_to(pois, (396, 896, mcsize+1)).transpose()) 
-    oils['deep_oil'] = oils.deep_oil + (np.broadcast_to(oil_vol, (mcsize+1, 896, 396)) 
-                                                 * np.broadcast_to(pois, (396, 896, mcsize+1)).transpose()) 
-    print(oiled.sum())
-    
-    location = (depths[zmax:39] * water_column_oil.transpose()).transpose().sum(axis=0) * oiled / column_oil  
-    specific['deep_location'] = specific.deep_location + (np.broadcast_to(location, (mcsize+1, 896, 396)) 
-                                                 * np.broadcast_to(pois, (396, 896, mcsize+1)).transpose()) 
-    oils['deep_location'] = oils.deep_location + (np.broadcast_to(location, (mcsize+1, 896, 396)) 
-                                                 * np.broadcast_to(pois, (396, 896, mcsize+1)).transpose())
-        
-        
-        
+        print (data.sizes['time'])
+        weighted, presences = calc_contributions(data, depths, minoil, minSurf, water_mask)
+
+    # the contributions of the run are calculated once, and added to the aggregates
+    # of its oil type and of all oils
+    for ds in (specific, oils):
+        ds['nofiles'] = ds.nofiles + 1
+        ds['files_aggregate'].values[ds.nofiles.values - 1] = fspath(filename)
+        for name, cells in presences.items():
+            add_presence(ds, name, cells)
+        if pending is None:
+            for name, (cells, values) in weighted.items():
+                add_weighted(ds, name, cells, values, pois)
+    if pending is not None:
+        add_pending(pending, weighted, pois)
+    print (specific.nofiles.values, oils.nofiles.values)
+
     return specific, oils
 
 
-def aggregate_a_directory(directory, init_files, infile, outfile):
-        
+def aggregate_a_directory(directory, init_files, infile, outfile, water_cells_file=None,
+                          checkpoint_every=1000, defer_every=None):
+    """Aggregate the spills in the results directories of directory by oil type
+
+    If defer_every is given, the weighted contributions of up to that many spills are
+    added to the aggregates together by apply_pending
+    """
+
     mesh = xr.open_dataset('~/MEOPAR/grid/mesh_mask201702.nc')
     depths = np.flip(np.array(mesh.gdept_1d[0]))
     mesh.close()
 
-    rng = np.random.default_rng()
-
-    mypath = Path(directory)
-
     if init_files:
         oils = initialize("All Spills")
     else:
         oils = read_aggregate('oils', infile)
-        
+
+    water_mask = None
+    if water_cells_file is not None:
+        water_mask = np.zeros(oils.beachpresence.shape, dtype=bool)
+        water_mask.flat[read_water_cells(water_cells_file, water_mask.shape)] = True
+
+    rng = np.random.default_rng()
+    pending = init_pending() if defer_every is not None else None
+
+    mypath = Path(directory)
+
     for oil_type in ['akns', 'bunker', 'diesel', 'dilbit']:
         print (oil_type)
         if init_files:
             specific = initialize(oil_dict[oil_type][0])
         else:
             specific = read_aggregate(oil_type, infile)
+        nfiles = 0
         for model_oil in oil_dict[oil_type][1]:
             print (model_oil)
             for filename in mypath.glob(f'results/*/Lagrangian*{model_oil}*.nc'):
-                specific, oils = readfile_aggregate(filename, depths, rng, specific, oils)
+                specific, oils = readfile_aggregate(filename, depths, rng, specific, oils,
+                                                    water_mask=water_mask, pending=pending)
+                nfiles += 1
+                if pending is not None and (nfiles % defer_every == 0
+                                            or nfiles % checkpoint_every == 0):
+                    apply_pending(pending, [specific, oils])
+                if nfiles % checkpoint_every == 0:
+                    # flush the aggregates so that at most checkpoint_every runs are lost
+                    # if the aggregation is interrupted
+                    write_aggregate(oil_type, outfile, specific)
+                    write_aggregate('oils_save', outfile, oils)
 
+        if pending is not None:
+            apply_pending(pending, [specific, oils])
         write_aggregate(oil_type, outfile, specific)
         specific.close()
         write_aggregate('oils_save', outfile, oils)
@@ -171,16 +375,31 @@ def aggregate_a_directory(directory, init_files, infile, outfile):
     write_aggregate('oils', outfile, oils)
 
     return
-                
+
 
 if __name__ == "__main__":
+    if sys.argv[1] == 'water_cells':
+        # Incremental_Sums.py water_cells water_cells_file [mesh_file]
+        write_water_cells(*sys.argv[2:4])
+        sys.exit()
     infile = sys.argv[1]
     outfile = sys.argv[2]
     directory = sys.argv[3]
     init_files = False
+    water_cells_file = None
+    checkpoint_every = 1000
+    defer_every = None
     print (sys.argv[4], 'True')
-    if len(sys.argv) == 5:
+    if len(sys.argv) >= 5:
         if sys.argv[4] == 'True':
             init_files = True
-    print (directory, init_files, infile, outfile)
-    aggregate_a_directory(directory, init_files, infile, outfile)
+    if len(sys.argv) >= 6 and sys.argv[5] != 'None':
+        water_cells_file = sys.argv[5]
+    if len(sys.argv) >= 7:
+        checkpoint_every = int(sys.argv[6])
+    if len(sys.argv) >= 8:
+        defer_every = int(sys.argv[7])
+    print (directory, init_files, infile, outfile, water_cells_file, checkpoint_every,
+           defer_every)
+    aggregate_a_directory(directory, init_files, infile, outfile, water_cells_file,
+                          checkpoint_every, defer_every)
@@ -0,0 +1,109 @@
+"""Benchmark the encoding profiles of moad_tools.hdf5_to_netcdf4
+
+Transforms a MOHID HDF5 results file with each encoding profile and reports
+the conversion time, the netCDF4 file size, and the time to read the file from
+disk, rather than from the file system cache, with the access patterns of the
+ensemble aggregation in Incremental_Sums.py:
+
+* surface: the surface level at all time steps, reduced over time
+* column: the whole water column at all time steps, summed over time
+* point: the time series of the water column at the centre of the grid
+
+usage: python benchmark_hdf5_to_netcdf4_profiles.py hdf5_file work_dir [profile ...]
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy
+import xarray
+
+from moad_tools.hdf5_to_netcdf4 import ENCODING_PROFILES, hdf5_to_netcdf4
+
+# Incremental_Sums.readfile_aggregate() reads depth level 39, the surface
+SURFACE_LEVEL = 39
+FIELD = "OilWaterColumnOilVol_3D"
+
+
+def read_surface(netcdf4_file):
+    with xarray.open_dataset(netcdf4_file) as data:
+        field = data[FIELD]
+        surface = min(SURFACE_LEVEL, field.grid_z.size - 1)
+        oiled = field[:, surface].max(axis=0) > 3 / 1000.0
+        oil_vol = numpy.log(field[:, surface].sum(axis=0) + 1e-7) * oiled
+        return oil_vol.values
+
+
+def read_column(netcdf4_file):
+    with xarray.open_dataset(netcdf4_file) as data:
+        field = data[FIELD]
+        surface = min(SURFACE_LEVEL, field.grid_z.size - 1)
+        return field[:, 0:surface].sum(axis=0).values
+
+
+def read_point(netcdf4_file):
+    with xarray.open_dataset(netcdf4_file) as data:
+        field = data[FIELD]
+        return field[:, :, field.grid_y.size // 2, field.grid_x.size // 2].values
+
+
+ACCESS_PATTERNS = {"surface": read_surface, "column": read_column, "point": read_point}
+
+
+def evict_from_cache(netcdf4_file):
+    """Drop the pages of a file from the file system cache so that the next read of it
+    is a cold read, like those of the ensemble aggregation
+    """
+    fd = os.open(netcdf4_file, os.O_RDONLY)
+    try:
+        # Only clean pages are dropped, so write back any dirty ones first
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def benchmark(hdf5_file, work_dir, profiles, repeats=3):
+    work_dir = Path(work_dir)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    results = {}
+    for profile in profiles:
+        netcdf4_file = work_dir / f"{Path(hdf5_file).stem}_{profile}.nc"
+        start = time.perf_counter()
+        hdf5_to_netcdf4(hdf5_file, netcdf4_file, profile=profile)
+        result = {
+            "convert": time.perf_counter() - start,
+            "size": netcdf4_file.stat().st_size,
+        }
+        for name, read in ACCESS_PATTERNS.items():
+            # Best of several cold reads, each after the file is dropped from the
+            # file system cache, to reduce the effect of other load on the system
+            timings = []
+            for _ in range(repeats):
+                evict_from_cache(netcdf4_file)
+                start = time.perf_counter()
+                read(netcdf4_file)
+                timings.append(time.perf_counter() - start)
+            result[name] = min(timings)
+        results[profile] = result
+    return results
+
+
+def print_results(results):
+    print(
+        f"{'profile':>12} {'size [MB]':>10} {'convert [s]':>12} "
+        + " ".join(f"{name + ' [s]':>12}" for name in ACCESS_PATTERNS)
+    )
+    for profile, result in results.items():
+        print(
+            f"{profile:>12} {result['size'] / 1e6:>10.2f} {result['convert']:>12.3f} "
+            + " ".join(f"{result[name]:>12.3f}" for name in ACCESS_PATTERNS)
+        )
+
+
+if __name__ == "__main__":
+    hdf5_file = sys.argv[1]
+    work_dir = sys.argv[2]
+    profiles = sys.argv[3:] or list(ENCODING_PROFILES)
+    print_results(benchmark(hdf5_file, work_dir, profiles))